@@ -1,13 +1,48 @@
 import aiohttp
+import hashlib
+import hmac
+import logging
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Tuple
 from datetime import datetime, timezone
 import json
+from urllib.parse import parse_qs, urlsplit
+
+log = logging.getLogger(__name__)
 
 
 class ApiError(Exception):
     pass
 
 
+class EndpointStats:
+    """
+    Endpoint bo'yicha: so'rovlar, xatolar (tarmoq yoki >= 400), kechikish.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def observe(self, seconds: float, error: bool):
+        self.calls += 1
+        self.errors += int(error)
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_s / self.calls * 1000, 1) if self.calls else None,
+            "max_ms": round(self.max_s * 1000, 1),
+        }
+
+
 class ApiClient:
     """
     base_url misollar:
@@ -18,18 +53,84 @@ class ApiClient:
       - Agar base_url = "http://127.0.0.1:8000" bo'lsa,
         unda endpointlar "/api/reports/" bo'lishi kerak.
     """
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str,
+        secret: str = "",
+        limit: int = 100,
+        limit_per_host: int = 30,
+        timeout: float = 300,
+    ):
         self.base_url = base_url.rstrip("/")
+        self.secret = secret
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Bitta uzoq yashovchi sessiya (keep-alive ulanishlar puli). main.py da
+        start() bilan ochiladi, to'xtaganda close() bilan yopiladi.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def start(self):
+        # sessiya event loop ichida yaratilishi kerak
+        return self.session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: st.as_dict() for name, st in self.stats.items()}
+
+    def _signed(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        JSON tana + X-Bot-Timestamp / X-Bot-Signature (backend: users.bot_auth).
+        """
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            ts = str(int(time.time()))
+            sig = hmac.new(self.secret.encode(), ts.encode() + b"." + body, hashlib.sha256).hexdigest()
+            headers.update({"X-Bot-Timestamp": ts, "X-Bot-Signature": sig})
+        return {"data": body, "headers": headers}
+
+    @asynccontextmanager
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs):
+        started = time.monotonic()
+        error = True
+        try:
+            async with self.session.request(method, url, **kwargs) as resp:
+                yield resp
+                error = resp.status >= 400
+        finally:
+            self.stats[endpoint].observe(time.monotonic() - started, error)
 
     async def list_organizations(
         self,
-        session: aiohttp.ClientSession,
         access_token: str,
         page: int = 1
     ) -> Dict[str, Any]:
         url = f"{self.base_url}/organizations/?page={page}"
         headers = {"Authorization": f"Bearer {access_token}"}
-        async with session.get(url, headers=headers) as r:
+        async with self._request("organizations", "GET", url, headers=headers) as r:
             if r.status == 401:
                 raise ApiError("UNAUTHORIZED")
             if r.status != 200:
@@ -40,7 +141,6 @@ class ApiClient:
 
     async def auth_telegram(
         self,
-        session: aiohttp.ClientSession,
         telegram_id: int,
         first_name: str,
         last_name: str,
@@ -53,15 +153,37 @@ class ApiClient:
             "last_name": last_name,
             "phone_number": phone_number,
         }
-        async with session.post(url, json=payload) as resp:
+        async with self._request("auth_telegram", "POST", url, **self._signed(payload)) as resp:
             data = await resp.json(content_type=None)
             if resp.status != 200:
                 raise ApiError(f"Auth error: {resp.status} {str(data)[:500]}")
             return data
 
-    async def guide(self, session: aiohttp.ClientSession, access_token: str) -> Dict[str, Any]:
+    async def exchange_token(self, telegram_id: int) -> Dict[str, Any]:
+        """
+        Imzolangan so'rov bilan yangi tokenlar (login/parolsiz). secret kerak.
+        """
+        url = f"{self.base_url}/auth/telegram/token/"
+        async with self._request("exchange_token", "POST", url, **self._signed({"telegram_id": telegram_id})) as resp:
+            data = await resp.json(content_type=None)
+            if resp.status != 200:
+                raise ApiError(f"Token exchange error: {resp.status} {str(data)[:500]}")
+            return data["tokens"]
+
+    async def refresh_token(self, refresh: str) -> Dict[str, Any]:
+        """
+        Saqlangan refresh token -> {"access": ..., "refresh": ...} (parolsiz, tez).
+        """
+        url = f"{self.base_url}/auth/token/refresh/"
+        async with self._request("refresh_token", "POST", url, json={"refresh": refresh}) as resp:
+            data = await resp.json(content_type=None)
+            if resp.status != 200:
+                raise ApiError(f"Refresh error: {resp.status} {str(data)[:500]}")
+            return data
+
+    async def guide(self, access_token: str) -> Dict[str, Any]:
         url = f"{self.base_url}/guide/"
-        async with session.get(url, headers={"Authorization": f"Bearer {access_token}"}) as resp:
+        async with self._request("guide", "GET", url, headers={"Authorization": f"Bearer {access_token}"}) as resp:
             data = await resp.json(content_type=None)
             if resp.status == 401:
                 raise ApiError("UNAUTHORIZED")
@@ -69,9 +191,19 @@ class ApiClient:
                 raise ApiError(f"Guide error: {resp.status} {str(data)[:500]}")
             return data
 
-    async def my_reports(self, session: aiohttp.ClientSession, access_token: str, resolved: bool):
+    async def my_reports(
+        self,
+        access_token: str,
+        resolved: bool,
+        cursor: str | None = None,
+    ):
+        """
+        Keyset pagination: javobdagi `next` dan olingan cursor keyingi sahifani beradi.
+        """
         url = f"{self.base_url}/reports/mine/resolved/" if resolved else f"{self.base_url}/reports/mine/"
-        async with session.get(url, headers={"Authorization": f"Bearer {access_token}"}) as resp:
+        params = {"cursor": cursor} if cursor else None
+        endpoint = "my_reports_resolved" if resolved else "my_reports"
+        async with self._request(endpoint, "GET", url, params=params, headers={"Authorization": f"Bearer {access_token}"}) as resp:
             data = await resp.json(content_type=None)
             if resp.status == 401:
                 raise ApiError("UNAUTHORIZED")
@@ -79,9 +211,9 @@ class ApiClient:
                 raise ApiError(f"Reports error: {resp.status} {str(data)[:500]}")
             return data
 
-    async def report_detail(self, session: aiohttp.ClientSession, access_token: str, report_id: str) -> Dict[str, Any]:
+    async def report_detail(self, access_token: str, report_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/reports/{report_id}/"
-        async with session.get(url, headers={"Authorization": f"Bearer {access_token}"}) as resp:
+        async with self._request("report_detail", "GET", url, headers={"Authorization": f"Bearer {access_token}"}) as resp:
             data = await resp.json(content_type=None)
             if resp.status == 401:
                 raise ApiError("UNAUTHORIZED")
@@ -89,9 +221,9 @@ class ApiClient:
                 raise ApiError(f"Report detail error: {resp.status} {str(data)[:500]}")
             return data
 
-    async def resolve_report(self, session: aiohttp.ClientSession, access_token: str, report_id: str):
+    async def resolve_report(self, access_token: str, report_id: str):
         url = f"{self.base_url}/reports/{report_id}/resolve/"
-        async with session.post(url, headers={"Authorization": f"Bearer {access_token}"}) as resp:
+        async with self._request("resolve_report", "POST", url, headers={"Authorization": f"Bearer {access_token}"}) as resp:
             raw = await resp.text()
 
             # JSON bo'lmasa ham yiqilmasin
@@ -106,15 +238,42 @@ class ApiClient:
                 raise ApiError(f"Resolve error: {resp.status} {str(data)[:500]}")
             return data
 
+    async def find_duplicates(
+        self,
+        access_token: str,
+        latitude: float,
+        longitude: float,
+        organization_id: str | None = None,
+        timeout: float = 3,
+    ) -> Dict[str, Any]:
+        url = f"{self.base_url}/reports/duplicates/"
+        params = {"latitude": str(latitude), "longitude": str(longitude)}
+        if organization_id:
+            params["organization"] = str(organization_id)
+        async with self._request(
+            "find_duplicates",
+            "GET",
+            url,
+            params=params,
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as resp:
+            data = await resp.json(content_type=None)
+            if resp.status == 401:
+                raise ApiError("UNAUTHORIZED")
+            if resp.status != 200:
+                raise ApiError(f"Duplicates error: {resp.status} {str(data)[:500]}")
+            return data
+
     async def create_report(
         self,
-        session: aiohttp.ClientSession,
         access_token: str,
         description: str,
         latitude: float,
         longitude: float,
         organization_id: str,  # ✅ MUHIM: qo‘shildi
-        files: List[Tuple[str, bytes, str]],  # (filename, content_bytes, content_type)
+        files: List[Tuple[str, Any, str]],  # (filename, bytes | fayl obyekti, content_type)
+        uploads: List[str] = (),  # upload_media() qaytargan id lar
     ) -> Dict[str, Any]:
         url = f"{self.base_url}/reports/"
         form = aiohttp.FormData()
@@ -123,10 +282,12 @@ class ApiClient:
         form.add_field("longitude", str(longitude))
         form.add_field("organization", str(organization_id))  # ✅ MUHIM
 
+        for upload_id in uploads:
+            form.add_field("uploads", str(upload_id))
         for (filename, content, ctype) in files:
             form.add_field("files", content, filename=filename, content_type=ctype)
 
-        async with session.post(url, data=form, headers={"Authorization": f"Bearer {access_token}"}) as resp:
+        async with self._request("create_report", "POST", url, data=form, headers={"Authorization": f"Bearer {access_token}"}) as resp:
             data = await resp.json(content_type=None)
             if resp.status == 401:
                 raise ApiError("UNAUTHORIZED")
@@ -134,6 +295,32 @@ class ApiClient:
                 raise ApiError(f"Create report error: {resp.status} {str(data)[:500]}")
             return data
 
+    async def upload_media(self, access_token: str, filename: str, content: Any, content_type: str) -> Dict[str, Any]:
+        """
+        Murojaatdan oldin bitta faylni yuklash (POST /reports/uploads/) -> {"id", "type", ...}.
+        """
+        url = f"{self.base_url}/reports/uploads/"
+        form = aiohttp.FormData()
+        form.add_field("file", content, filename=filename, content_type=content_type)
+
+        async with self._request("upload_media", "POST", url, data=form, headers={"Authorization": f"Bearer {access_token}"}) as resp:
+            data = await resp.json(content_type=None)
+            if resp.status == 401:
+                raise ApiError("UNAUTHORIZED")
+            if resp.status != 201:
+                raise ApiError(f"Upload error: {resp.status} {str(data)[:500]}")
+            return data
+
+
+def next_cursor(payload: Any) -> str | None:
+    """
+    Paginated javobdagi `next` havolasidan cursor ni ajratib oladi.
+    """
+    if not isinstance(payload, dict) or not payload.get("next"):
+        return None
+    values = parse_qs(urlsplit(payload["next"]).query).get("cursor")
+    return values[0] if values else None
+
 
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -8,6 +8,18 @@ load_dotenv()
 class Settings:
     bot_token: str
     api_base_url: str
+    api_secret: str = ""  # backend BOT_API_SECRET bilan bir xil (imzolangan so'rovlar)
+    fsm_storage: str = "sqlite:///"  # memory | sqlite:///path (bo'sh — bot/bot_fsm.sqlite3) | redis://host:port/db
+    fsm_ttl: int = 3600  # murojaat flow'i shuncha soniya harakatsiz tursa o'chadi
+    workers: int = 1  # >1 bo'lsa update'lar shuncha jarayonga taqsimlanadi (polling)
+    mode: str = "polling"  # polling | webhook
+    webhook_url: str = ""  # tashqi manzil, masalan https://bot.example.uz/tg/webhook
+    webhook_path: str = "/tg/webhook"
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_secret: str = ""  # X-Telegram-Bot-Api-Secret-Token
+    webhook_workers: int = 32  # bir vaqtda ishlanadigan update'lar
+    webhook_queue: int = 100  # har worker navbati; to'lsa 503 (backpressure)
 
 def get_settings() -> Settings:
     bot_token = os.getenv("BOT_TOKEN", "").strip()
@@ -18,4 +30,34 @@ def get_settings() -> Settings:
     if not api_base_url:
         raise RuntimeError("API_BASE_URL topilmadi (.env ni tekshir).")
 
-    return Settings(bot_token=bot_token, api_base_url=api_base_url)
+    api_secret = os.getenv("BOT_API_SECRET", "").strip()
+    fsm_storage = os.getenv("FSM_STORAGE", "").strip() or Settings.fsm_storage
+    fsm_ttl = int(os.getenv("REPORT_FLOW_TTL_SECONDS", "3600"))
+    workers = max(1, int(os.getenv("BOT_WORKERS", "1")))
+
+    if workers > 1 and fsm_storage == "memory":
+        raise RuntimeError("BOT_WORKERS > 1 uchun FSM_STORAGE memory bo'lmasligi kerak.")
+
+    mode = os.getenv("BOT_MODE", "polling").strip().lower()
+    if mode not in ("polling", "webhook"):
+        raise RuntimeError("BOT_MODE polling yoki webhook bo'lishi kerak.")
+    webhook_url = os.getenv("WEBHOOK_URL", "").strip()
+    if mode == "webhook" and not webhook_url:
+        raise RuntimeError("WEBHOOK_URL topilmadi (.env ni tekshir).")
+
+    return Settings(
+        bot_token=bot_token,
+        api_base_url=api_base_url,
+        api_secret=api_secret,
+        fsm_storage=fsm_storage,
+        fsm_ttl=fsm_ttl,
+        workers=workers,
+        mode=mode,
+        webhook_url=webhook_url,
+        webhook_path=os.getenv("WEBHOOK_PATH", Settings.webhook_path).strip(),
+        webhook_host=os.getenv("WEBHOOK_HOST", Settings.webhook_host).strip(),
+        webhook_port=int(os.getenv("WEBHOOK_PORT", str(Settings.webhook_port))),
+        webhook_secret=os.getenv("WEBHOOK_SECRET", "").strip(),
+        webhook_workers=max(1, int(os.getenv("WEBHOOK_WORKERS", str(Settings.webhook_workers)))),
+        webhook_queue=max(1, int(os.getenv("WEBHOOK_QUEUE", str(Settings.webhook_queue)))),
+    )
@@ -1,8 +1,14 @@
-import aiosqlite
+import asyncio
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 
+import aiosqlite
+
 DB_PATH = "bot_users.sqlite3"
 
+# xotirada saqlanadigan user qatorlari soni (LRU)
+CACHE_SIZE = 10_000
+
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS users (
   telegram_id INTEGER PRIMARY KEY,
@@ -15,15 +21,87 @@ CREATE TABLE IF NOT EXISTS users (
 );
 """
 
+UPSERT_SQL = """
+INSERT INTO users (telegram_id, first_name, last_name, phone_number, access_token, refresh_token, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(telegram_id) DO UPDATE SET
+  first_name=excluded.first_name,
+  last_name=excluded.last_name,
+  phone_number=excluded.phone_number,
+  access_token=excluded.access_token,
+  refresh_token=excluded.refresh_token,
+  updated_at=excluded.updated_at
+"""
+
+SELECT_SQL = "SELECT * FROM users WHERE telegram_id=?"
+DELETE_SQL = "DELETE FROM users WHERE telegram_id=?"
+
+_MISSING = object()
+
+
 class BotDB:
-    def __init__(self, path: str = DB_PATH):
+    """
+    Bitta doimiy ulanish (init() da ochiladi, close() da yopiladi):
+      - WAL + synchronous=NORMAL — yozish fsync ni kutmaydi, o'qish bloklanmaydi
+      - so'rovlar matni o'zgarmas — sqlite3 ularni ulanish ichida tayyor
+        (prepared) holda keshlaydi
+      - user qatorlari LRU keshda; yozishlar avval bazaga, keyin keshga
+        (write-through). Bitta userning qatoriga faqat bitta jarayon yozadi
+        (BOT_WORKERS > 1 da update'lar user bo'yicha taqsimlanadi —
+        app.sharding), shuning uchun "user yo'q" (None) ham keshlanadi.
+    """
+
+    def __init__(self, path: str = DB_PATH, cache_size: int = CACHE_SIZE):
         self.path = path
+        self.cache_size = cache_size
+        self._db: aiosqlite.Connection | None = None
+        self._open_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._cache: "OrderedDict[int, Optional[Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
 
     async def init(self):
-        async with aiosqlite.connect(self.path) as db:
-            await db.execute(CREATE_TABLE_SQL)
-            await db.commit()
+        db = await self._conn()
+        await db.execute(CREATE_TABLE_SQL)
+        await db.commit()
+
+    async def _conn(self) -> aiosqlite.Connection:
+        if self._db is None:
+            async with self._open_lock:
+                if self._db is None:
+                    db = await aiosqlite.connect(self.path)
+                    db.row_factory = aiosqlite.Row
+                    await db.execute("PRAGMA journal_mode=WAL")
+                    await db.execute("PRAGMA synchronous=NORMAL")
+                    # boshqa worker jarayon yozayotgan bo'lsa kutamiz
+                    await db.execute("PRAGMA busy_timeout=5000")
+                    self._db = db
+        return self._db
+
+    async def close(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+        self._cache.clear()
 
+    # ------------------------------------------------------------ kesh
+    def _cache_get(self, telegram_id: int):
+        row = self._cache.get(telegram_id, _MISSING)
+        if row is not _MISSING:
+            self._cache.move_to_end(telegram_id)
+        return row
+
+    def _cache_put(self, telegram_id: int, row: Optional[Dict[str, Any]]):
+        self._cache[telegram_id] = row
+        self._cache.move_to_end(telegram_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    # --------------------------------------------------------- so'rovlar
     async def upsert_user_tokens(
         self,
         telegram_id: int,
@@ -34,31 +112,43 @@ class BotDB:
         refresh_token: str,
         updated_at_iso: str,
     ):
-        async with aiosqlite.connect(self.path) as db:
-            await db.execute(
-                """
-                INSERT INTO users (telegram_id, first_name, last_name, phone_number, access_token, refresh_token, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(telegram_id) DO UPDATE SET
-                  first_name=excluded.first_name,
-                  last_name=excluded.last_name,
-                  phone_number=excluded.phone_number,
-                  access_token=excluded.access_token,
-                  refresh_token=excluded.refresh_token,
-                  updated_at=excluded.updated_at
-                """,
-                (telegram_id, first_name, last_name, phone_number, access_token, refresh_token, updated_at_iso),
-            )
+        row = {
+            "telegram_id": telegram_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "phone_number": phone_number,
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "updated_at": updated_at_iso,
+        }
+        db = await self._conn()
+        # lock: parallel yozishlarda kesh bazadagi oxirgi holat bilan bir xil qolsin
+        async with self._write_lock:
+            await db.execute(UPSERT_SQL, tuple(row.values()))
             await db.commit()
+            self._cache_put(telegram_id, row)
 
     async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
-        async with aiosqlite.connect(self.path) as db:
-            db.row_factory = aiosqlite.Row
-            cur = await db.execute("SELECT * FROM users WHERE telegram_id=?", (telegram_id,))
-            row = await cur.fetchone()
+        row = self._cache_get(telegram_id)
+        if row is not _MISSING:
+            self.hits += 1
             return dict(row) if row else None
 
+        self.misses += 1
+        db = await self._conn()
+        async with self._write_lock:
+            # kutish paytida boshqa so'rov keshni to'ldirgan bo'lishi mumkin
+            row = self._cache_get(telegram_id)
+            if row is _MISSING:
+                async with db.execute(SELECT_SQL, (telegram_id,)) as cur:
+                    found = await cur.fetchone()
+                row = dict(found) if found else None
+                self._cache_put(telegram_id, row)
+        return dict(row) if row else None
+
     async def delete_user(self, telegram_id: int):
-        async with aiosqlite.connect(self.path) as db:
-            await db.execute("DELETE FROM users WHERE telegram_id=?", (telegram_id,))
+        db = await self._conn()
+        async with self._write_lock:
+            await db.execute(DELETE_SQL, (telegram_id,))
             await db.commit()
+            self._cache_put(telegram_id, None)
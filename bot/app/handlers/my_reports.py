@@ -1,12 +1,13 @@
-import aiohttp
 import html
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, URLInputFile
 from aiogram.fsm.context import FSMContext
 
 from ..db import BotDB
-from ..api import ApiClient, ApiError, now_iso
+from ..api import ApiClient, ApiError, next_cursor
 from ..states import BrowseReports
+from ..staging import MediaStager
+from ..tokens import TokenManager
 from ..keyboards import menu_kb, reports_nav_kb, files_list_kb, resolve_confirm_kb
 
 router = Router()
@@ -64,7 +65,7 @@ def parse_dt(s: str) -> str:
     return s[:19]
 
 
-def format_report_card_html(r: dict, idx: int, total: int, resolved_list: bool) -> str:
+def format_report_card_html(r: dict, idx: int, total, resolved_list: bool) -> str:
     rid = r.get("id", "")
     status = r.get("status", "")
     created = parse_dt(r.get("created_at") or "")
@@ -103,59 +104,34 @@ def format_report_card_html(r: dict, idx: int, total: int, resolved_list: bool)
     return "\n".join(lines)
 
 
-async def ensure_fresh_token(db: BotDB, api: ApiClient, telegram_id: int) -> str:
+async def fetch_reports_with_refresh(
+    telegram_id: int,
+    db: BotDB,
+    api: ApiClient,
+    tokens: TokenManager,
+    resolved: bool,
+    cursor: str | None = None,
+):
+    """
+    Bitta sahifa: (items, keyingi sahifa cursori | None, xato | None).
+    """
     user = await db.get_user(telegram_id)
     if not user:
-        return ""
-
-    async with aiohttp.ClientSession() as session:
-        auth = await api.auth_telegram(
-            session=session,
-            telegram_id=telegram_id,
-            first_name=user["first_name"],
-            last_name=user["last_name"],
-            phone_number=user["phone_number"],
-        )
-
-    access = auth["tokens"]["access"]
-    refresh = auth["tokens"]["refresh"]
-
-    await db.upsert_user_tokens(
-        telegram_id=telegram_id,
-        first_name=user["first_name"],
-        last_name=user["last_name"],
-        phone_number=user["phone_number"],
-        access_token=access,
-        refresh_token=refresh,
-        updated_at_iso=now_iso(),
-    )
-    return access
-
-
-async def fetch_reports_with_refresh(message: Message, db: BotDB, api: ApiClient, resolved: bool):
-    telegram_id = message.from_user.id
-    user = await db.get_user(telegram_id)
-    if not user:
-        return None, "Avval /start qilib ro‘yxatdan o‘ting."
+        return None, None, "Avval /start qilib ro‘yxatdan o‘ting."
 
     async def fetch(access: str):
-        async with aiohttp.ClientSession() as session:
-            return await api.my_reports(session, access, resolved=resolved)
+        return await api.my_reports(access, resolved=resolved, cursor=cursor)
 
     try:
-        payload = await fetch(user["access_token"])
+        payload = await tokens.call(telegram_id, fetch)
     except ApiError as e:
-        if str(e) == "UNAUTHORIZED":
-            new_access = await ensure_fresh_token(db, api, telegram_id)
-            payload = await fetch(new_access)
-        else:
-            return None, f"Xatolik: {e}"
+        return None, None, f"Xatolik: {e}"
 
     items, err = normalize_items(payload)
     if err:
-        return None, err
+        return None, None, err
 
-    return items, None
+    return items, next_cursor(payload), None
 
 
 async def show_current_report(message_or_query, state: FSMContext):
@@ -176,15 +152,19 @@ async def show_current_report(message_or_query, state: FSMContext):
     idx = max(0, min(idx, len(reports) - 1))
     await state.update_data(idx=idx)
 
+    # serverda yana sahifa bo'lsa jami noma'lum: "10+"
+    more = bool(data.get("next_cursor"))
+    total = f"{len(reports)}+" if more else len(reports)
+
     r = reports[idx]
-    text = format_report_card_html(r, idx, len(reports), resolved_list=resolved_list)
+    text = format_report_card_html(r, idx, total, resolved_list=resolved_list)
 
     # resolved list bo‘lmasa va status resolved bo‘lmasa -> Hal bo‘ldi tugmasi chiqadi
     can_resolve = (not resolved_list) and (str(r.get("status")).lower() != "resolved")
 
     kb = reports_nav_kb(
         has_prev=idx > 0,
-        has_next=idx < len(reports) - 1,
+        has_next=idx < len(reports) - 1 or more,
         can_resolve=can_resolve,
     )
 
@@ -206,9 +186,10 @@ async def show_current_report(message_or_query, state: FSMContext):
 
 
 @router.message(F.text.startswith("Murojaatlarim"))
-async def my_reports(message: Message, state: FSMContext, db: BotDB, api: ApiClient):
+async def my_reports(message: Message, state: FSMContext, db: BotDB, api: ApiClient, tokens: TokenManager, stager: MediaStager):
     await state.clear()
-    items, err = await fetch_reports_with_refresh(message, db, api, resolved=False)
+    stager.discard(message.from_user.id)
+    items, cursor, err = await fetch_reports_with_refresh(message.from_user.id, db, api, tokens, resolved=False)
     if err:
         await message.answer(f"❌ {err}", reply_markup=menu_kb())
         return
@@ -217,14 +198,15 @@ async def my_reports(message: Message, state: FSMContext, db: BotDB, api: ApiCli
         return
 
     await state.set_state(BrowseReports.browsing)
-    await state.update_data(reports=items, idx=0, resolved=False)
+    await state.update_data(reports=items, idx=0, resolved=False, next_cursor=cursor)
     await show_current_report(message, state)
 
 
 @router.message(F.text.startswith("Tugallangan murojaatlarim"))
-async def my_resolved_reports(message: Message, state: FSMContext, db: BotDB, api: ApiClient):
+async def my_resolved_reports(message: Message, state: FSMContext, db: BotDB, api: ApiClient, tokens: TokenManager, stager: MediaStager):
     await state.clear()
-    items, err = await fetch_reports_with_refresh(message, db, api, resolved=True)
+    stager.discard(message.from_user.id)
+    items, cursor, err = await fetch_reports_with_refresh(message.from_user.id, db, api, tokens, resolved=True)
     if err:
         await message.answer(f"❌ {err}", reply_markup=menu_kb())
         return
@@ -233,12 +215,12 @@ async def my_resolved_reports(message: Message, state: FSMContext, db: BotDB, ap
         return
 
     await state.set_state(BrowseReports.browsing)
-    await state.update_data(reports=items, idx=0, resolved=True)
+    await state.update_data(reports=items, idx=0, resolved=True, next_cursor=cursor)
     await show_current_report(message, state)
 
 
 @router.callback_query(F.data.startswith("repnav:"))
-async def repnav_handler(query: CallbackQuery, state: FSMContext):
+async def repnav_handler(query: CallbackQuery, state: FSMContext, db: BotDB, api: ApiClient, tokens: TokenManager):
     action = query.data.split(":", 1)[1]
     data = await state.get_data()
 
@@ -263,6 +245,17 @@ async def repnav_handler(query: CallbackQuery, state: FSMContext):
         return
 
     if action == "next":
+        cursor = data.get("next_cursor")
+        if idx >= len(reports) - 1 and cursor:
+            # yuklangan ro'yxat tugadi — keyingi sahifani cursor bilan olamiz
+            items, cursor, err = await fetch_reports_with_refresh(
+                query.from_user.id, db, api, tokens, resolved=bool(data.get("resolved")), cursor=cursor,
+            )
+            if err:
+                await query.answer(err[:200], show_alert=True)
+                return
+            reports = reports + items
+            await state.update_data(reports=reports, next_cursor=cursor)
         await state.update_data(idx=min(len(reports) - 1, idx + 1))
         await show_current_report(query, state)
         return
@@ -296,7 +289,7 @@ async def repnav_handler(query: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("represolve:"))
-async def represolve_handler(query: CallbackQuery, state: FSMContext, db: BotDB, api: ApiClient):
+async def represolve_handler(query: CallbackQuery, state: FSMContext, db: BotDB, api: ApiClient, tokens: TokenManager):
     action = query.data.split(":", 1)[1]
     if action == "no":
         await query.answer("Bekor qilindi")
@@ -323,19 +316,14 @@ async def represolve_handler(query: CallbackQuery, state: FSMContext, db: BotDB,
     report_id = str(r.get("id"))
 
     async def do_resolve(access: str):
-        async with aiohttp.ClientSession() as session:
-            return await api.resolve_report(session, access, report_id)
+        return await api.resolve_report(access, report_id)
 
     try:
-        result = await do_resolve(user["access_token"])
+        result = await tokens.call(telegram_id, do_resolve)
     except ApiError as e:
-        if str(e) == "UNAUTHORIZED":
-            new_access = await ensure_fresh_token(db, api, telegram_id)
-            result = await do_resolve(new_access)
-        else:
-            await query.message.answer(f"❌ Xatolik: {e}")
-            await query.answer()
-            return
+        await query.message.answer(f"❌ Xatolik: {e}")
+        await query.answer()
+        return
 
     sec = int(result.get("resolution_seconds", 0))
     await query.message.answer(f"🙏 Rahmat! Murojaatingiz hal qilindi deb belgilandi.\n⏱ Hal bo‘lish vaqti: {humanize_seconds(sec)}")
@@ -353,7 +341,7 @@ async def represolve_handler(query: CallbackQuery, state: FSMContext, db: BotDB,
 
 
 @router.callback_query(F.data.startswith("repfile:"))
-async def repfile_handler(query: CallbackQuery, state: FSMContext, db: BotDB, api: ApiClient):
+async def repfile_handler(query: CallbackQuery, state: FSMContext, db: BotDB, api: ApiClient, tokens: TokenManager):
     telegram_id = query.from_user.id
     user = await db.get_user(telegram_id)
     if not user:
@@ -370,19 +358,14 @@ async def repfile_handler(query: CallbackQuery, state: FSMContext, db: BotDB, ap
         return
 
     async def fetch_detail(access: str):
-        async with aiohttp.ClientSession() as session:
-            return await api.report_detail(session, access, str(report_id))
+        return await api.report_detail(access, str(report_id))
 
     try:
-        detail = await fetch_detail(user["access_token"])
+        detail = await tokens.call(telegram_id, fetch_detail)
     except ApiError as e:
-        if str(e) == "UNAUTHORIZED":
-            new_access = await ensure_fresh_token(db, api, telegram_id)
-            detail = await fetch_detail(new_access)
-        else:
-            await query.message.answer(f"❌ Xatolik: {e}")
-            await query.answer()
-            return
+        await query.message.answer(f"❌ Xatolik: {e}")
+        await query.answer()
+        return
 
     attachments = detail.get("attachments") or []
     if not attachments:
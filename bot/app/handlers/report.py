@@ -1,22 +1,26 @@
 import os
 import time
 import asyncio
-import aiohttp
-from io import BytesIO
+import logging
 
+import aiohttp
 from aiogram import Router, F
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
 from aiogram.fsm.context import FSMContext
 
 from ..states import ReportCreate
+from ..tokens import TokenManager
 from ..keyboards import menu_kb, cancel_kb, media_kb, location_kb, confirm_kb
 from ..keyboards import organizations_kb, OrgCb
 from ..db import BotDB
-from ..api import ApiClient, ApiError, now_iso
-from ..utils import guess_content_type, safe_filename
-from .my_reports import maps_url
+from ..api import ApiClient, ApiError
+from ..utils import SpooledMedia, guess_content_type, safe_filename
+from ..staging import MediaStager
+from .my_reports import STATUS_TITLE, maps_url
 
 router = Router()
+log = logging.getLogger(__name__)
 
 MAX_FILES = 10
 
@@ -24,11 +28,9 @@ MAX_FILES = 10
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
 MAX_FILE_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024
 
-# ✅ Redis yo‘q bo‘lsa ham “auto clear” qilish uchun (ixtiyoriy)
-FLOW_TTL_SECONDS = int(os.getenv("REPORT_FLOW_TTL_SECONDS", "3600"))  # default 1 soat
-
-# har user uchun expiry task saqlaymiz (MemoryStorage + 1 process bo‘lsa yetarli)
-_EXPIRY_TASKS: dict[tuple[int, int], asyncio.Task] = {}
+# yuborishda fayllar parallel yuklanadi
+DOWNLOAD_CONCURRENCY = int(os.getenv("MEDIA_DOWNLOAD_CONCURRENCY", "5"))
+DOWNLOAD_TIMEOUT = int(os.getenv("MEDIA_DOWNLOAD_TIMEOUT", "120"))  # bitta fayl uchun, soniya
 
 
 def _init_media_state():
@@ -50,105 +52,116 @@ def _too_big(size: int | None) -> bool:
     return isinstance(size, int) and size > MAX_FILE_SIZE
 
 
-def _task_key(message: Message) -> tuple[int, int]:
-    return (message.chat.id, message.from_user.id)
+async def _touch_ttl(state: FSMContext):
+    # flow TTL ni storage o‘zi yuritadi (FSM_STORAGE, config.fsm_ttl) — faqat
+    # yozishda yangilanadi. Redis da state va data alohida kalitlar, ikkalasini yozamiz.
+    await state.set_state(await state.get_state())
+    await state.set_data(await state.get_data())
 
 
-async def _expire_after(bot, chat_id: int, user_id: int, state: FSMContext, expires_at: float):
-    # expires_at kelganda state hanuz shu flow bo‘lsa tozalaymiz
-    delay = max(0.0, expires_at - time.time())
-    await asyncio.sleep(delay)
-
-    try:
-        data = await state.get_data()
-        cur_expires = data.get("expires_at")
-        cur_user = data.get("telegram_id")
-        # faqat shu user flow’iga tegishli bo‘lsa
-        if cur_user == user_id and isinstance(cur_expires, (int, float)) and cur_expires == expires_at:
-            await state.clear()
-            await bot.send_message(
-                chat_id,
-                "⏳ Murojaatni yuborish vaqti tugadi. Iltimos qaytadan boshlang.",
-                reply_markup=menu_kb()
-            )
-    except Exception:
-        # bot restart / state yo‘q / network xatolari — jim
-        pass
+async def _end_flow(state: FSMContext, stager: MediaStager, telegram_id: int):
+    # flow tugadi (bekor qilindi / xato) — fonda yuklanayotgan fayllar ham unutiladi
+    await state.clear()
+    stager.discard(telegram_id)
 
 
-async def _touch_ttl(message: Message, state: FSMContext):
-    # TTL yangilash (Redis yo‘q bo‘lsa ham)
-    expires_at = time.time() + FLOW_TTL_SECONDS
-    await state.update_data(expires_at=expires_at, telegram_id=message.from_user.id)
+async def notify_flow_expired(bot, stager: MediaStager, chat_id: int, state: str | None):
+    # storage muddati o‘tgan flow’ni o‘chirganda (SQLiteStorage.run_expiry).
+    # Shaxsiy chatda chat_id = telegram_id
+    stager.discard(chat_id)
+    if state not in ReportCreate.__state_names__:
+        return
+    await bot.send_message(
+        chat_id,
+        "⏳ Murojaatni yuborish vaqti tugadi. Iltimos qaytadan boshlang.",
+        reply_markup=menu_kb()
+    )
 
-    key = _task_key(message)
-    old = _EXPIRY_TASKS.get(key)
-    if old and not old.done():
-        old.cancel()
 
-    _EXPIRY_TASKS[key] = asyncio.create_task(
-        _expire_after(message.bot, message.chat.id, message.from_user.id, state, expires_at)
-    )
+class FileTooBig(Exception):
+    def __init__(self, filename: str, size: int | None):
+        super().__init__(filename)
+        self.filename = filename
+        self.size = size
+
+
+async def fetch_attachments(bot, files_meta: list, on_progress=None, concurrency: int = DOWNLOAD_CONCURRENCY, timeout: float = DOWNLOAD_TIMEOUT) -> list[SpooledMedia]:
+    """
+    get_file + download_file — `concurrency` tadan parallel, har fayl `timeout` ichida.
+    Natija files_meta tartibida; xato bo‘lsa qolganlari to‘xtatiladi, ochilganlari yopiladi.
+    on_progress(done, total) — har fayl tugaganda.
+    """
+    slots: list[SpooledMedia | None] = [None] * len(files_meta)
+    sem = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def fetch(i: int, item: dict):
+        nonlocal done
+        async with sem:
+            async with asyncio.timeout(timeout):
+                f = await bot.get_file(item["file_id"])
+
+                # get_file dan ham file_size chiqishi mumkin — yana tekshiramiz
+                size = f.file_size if f.file_size is not None else item.get("size")
+                if _too_big(size):
+                    raise FileTooBig(item["filename"], size)
+
+                # kichigi xotirada, kattasi vaqtinchalik faylda — butun murojaat RAM da turmaydi
+                slots[i] = SpooledMedia(item["filename"], item["content_type"], size)
+                await slots[i].download(bot, f.file_path)
+        done += 1
+        if on_progress:
+            await on_progress(done, len(files_meta))
 
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for i, item in enumerate(files_meta):
+                tg.create_task(fetch(i, item))
+    except BaseException as e:
+        for m in slots:
+            if m is not None:
+                m.close()
+        if isinstance(e, BaseExceptionGroup):
+            # birinchi sabab (FileTooBig bo‘lsa u) — handler oddiy except bilan ushlaydi
+            raise next((x for x in e.exceptions if isinstance(x, FileTooBig)), e.exceptions[0])
+        raise
+    return slots
+
+
+def _progress_editor(msg: Message, interval: float = 1.0):
+    # Telegram edit limitlari — ko‘pi bilan `interval` da bir marta (oxirgisi har doim)
+    last = 0.0
+
+    async def update(done: int, total: int):
+        nonlocal last
+        now = time.monotonic()
+        if done < total and now - last < interval:
+            return
+        last = now
+        try:
+            await msg.edit_text(f"📥 Fayllar yuklanmoqda: {done}/{total}")
+        except TelegramBadRequest:
+            pass
 
-async def _ensure_not_expired(message: Message, state: FSMContext) -> bool:
-    data = await state.get_data()
-    expires_at = data.get("expires_at")
-    if isinstance(expires_at, (int, float)) and time.time() > expires_at:
-        await state.clear()
-        await message.answer(
-            "⏳ Murojaat jarayoni eskirib ketdi. Qaytadan boshlang.",
-            reply_markup=menu_kb()
-        )
-        return False
-    return True
-
-
-async def _refresh_tokens(db: BotDB, api: ApiClient, telegram_id: int, user: dict) -> str:
-    async with aiohttp.ClientSession() as session2:
-        auth = await api.auth_telegram(
-            session=session2,
-            telegram_id=telegram_id,
-            first_name=user["first_name"],
-            last_name=user["last_name"],
-            phone_number=user["phone_number"],
-        )
-    access = auth["tokens"]["access"]
-    refresh = auth["tokens"]["refresh"]
-    await db.upsert_user_tokens(
-        telegram_id=telegram_id,
-        first_name=user["first_name"],
-        last_name=user["last_name"],
-        phone_number=user["phone_number"],
-        access_token=access,
-        refresh_token=refresh,
-        updated_at_iso=now_iso(),
-    )
-    return access
+    return update
 
 
-async def _load_org_page(message: Message, state: FSMContext, db: BotDB, api: ApiClient, page: int, edit_from: Message | None = None):
-    telegram_id = message.from_user.id
+async def _load_org_page(message: Message, state: FSMContext, db: BotDB, api: ApiClient, tokens: TokenManager, stager: MediaStager, telegram_id: int, page: int, edit_from: Message | None = None):
     user = await db.get_user(telegram_id)
     if not user:
-        await state.clear()
+        await _end_flow(state, stager, telegram_id)
         await message.answer("Avval /start qilib ro‘yxatdan o‘ting.", reply_markup=menu_kb())
         return
 
     async def fetch(access_token: str):
-        async with aiohttp.ClientSession() as session:
-            return await api.list_organizations(session=session, access_token=access_token, page=page)
+        return await api.list_organizations(access_token=access_token, page=page)
 
     try:
-        data = await fetch(user["access_token"])
+        data = await tokens.call(telegram_id, fetch)
     except ApiError as e:
-        if str(e) == "UNAUTHORIZED":
-            new_access = await _refresh_tokens(db, api, telegram_id, user)
-            data = await fetch(new_access)
-        else:
-            await message.answer(f"❌ Tashkilotlar yuklanmadi: {e}", reply_markup=menu_kb())
-            await state.clear()
-            return
+        await message.answer(f"❌ Tashkilotlar yuklanmadi: {e}", reply_markup=menu_kb())
+        await _end_flow(state, stager, telegram_id)
+        return
 
     results = data.get("results") or data.get("items") or data.get("data") or []
     has_next = bool(data.get("next"))
@@ -177,7 +190,7 @@ async def _load_org_page(message: Message, state: FSMContext, db: BotDB, api: Ap
 
 
 @router.message(F.text.startswith("Murojaat yuborish"))
-async def report_start(message: Message, state: FSMContext, db: BotDB):
+async def report_start(message: Message, state: FSMContext, db: BotDB, stager: MediaStager):
     telegram_id = message.from_user.id
     user = await db.get_user(telegram_id)
     if not user:
@@ -185,24 +198,22 @@ async def report_start(message: Message, state: FSMContext, db: BotDB):
         return
 
     await state.clear()
+    stager.discard(telegram_id)
     await state.set_state(ReportCreate.waiting_description)
     await state.update_data(media=_init_media_state())
-    await _touch_ttl(message, state)
 
     await message.answer("Muammoni matn ko‘rinishida yozing:", reply_markup=cancel_kb())
 
 
 @router.message(ReportCreate.waiting_description, F.text == "❌ Bekor qilish")
-async def cancel_from_description(message: Message, state: FSMContext):
-    await state.clear()
+async def cancel_from_description(message: Message, state: FSMContext, stager: MediaStager):
+    await _end_flow(state, stager, message.from_user.id)
     await message.answer("❌ Murojaat bekor qilindi.", reply_markup=menu_kb())
 
 
 @router.message(ReportCreate.waiting_description, F.text)
 async def report_got_description(message: Message, state: FSMContext):
-    if not await _ensure_not_expired(message, state):
-        return
-    await _touch_ttl(message, state)
+    await _touch_ttl(state)
 
     text = (message.text or "").strip()
     if len(text) < 5:
@@ -220,16 +231,14 @@ async def report_got_description(message: Message, state: FSMContext):
 
 
 @router.message(ReportCreate.collecting_media, F.text == "❌ Bekor qilish")
-async def report_cancel_media(message: Message, state: FSMContext):
-    await state.clear()
+async def report_cancel_media(message: Message, state: FSMContext, stager: MediaStager):
+    await _end_flow(state, stager, message.from_user.id)
     await message.answer("❌ Murojaat bekor qilindi.", reply_markup=menu_kb())
 
 
 @router.message(ReportCreate.collecting_media, F.text == "✅ Joylashuv yuborish")
 async def report_ask_location(message: Message, state: FSMContext):
-    if not await _ensure_not_expired(message, state):
-        return
-    await _touch_ttl(message, state)
+    await _touch_ttl(state)
 
     await state.set_state(ReportCreate.waiting_location)
     await message.answer("Muammo joylashuvini yuboring.", reply_markup=location_kb())
@@ -246,10 +255,8 @@ async def _reject_big(message: Message, size: int | None):
 
 
 @router.message(ReportCreate.collecting_media, F.photo)
-async def report_collect_photo(message: Message, state: FSMContext):
-    if not await _ensure_not_expired(message, state):
-        return
-    await _touch_ttl(message, state)
+async def report_collect_photo(message: Message, state: FSMContext, stager: MediaStager):
+    await _touch_ttl(state)
 
     data = await state.get_data()
     media = data.get("media") or _init_media_state()
@@ -267,14 +274,13 @@ async def report_collect_photo(message: Message, state: FSMContext):
 
     _append_file(files, photo.file_id, safe_filename(f"photo_{len(files)+1}.jpg"), "image/jpeg", size)
     await state.update_data(media=media)
+    stager.stage(message.bot, message.from_user.id, files[-1])
     await message.answer(f"✅ Rasm qo‘shildi ({len(files)}/{MAX_FILES}).", reply_markup=media_kb())
 
 
 @router.message(ReportCreate.collecting_media, F.video)
-async def report_collect_video(message: Message, state: FSMContext):
-    if not await _ensure_not_expired(message, state):
-        return
-    await _touch_ttl(message, state)
+async def report_collect_video(message: Message, state: FSMContext, stager: MediaStager):
+    await _touch_ttl(state)
 
     data = await state.get_data()
     media = data.get("media") or _init_media_state()
@@ -293,14 +299,13 @@ async def report_collect_video(message: Message, state: FSMContext):
     filename = safe_filename(v.file_name or f"video_{len(files)+1}.mp4")
     _append_file(files, v.file_id, filename, v.mime_type or "video/mp4", size)
     await state.update_data(media=media)
+    stager.stage(message.bot, message.from_user.id, files[-1])
     await message.answer(f"✅ Video qo‘shildi ({len(files)}/{MAX_FILES}).", reply_markup=media_kb())
 
 
 @router.message(ReportCreate.collecting_media, F.voice)
-async def report_collect_voice(message: Message, state: FSMContext):
-    if not await _ensure_not_expired(message, state):
-        return
-    await _touch_ttl(message, state)
+async def report_collect_voice(message: Message, state: FSMContext, stager: MediaStager):
+    await _touch_ttl(state)
 
     data = await state.get_data()
     media = data.get("media") or _init_media_state()
@@ -318,14 +323,13 @@ async def report_collect_voice(message: Message, state: FSMContext):
 
     _append_file(files, v.file_id, safe_filename(f"voice_{len(files)+1}.ogg"), v.mime_type or "audio/ogg", size)
     await state.update_data(media=media)
+    stager.stage(message.bot, message.from_user.id, files[-1])
     await message.answer(f"✅ Ovozli xabar qo‘shildi ({len(files)}/{MAX_FILES}).", reply_markup=media_kb())
 
 
 @router.message(ReportCreate.collecting_media, F.audio)
-async def report_collect_audio(message: Message, state: FSMContext):
-    if not await _ensure_not_expired(message, state):
-        return
-    await _touch_ttl(message, state)
+async def report_collect_audio(message: Message, state: FSMContext, stager: MediaStager):
+    await _touch_ttl(state)
 
     data = await state.get_data()
     media = data.get("media") or _init_media_state()
@@ -344,14 +348,13 @@ async def report_collect_audio(message: Message, state: FSMContext):
     filename = safe_filename(a.file_name or f"audio_{len(files)+1}.mp3")
     _append_file(files, a.file_id, filename, a.mime_type or guess_content_type(filename), size)
     await state.update_data(media=media)
+    stager.stage(message.bot, message.from_user.id, files[-1])
     await message.answer(f"✅ Audio qo‘shildi ({len(files)}/{MAX_FILES}).", reply_markup=media_kb())
 
 
 @router.message(ReportCreate.collecting_media, F.document)
-async def report_collect_document(message: Message, state: FSMContext):
-    if not await _ensure_not_expired(message, state):
-        return
-    await _touch_ttl(message, state)
+async def report_collect_document(message: Message, state: FSMContext, stager: MediaStager):
+    await _touch_ttl(state)
 
     data = await state.get_data()
     media = data.get("media") or _init_media_state()
@@ -370,20 +373,19 @@ async def report_collect_document(message: Message, state: FSMContext):
     filename = safe_filename(d.file_name or f"file_{len(files)+1}")
     _append_file(files, d.file_id, filename, d.mime_type or guess_content_type(filename), size)
     await state.update_data(media=media)
+    stager.stage(message.bot, message.from_user.id, files[-1])
     await message.answer(f"✅ Fayl qo‘shildi ({len(files)}/{MAX_FILES}).", reply_markup=media_kb())
 
 
 @router.message(ReportCreate.waiting_location, F.text == "❌ Bekor qilish")
-async def report_cancel_location(message: Message, state: FSMContext):
-    await state.clear()
+async def report_cancel_location(message: Message, state: FSMContext, stager: MediaStager):
+    await _end_flow(state, stager, message.from_user.id)
     await message.answer("❌ Murojaat bekor qilindi.", reply_markup=menu_kb())
 
 
 @router.message(ReportCreate.waiting_location, F.location)
-async def report_after_location_ask_org(message: Message, state: FSMContext, db: BotDB, api: ApiClient):
-    if not await _ensure_not_expired(message, state):
-        return
-    await _touch_ttl(message, state)
+async def report_after_location_ask_org(message: Message, state: FSMContext, db: BotDB, api: ApiClient, tokens: TokenManager, stager: MediaStager):
+    await _touch_ttl(state)
 
     lat = float(message.location.latitude)
     lon = float(message.location.longitude)
@@ -397,30 +399,55 @@ async def report_after_location_ask_org(message: Message, state: FSMContext, db:
         reply_markup=ReplyKeyboardRemove()
     )
 
-    await _load_org_page(message, state, db, api, page=1)
+    await _warn_duplicates(message, db, api, tokens, lat, lon)
+
+    await _load_org_page(message, state, db, api, tokens, stager, message.from_user.id, page=1)
+
+
+async def _warn_duplicates(message: Message, db: BotDB, api: ApiClient, tokens: TokenManager, lat: float, lon: float):
+    # Yaqin atrofda ochiq murojaatlar bo‘lsa ogohlantiramiz (bloklamaymiz).
+    # Xatolik bo‘lsa jim o‘tamiz — asosiy jarayon to‘xtamasin.
+    user = await db.get_user(message.from_user.id)
+    if not user:
+        return
+
+    try:
+        data = await tokens.call(
+            message.from_user.id, lambda access: api.find_duplicates(access, lat, lon),
+        )
+    except Exception:
+        return
+
+    items = data.get("results") or []
+    if not items:
+        return
+
+    count = data.get("count") or len(items)
+    lines = [f"⚠️ Shu joydan {data.get('radius_m', '')} m ichida {count} ta ochiq murojaat bor:"]
+    for d in items:
+        status = d.get("status") or ""
+        lines.append(f"• {d.get('distance_m', 0)} m — {STATUS_TITLE.get(status, status)}")
+    lines.append("\nAgar bu o‘sha muammo bo‘lsa, qayta yuborish shart emas.")
+    await message.answer("\n".join(lines))
 
 
 @router.callback_query(ReportCreate.waiting_organization, OrgCb.filter())
-async def org_pick_or_page(call: CallbackQuery, callback_data: OrgCb, state: FSMContext, db: BotDB, api: ApiClient):
-    # TTL tekshiruv
+async def org_pick_or_page(call: CallbackQuery, callback_data: OrgCb, state: FSMContext, db: BotDB, api: ApiClient, tokens: TokenManager, stager: MediaStager):
     msg = call.message
-    if not await _ensure_not_expired(msg, state):
-        await call.answer()
-        return
-    await _touch_ttl(msg, state)
+    await _touch_ttl(state)
 
     action = callback_data.action
     page = int(callback_data.page or 1)
 
     if action == "cancel":
-        await state.clear()
+        await _end_flow(state, stager, call.from_user.id)
         await msg.answer("❌ Murojaat bekor qilindi.", reply_markup=menu_kb())
         await call.answer()
         return
 
     if action == "page":
         await call.answer()
-        await _load_org_page(msg, state, db, api, page=page, edit_from=msg)
+        await _load_org_page(msg, state, db, api, tokens, stager, call.from_user.id, page=page, edit_from=msg)
         return
 
     if action == "pick":
@@ -455,22 +482,30 @@ async def org_pick_or_page(call: CallbackQuery, callback_data: OrgCb, state: FSM
     await call.answer()
 
 
+@router.callback_query(OrgCb.filter())
+async def org_pick_expired(call: CallbackQuery):
+    # state TTL tugab o‘chgan — eski tugma bosildi
+    await call.message.answer(
+        "⏳ Murojaat jarayoni eskirib ketdi. Qaytadan boshlang.",
+        reply_markup=menu_kb()
+    )
+    await call.answer()
+
+
 @router.message(ReportCreate.confirm, F.text == "❌ Bekor qilish")
-async def report_cancel_confirm(message: Message, state: FSMContext):
-    await state.clear()
+async def report_cancel_confirm(message: Message, state: FSMContext, stager: MediaStager):
+    await _end_flow(state, stager, message.from_user.id)
     await message.answer("❌ Murojaat bekor qilindi. Saqlanmadi.", reply_markup=menu_kb())
 
 
 @router.message(ReportCreate.confirm, F.text == "✅ Yuborish")
-async def report_submit_confirmed(message: Message, state: FSMContext, db: BotDB, api: ApiClient):
-    if not await _ensure_not_expired(message, state):
-        return
-    await _touch_ttl(message, state)
+async def report_submit_confirmed(message: Message, state: FSMContext, db: BotDB, api: ApiClient, tokens: TokenManager, stager: MediaStager):
+    await _touch_ttl(state)
 
     telegram_id = message.from_user.id
     user = await db.get_user(telegram_id)
     if not user:
-        await state.clear()
+        await _end_flow(state, stager, telegram_id)
         await message.answer("Avval /start qilib ro‘yxatdan o‘ting.")
         return
 
@@ -481,70 +516,68 @@ async def report_submit_confirmed(message: Message, state: FSMContext, db: BotDB
     organization_id = data.get("organization_id")
 
     if not organization_id:
-        await state.clear()
+        await _end_flow(state, stager, telegram_id)
         await message.answer("❌ Tashkilot tanlanmagan. Qaytadan urinib ko‘ring.", reply_markup=menu_kb())
         return
 
     files_meta = (data.get("media") or _init_media_state())["files"]
 
-    await message.answer("⏳ Yuborilyapti… iltimos biroz kuting.")
-
-    tg_files = []
+    # yana bir marta tekshiruv (yuklashdan oldin, metadata bo‘yicha)
     for item in files_meta:
-        file_id = item["file_id"]
-        filename = item["filename"]
-        ctype = item["content_type"]
-        size = item.get("size")
-
-        # yana bir marta tekshiruv
-        if _too_big(size):
+        if _too_big(item.get("size")):
             await message.answer(
-                f"❌ {filename} qabul qilinmadi. ({_fmt_mb(size)})\nMaks: {MAX_FILE_SIZE_MB}MB",
+                f"❌ {item['filename']} qabul qilinmadi. ({_fmt_mb(item.get('size'))})\nMaks: {MAX_FILE_SIZE_MB}MB",
                 reply_markup=menu_kb()
             )
-            await state.clear()
+            await _end_flow(state, stager, telegram_id)
             return
 
-        f = await message.bot.get_file(file_id)
+    progress = await message.answer("⏳ Yuborilyapti… iltimos biroz kuting.")
 
-        # get_file dan ham file_size chiqishi mumkin — yana tekshiramiz
-        f_size = getattr(f, "file_size", None)
-        if _too_big(f_size):
-            await message.answer(
-                f"❌ {filename} juda katta. ({_fmt_mb(f_size)})\nMaks: {MAX_FILE_SIZE_MB}MB",
-                reply_markup=menu_kb()
-            )
-            await state.clear()
-            return
+    # media yig‘ish paytida fonda yuklanganlari — faqat id lari yuboriladi,
+    # qolganlari (yiqilgan / bot restart bo‘lgan) shu yerda yuklanadi
+    staged = await stager.upload_ids(telegram_id, files_meta, timeout=DOWNLOAD_TIMEOUT)
+    upload_ids = [staged[item["file_id"]] for item in files_meta if item["file_id"] in staged]
+    rest = [item for item in files_meta if item["file_id"] not in staged]
 
-        stream = BytesIO()
-        await message.bot.download_file(f.file_path, stream)
-        tg_files.append((filename, stream.getvalue(), ctype))
+    try:
+        media = await fetch_attachments(message.bot, rest, on_progress=_progress_editor(progress))
+    except FileTooBig as e:
+        await message.answer(
+            f"❌ {e.filename} juda katta. ({_fmt_mb(e.size)})\nMaks: {MAX_FILE_SIZE_MB}MB",
+            reply_markup=menu_kb()
+        )
+        await _end_flow(state, stager, telegram_id)
+        return
+    except (asyncio.TimeoutError, TelegramAPIError, aiohttp.ClientError) as e:
+        log.warning("Attachment download failed (%s): %r", telegram_id, e)
+        # state saqlanadi — foydalanuvchi qayta ✅ Yuborish ni bosishi mumkin
+        await message.answer("❌ Fayllarni yuklab bo‘lmadi. Qaytadan ✅ Yuborish ni bosing.", reply_markup=confirm_kb())
+        return
 
-    async def submit(access_token: str):
-        async with aiohttp.ClientSession() as session:
+    try:
+        async def submit(access_token: str):
             return await api.create_report(
-                session=session,
                 access_token=access_token,
                 description=description,
                 latitude=lat,
                 longitude=lon,
                 organization_id=organization_id,
-                files=tg_files,
+                files=[m.field() for m in media],
+                uploads=upload_ids,
             )
 
-    try:
-        created = await submit(user["access_token"])
-    except ApiError as e:
-        if str(e) == "UNAUTHORIZED":
-            new_access = await _refresh_tokens(db, api, telegram_id, user)
-            created = await submit(new_access)
-        else:
+        try:
+            created = await tokens.call(telegram_id, submit)
+        except ApiError as e:
             await message.answer(f"❌ Murojaat yuborilmadi: {e}", reply_markup=menu_kb())
-            await state.clear()
+            await _end_flow(state, stager, telegram_id)
             return
+    finally:
+        for m in media:
+            m.close()
 
-    await state.clear()
+    await _end_flow(state, stager, telegram_id)
     await message.answer(
         f"✅ Murojaat saqlandi!\nID: {created.get('id')}\nStatus: {created.get('status')}",
         reply_markup=menu_kb()
@@ -1,4 +1,3 @@
-import aiohttp
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
@@ -7,13 +6,16 @@ from ..states import Registration
 from ..keyboards import menu_kb, phone_request_kb
 from ..db import BotDB
 from ..api import ApiClient, now_iso, ApiError
+from ..staging import MediaStager
 
 router = Router()
 
 
 @router.message(F.text.in_({"/start", "/restart"}))
-async def start(message: Message, state: FSMContext, db: BotDB):
+async def start(message: Message, state: FSMContext, db: BotDB, stager: MediaStager):
     await state.clear()
+    # tashlab ketilgan murojaat flow’ining fondagi yuklashlari
+    stager.discard(message.from_user.id)
 
     telegram_id = message.from_user.id
     user = await db.get_user(telegram_id)
@@ -67,18 +69,16 @@ async def reg_phone_contact(message: Message, state: FSMContext, db: BotDB, api:
     data = await state.get_data()
     telegram_id = message.from_user.id
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            resp = await api.auth_telegram(
-                session=session,
-                telegram_id=telegram_id,
-                first_name=data["first_name"],
-                last_name=data["last_name"],
-                phone_number=phone_number,
-            )
-        except ApiError as e:
-            await message.answer(f"❌ Ro‘yxatdan o‘tishda xatolik: {e}\nQayta urinib ko‘ring.")
-            return
+    try:
+        resp = await api.auth_telegram(
+            telegram_id=telegram_id,
+            first_name=data["first_name"],
+            last_name=data["last_name"],
+            phone_number=phone_number,
+        )
+    except ApiError as e:
+        await message.answer(f"❌ Ro‘yxatdan o‘tishda xatolik: {e}\nQayta urinib ko‘ring.")
+        return
 
     access = resp["tokens"]["access"]
     refresh = resp["tokens"]["refresh"]
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import multiprocessing as mp
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.types import Update
+
+log = logging.getLogger(__name__)
+
+POLLING_TIMEOUT = 30
+
+
+def shard_of(update: Update, workers: int) -> int:
+    """
+    Update qaysi worker ga: foydalanuvchi id bo'yicha. Bitta foydalanuvchining
+    barcha update lari bitta jarayonga tushadi — BotDB keshi va TokenManager
+    single-flight jarayon ichida to'g'ri qoladi.
+    """
+    user = getattr(update.event, "from_user", None)
+    return (user.id if user else 0) % workers
+
+
+async def distribute(
+    bot: Bot,
+    queues: List[mp.Queue],
+    allowed_updates: Optional[List[str]] = None,
+    polling_timeout: int = POLLING_TIMEOUT,
+):
+    """
+    Bosh jarayon: getUpdates (long polling) -> shard_of() bo'yicha navbatlarga.
+    Telegram bitta bot uchun bitta getUpdates iste'molchisiga ruxsat beradi,
+    shuning uchun polling faqat shu yerda.
+    """
+    offset = None
+    delay = 1.0
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset,
+                timeout=polling_timeout,
+                allowed_updates=allowed_updates,
+                request_timeout=polling_timeout + 10,
+            )
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            continue
+        except (TelegramNetworkError, TelegramServerError) as e:
+            log.warning("getUpdates failed: %s (retry in %.0fs)", e, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+            continue
+        delay = 1.0
+
+        for update in updates:
+            raw = update.model_dump(mode="json", exclude_unset=True, by_alias=True)
+            queues[shard_of(update, len(queues))].put(raw)
+            offset = update.update_id + 1
+
+
+async def _handle(bot: Bot, dp: Dispatcher, raw: Dict[str, Any]):
+    try:
+        await dp.feed_raw_update(bot, raw)
+    except Exception:
+        log.exception("Update %s failed", raw.get("update_id"))
+
+
+async def consume(bot: Bot, dp: Dispatcher, queue: mp.Queue):
+    """
+    Worker jarayon: navbatdagi update larni dp ga beradi (polling dagi
+    kabi har biri alohida task). None — to'xtash belgisi.
+    """
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    while True:
+        raw = await loop.run_in_executor(None, queue.get)
+        if raw is None:
+            break
+        task = asyncio.create_task(_handle(bot, dp, raw))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
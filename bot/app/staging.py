@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Dict, List
+
+from .api import ApiClient
+from .tokens import TokenManager
+from .utils import SpooledMedia
+
+log = logging.getLogger(__name__)
+
+# bir vaqtda fonda yuklanadigan fayllar (butun jarayon bo'yicha)
+STAGE_CONCURRENCY = 4
+
+
+class MediaStager:
+    """
+    Media yig'ish paytida har faylni fonda yuklaydi: Telegramdan olib,
+    backendga POST /reports/uploads/ (StagedUpload). Yuborishda faqat
+    id lar jo'natiladi.
+
+    Vazifalar jarayon xotirasida (telegram_id -> file_id -> Task). Bitta
+    foydalanuvchining update'lari doim bitta jarayonga tushadi (app.sharding),
+    restartdan keyin esa ro'yxat bo'sh — yuborishda yuklanmagan fayllar
+    avvalgidek shu yerda yuklab olinadi. Tashlab ketilgan fayllarni backend
+    o'zi tozalaydi (purge_staged_uploads).
+    """
+
+    def __init__(self, api: ApiClient, tokens: TokenManager, concurrency: int = STAGE_CONCURRENCY):
+        self.api = api
+        self.tokens = tokens
+        self._sem = asyncio.Semaphore(concurrency)
+        self._tasks: Dict[int, Dict[str, asyncio.Task]] = {}
+
+    def stage(self, bot, telegram_id: int, item: dict):
+        """
+        item: {file_id, filename, content_type, size} — fonda yuklashni boshlaydi.
+        """
+        tasks = self._tasks.setdefault(telegram_id, {})
+        if item["file_id"] not in tasks:
+            tasks[item["file_id"]] = asyncio.create_task(self._upload(bot, telegram_id, item))
+
+    async def _upload(self, bot, telegram_id: int, item: dict) -> str:
+        async with self._sem:
+            f = await bot.get_file(item["file_id"])
+            size = f.file_size if f.file_size is not None else item.get("size")
+            media = SpooledMedia(item["filename"], item["content_type"], size)
+            try:
+                await media.download(bot, f.file_path)
+
+                async def upload(access_token: str):
+                    return await self.api.upload_media(access_token, *media.field())
+
+                data = await self.tokens.call(telegram_id, upload)
+                return str(data["id"])
+            finally:
+                media.close()
+
+    async def upload_ids(self, telegram_id: int, files_meta: List[dict], timeout: float) -> Dict[str, str]:
+        """
+        file_id -> upload id. Hali tugamaganlarini `timeout` gacha kutadi;
+        yiqilgan yoki ulgurmaganlari natijada bo'lmaydi (chaqiruvchi o'zi yuklaydi).
+        """
+        tasks = self._tasks.get(telegram_id, {})
+        pending = {item["file_id"]: tasks[item["file_id"]] for item in files_meta if item["file_id"] in tasks}
+        if not pending:
+            return {}
+
+        done, _ = await asyncio.wait(pending.values(), timeout=timeout)
+        ids = {}
+        for file_id, task in pending.items():
+            if task not in done:
+                continue
+            if task.cancelled():
+                continue
+            if task.exception() is not None:
+                log.warning("Staged upload failed (%s, %s): %r", telegram_id, file_id, task.exception())
+                continue
+            ids[file_id] = task.result()
+        return ids
+
+    def discard(self, telegram_id: int):
+        """
+        Foydalanuvchining vazifalarini unutadi (tugamaganlari bekor qilinadi).
+        """
+        for task in self._tasks.pop(telegram_id, {}).values():
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+import aiosqlite
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+log = logging.getLogger(__name__)
+
+# bot/ papkasida — docker-compose da volume, konteyner qayta yaratilsa ham saqlanadi
+FSM_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot_fsm.sqlite3")
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS fsm (
+  key TEXT PRIMARY KEY,
+  chat_id INTEGER NOT NULL,
+  user_id INTEGER NOT NULL,
+  state TEXT,
+  data TEXT NOT NULL DEFAULT '{}',
+  expires_at REAL
+);
+"""
+CREATE_INDEX_SQL = "CREATE INDEX IF NOT EXISTS fsm_expires_at ON fsm (expires_at)"
+
+# muddati o'tgan qatorga yozilsa, ikkinchi ustun (state yoki data) ham tozalanadi —
+# eskirgan flow "tirilib" qolmasin
+UPSERT_SQL = """
+INSERT INTO fsm (key, chat_id, user_id, {col}, expires_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+  {col}=excluded.{col},
+  {other}=CASE WHEN fsm.expires_at <= ? THEN {other_empty} ELSE fsm.{other} END,
+  expires_at=excluded.expires_at
+"""
+UPSERT_STATE_SQL = UPSERT_SQL.format(col="state", other="data", other_empty="'{}'")
+UPSERT_DATA_SQL = UPSERT_SQL.format(col="data", other="state", other_empty="NULL")
+
+SELECT_SQL = "SELECT state, data FROM fsm WHERE key=? AND (expires_at IS NULL OR expires_at > ?)"
+DELETE_EMPTY_SQL = "DELETE FROM fsm WHERE key=? AND state IS NULL AND data='{}'"
+POP_EXPIRED_SQL = """
+DELETE FROM fsm WHERE key IN (SELECT key FROM fsm WHERE expires_at <= ? LIMIT ?)
+RETURNING chat_id, state
+"""
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    aiogram FSM storage — bitta SQLite fayl (WAL), bir nechta bot jarayoni
+    bitta faylni ishlatishi mumkin.
+
+    TTL: har yozishda expires_at = hozir + ttl. Muddati o'tgan qator
+    o'qilmaydi (state yo'q deb hisoblanadi); pop_expired() ularni o'chiradi
+    va (chat_id, state) qaytaradi — foydalanuvchiga xabar berish uchun.
+    Qator bitta DELETE ... RETURNING bilan olinadi, shuning uchun bir nechta
+    jarayonda ham har biri faqat bir marta qaytadi.
+    """
+
+    def __init__(self, path: str = FSM_DB_PATH, ttl: Optional[float] = None, key_builder: KeyBuilder | None = None):
+        self.path = path
+        self.ttl = ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._db: aiosqlite.Connection | None = None
+        self._open_lock = asyncio.Lock()
+
+    async def _conn(self) -> aiosqlite.Connection:
+        if self._db is None:
+            async with self._open_lock:
+                if self._db is None:
+                    db = await aiosqlite.connect(self.path)
+                    await db.execute("PRAGMA journal_mode=WAL")
+                    await db.execute("PRAGMA synchronous=NORMAL")
+                    # boshqa jarayon yozayotgan bo'lsa kutamiz
+                    await db.execute("PRAGMA busy_timeout=5000")
+                    await db.execute(CREATE_TABLE_SQL)
+                    await db.execute(CREATE_INDEX_SQL)
+                    await db.commit()
+                    self._db = db
+        return self._db
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def _write(self, key: StorageKey, sql: str, value: Optional[str], empty: bool):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        k = self.key_builder.build(key)
+        db = await self._conn()
+        await db.execute(sql, (k, key.chat_id, key.user_id, value, expires_at, now))
+        if empty:
+            await db.execute(DELETE_EMPTY_SQL, (k,))
+        await db.commit()
+
+    async def _read(self, key: StorageKey):
+        db = await self._conn()
+        async with db.execute(SELECT_SQL, (self.key_builder.build(key), time.time())) as cur:
+            return await cur.fetchone()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._write(key, UPSERT_STATE_SQL, value, empty=value is None)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await self._read(key)
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        value = json.dumps(dict(data), ensure_ascii=False) if data else "{}"
+        await self._write(key, UPSERT_DATA_SQL, value, empty=not data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await self._read(key)
+        return json.loads(row[1]) if row else {}
+
+    async def pop_expired(self, limit: int = 100) -> list[tuple[int, Optional[str]]]:
+        db = await self._conn()
+        async with db.execute(POP_EXPIRED_SQL, (time.time(), limit)) as cur:
+            rows = await cur.fetchall()
+        await db.commit()
+        return [(chat_id, state) for chat_id, state in rows]
+
+    async def run_expiry(
+        self,
+        on_expired: Callable[[int, Optional[str]], Awaitable[None]],
+        interval: float = 30.0,
+    ):
+        """
+        Har `interval` soniyada muddati o'tgan flowlarni o'chiradi va on_expired(chat_id, state) chaqiradi.
+        """
+        while True:
+            try:
+                for chat_id, state in await self.pop_expired():
+                    try:
+                        await on_expired(chat_id, state)
+                    except Exception:
+                        # bot bloklangan / tarmoq — jim
+                        log.debug("on_expired failed for %s", chat_id, exc_info=True)
+            except Exception:
+                log.exception("FSM expiry sweep failed")
+            await asyncio.sleep(interval)
+
+
+def make_storage(url: str, ttl: Optional[float] = None) -> BaseStorage:
+    """
+    FSM_STORAGE qiymatidan storage:
+      memory                     — jarayon xotirasi (TTL yo'q, faqat 1 jarayon)
+      redis://host:6379/0        — Redis-mos server (Redis, Valkey, KeyDB), native TTL;
+                                   `redis` paketi kerak
+      sqlite:///path yoki path   — SQLiteStorage (standart: bot/bot_fsm.sqlite3)
+    """
+    url = (url or "").strip()
+    if url == "memory":
+        return MemoryStorage()
+
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            from aiogram.fsm.storage.redis import DefaultKeyBuilder as RedisKeyBuilder, RedisStorage
+        except ImportError as e:
+            raise RuntimeError("FSM_STORAGE redis uchun `redis` paketi o'rnatilmagan (pip install redis).") from e
+        return RedisStorage.from_url(
+            url,
+            key_builder=RedisKeyBuilder(with_bot_id=True, with_destiny=True),
+            state_ttl=ttl,
+            data_ttl=ttl,
+        )
+
+    path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else url
+    return SQLiteStorage(path or FSM_DB_PATH, ttl=ttl)
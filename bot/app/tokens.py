@@ -0,0 +1,127 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from .api import ApiClient, ApiError, now_iso
+from .db import BotDB
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# access token tugashiga shuncha soniya qolganda oldindan yangilaymiz
+REFRESH_LEEWAY = 60
+
+
+def token_exp(token: str) -> float | None:
+    """
+    JWT payload idagi `exp` (imzo tekshirilmaydi — faqat muddatni bilish uchun).
+    """
+    try:
+        payload = token.split(".")[1]
+        data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(data["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def is_expiring(token: str, leeway: float = REFRESH_LEEWAY) -> bool:
+    exp = token_exp(token or "")
+    return exp is None or exp - leeway <= time.time()
+
+
+class TokenManager:
+    """
+    Foydalanuvchi access tokenlari:
+      - muddati tugashidan oldin o'zi yangilaydi (access_token())
+      - bitta telegram_id uchun parallel yangilashlar bitta so'rovga
+        birlashadi (single-flight) — qolganlar o'sha natijani kutadi
+      - saqlangan refresh_token bilan yangilaydi; u ham yaroqsiz bo'lsa
+        imzolangan token almashish (secret bo'lsa), oxirgi chora —
+        auth_telegram (to'liq login)
+    """
+
+    def __init__(self, db: BotDB, api: ApiClient, leeway: float = REFRESH_LEEWAY):
+        self.db = db
+        self.api = api
+        self.leeway = leeway
+        self._inflight: Dict[int, asyncio.Future] = {}
+
+    async def access_token(self, telegram_id: int) -> str:
+        user = await self.db.get_user(telegram_id)
+        if not user:
+            raise ApiError("NOT_REGISTERED")
+        if not is_expiring(user["access_token"], self.leeway):
+            return user["access_token"]
+        return await self.refresh(telegram_id, stale=user["access_token"])
+
+    async def refresh(self, telegram_id: int, stale: str | None = None) -> str:
+        """
+        Yangi access token. stale — 401 olgan token: boshqa so'rov allaqachon
+        yangilab qo'ygan bo'lsa, qayta yangilanmaydi.
+        """
+        pending = self._inflight.get(telegram_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._refresh(telegram_id, stale))
+            self._inflight[telegram_id] = pending
+            pending.add_done_callback(lambda _f: self._inflight.pop(telegram_id, None))
+        # shield: kutayotganlardan biri bekor qilinsa, yangilash to'xtamasin
+        return await asyncio.shield(pending)
+
+    async def _refresh(self, telegram_id: int, stale: str | None) -> str:
+        user = await self.db.get_user(telegram_id)
+        if not user:
+            raise ApiError("NOT_REGISTERED")
+
+        current = user["access_token"]
+        if current != stale and not is_expiring(current, self.leeway):
+            return current
+
+        try:
+            tokens = await self.api.refresh_token(user["refresh_token"])
+        except ApiError as e:
+            log.info("refresh token rad etildi (%s): %s", telegram_id, e)
+            tokens = await self._exchange_or_login(telegram_id, user)
+
+        access = tokens["access"]
+        await self.db.upsert_user_tokens(
+            telegram_id=telegram_id,
+            first_name=user["first_name"],
+            last_name=user["last_name"],
+            phone_number=user["phone_number"],
+            access_token=access,
+            # rotatsiya o'chiq bo'lsa javobda refresh bo'lmaydi
+            refresh_token=tokens.get("refresh") or user["refresh_token"],
+            updated_at_iso=now_iso(),
+        )
+        return access
+
+    async def _exchange_or_login(self, telegram_id: int, user: dict) -> dict:
+        if self.api.secret:
+            try:
+                return await self.api.exchange_token(telegram_id)
+            except ApiError as e:
+                log.info("token almashish bo'lmadi (%s): %s", telegram_id, e)
+        auth = await self.api.auth_telegram(
+            telegram_id=telegram_id,
+            first_name=user["first_name"],
+            last_name=user["last_name"],
+            phone_number=user["phone_number"],
+        )
+        return auth["tokens"]
+
+    async def call(self, telegram_id: int, fn: Callable[[str], Awaitable[T]]) -> T:
+        """
+        fn(access_token) ni chaqiradi; 401 bo'lsa token yangilanib bir marta qayta uriladi.
+        """
+        access = await self.access_token(telegram_id)
+        try:
+            return await fn(access)
+        except ApiError as e:
+            if str(e) != "UNAUTHORIZED":
+                raise
+        access = await self.refresh(telegram_id, stale=access)
+        return await fn(access)
@@ -1,6 +1,8 @@
 import mimetypes
+import os
+import tempfile
 from io import BytesIO
-from typing import Tuple
+from typing import Any, Tuple
 
 def guess_content_type(filename: str) -> str:
     ctype, _ = mimetypes.guess_type(filename)
@@ -9,3 +11,48 @@ def guess_content_type(filename: str) -> str:
 def safe_filename(default_name: str) -> str:
     # juda oddiy sanitizatsiya
     return default_name.replace("/", "_").replace("\\", "_")
+
+
+# shundan kichik fayllar xotirada, kattalari vaqtinchalik faylda
+MEDIA_SPOOL_MAX_SIZE = int(os.getenv("MEDIA_SPOOL_MAX_KB", "1024")) * 1024
+
+# Telegramdan yuklash bo'lagi
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class SpooledMedia:
+    """
+    Telegramdan yuklangan bitta fayl. Hajmi (Telegram file_size) ma'lum va
+    MEDIA_SPOOL_MAX_SIZE dan kichik bo'lsa BytesIO, aks holda diskdagi
+    vaqtinchalik fayl — bitta murojaat uchun xotira cheklangan.
+    field() har chaqiriqda yangi qiymat beradi (401 dan keyin qayta yuborish uchun).
+    """
+
+    def __init__(self, filename: str, content_type: str, size: int | None = None):
+        self.filename = filename
+        self.content_type = content_type
+        if isinstance(size, int) and size <= MEDIA_SPOOL_MAX_SIZE:
+            self.file = BytesIO()
+        else:
+            self.file = tempfile.TemporaryFile()
+
+    async def download(self, bot, file_path: str):
+        # bo'laklab, to'g'ridan-to'g'ri self.file ga
+        await bot.download_file(file_path, destination=self.file, chunk_size=DOWNLOAD_CHUNK_SIZE)
+
+    def field(self) -> Tuple[str, Any, str]:
+        """
+        (filename, content, content_type) — aiohttp FormData uchun.
+        Kichik fayl -> bytes, katta -> fayl obyekti (aiohttp bo'laklab o'qiydi).
+        aiohttp yuborgandan keyin faylni yopadi — shuning uchun dublikat deskriptor.
+        """
+        if isinstance(self.file, BytesIO):
+            content = self.file.getvalue()
+        else:
+            self.file.flush()
+            content = open(os.dup(self.file.fileno()), "rb")
+            content.seek(0)
+        return (self.filename, content, self.content_type)
+
+    def close(self):
+        self.file.close()
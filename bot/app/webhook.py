@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import List
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from .sharding import shard_of
+
+log = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class UpdatePool:
+    """
+    Webhook update'lari uchun cheklangan worker puli:
+      - `workers` ta navbat, har biriga bitta coroutine — bir vaqtda ko'pi
+        bilan `workers` ta update ishlanadi
+      - update foydalanuvchi id bo'yicha navbatga tushadi (shard_of) —
+        bitta foydalanuvchining update'lari kelgan tartibda, ketma-ket
+      - navbat to'la bo'lsa submit() `put_timeout` kutadi, keyin False —
+        webhook 503 qaytaradi va Telegram update'ni keyinroq qayta yuboradi
+    """
+
+    def __init__(self, bot: Bot, dp: Dispatcher, workers: int = 32, queue_size: int = 100, put_timeout: float = 5.0):
+        self.bot = bot
+        self.dp = dp
+        self.put_timeout = put_timeout
+        self.queues: List[asyncio.Queue] = [asyncio.Queue(queue_size) for _ in range(workers)]
+        self._tasks: List[asyncio.Task] = []
+        self.handled = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run(q)) for q in self.queues]
+
+    async def submit(self, update: Update) -> bool:
+        queue = self.queues[shard_of(update, len(self.queues))]
+        try:
+            await asyncio.wait_for(queue.put(update), self.put_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        return True
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            update = await queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self.handled += 1
+            except Exception:
+                self.failed += 1
+                log.exception("Update %s failed", update.update_id)
+            finally:
+                queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "handled": self.handled,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queued": sum(q.qsize() for q in self.queues),
+        }
+
+    async def close(self):
+        """
+        Navbatdagilarni tugatib, workerlarni to'xtatadi.
+        """
+        for q in self.queues:
+            await q.join()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def build_app(pool: UpdatePool, path: str, secret: str = "") -> web.Application:
+    async def handle(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": pool.bot})
+        except ValueError:
+            return web.Response(status=400)
+        if not await pool.submit(update):
+            return web.Response(status=503)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, handle)
+    return app
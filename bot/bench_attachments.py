@@ -0,0 +1,149 @@
+"""
+Murojaat yuborish bosqichi uchun lokal benchmark: soxta Telegram
+(getFile + fayl yuklash, sun'iy kechikish bilan) va soxta backend
+(/reports/, /reports/uploads/). fetch_attachments + create_report umumiy
+vaqtini turli parallellik darajasida o'lchaydi (concurrency=1 — avvalgi
+ketma-ket yuklash). "staged" — fayllar media yig'ish paytida MediaStager
+bilan oldindan yuklangan, ✅ Yuborish da faqat id lar jo'natiladi.
+
+    python bot/bench_attachments.py --files 10 --size-kb 300 --rtt-ms 80
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+from app.api import ApiClient
+from app.handlers.report import fetch_attachments
+from app.staging import MediaStager
+
+
+def fake_servers(blob: bytes, rtt: float) -> web.Application:
+    async def get_file(request):
+        await asyncio.sleep(rtt)
+        data = await request.post()
+        file_id = data["file_id"]
+        return web.json_response({
+            "ok": True,
+            "result": {"file_id": file_id, "file_unique_id": file_id, "file_size": len(blob), "file_path": f"photos/{file_id}.jpg"},
+        })
+
+    async def download(request):
+        await asyncio.sleep(rtt)
+        return web.Response(body=blob)
+
+    async def drain_multipart(request):
+        if request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            while (part := await reader.next()) is not None:
+                while await part.read_chunk():
+                    pass
+        else:
+            await request.read()
+
+    async def create_report(request):
+        await drain_multipart(request)
+        return web.json_response({"id": 1, "status": "new"}, status=201)
+
+    async def upload(request):
+        await drain_multipart(request)
+        return web.json_response({"id": str(uuid.uuid4()), "type": "image"}, status=201)
+
+    app = web.Application(client_max_size=0)
+    app.router.add_post("/bot{token}/getFile", get_file)
+    app.router.add_get("/file/bot{token}/{path:.+}", download)
+    app.router.add_post("/api/reports/", create_report)
+    app.router.add_post("/api/reports/uploads/", upload)
+    return app
+
+
+async def submit_once(bot, api, files_meta, concurrency):
+    started = time.perf_counter()
+    media = await fetch_attachments(bot, files_meta, concurrency=concurrency)
+    try:
+        await api.create_report(
+            access_token="bench",
+            description="bench",
+            latitude=41.3,
+            longitude=69.2,
+            organization_id="1",
+            files=[m.field() for m in media],
+        )
+    finally:
+        for m in media:
+            m.close()
+    return time.perf_counter() - started
+
+
+class StaticTokens:
+    async def call(self, telegram_id, fn):
+        return await fn("bench")
+
+
+async def submit_staged(bot, api, files_meta):
+    """
+    Fayllar yig'ish paytida yuklangan (kutib turiladi); o'lchanadi faqat ✅ Yuborish qismi.
+    """
+    stager = MediaStager(api, StaticTokens())
+    for item in files_meta:
+        stager.stage(bot, 1, item)
+    await stager.upload_ids(1, files_meta, timeout=60)
+
+    started = time.perf_counter()
+    staged = await stager.upload_ids(1, files_meta, timeout=60)
+    await api.create_report(
+        access_token="bench",
+        description="bench",
+        latitude=41.3,
+        longitude=69.2,
+        organization_id="1",
+        files=[],
+        uploads=[staged[item["file_id"]] for item in files_meta],
+    )
+    return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--size-kb", type=int, default=300)
+    parser.add_argument("--rtt-ms", type=float, default=80.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 10])
+    args = parser.parse_args()
+
+    runner = web.AppRunner(fake_servers(os.urandom(args.size_kb * 1024), args.rtt_ms / 1000))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    bot = Bot("123456:BENCH", session=AiohttpSession(api=TelegramAPIServer.from_base(base)))
+    api = ApiClient(base + "/api")
+    await api.start()
+
+    files_meta = [
+        {"file_id": f"f{i}", "filename": f"photo_{i + 1}.jpg", "content_type": "image/jpeg", "size": args.size_kb * 1024}
+        for i in range(args.files)
+    ]
+
+    print(f"{args.files} fayl x {args.size_kb} KB, RTT {args.rtt_ms} ms")
+    try:
+        for concurrency in args.concurrency:
+            runs = sorted([await submit_once(bot, api, files_meta, concurrency) for _ in range(args.repeat)])
+            print(f"concurrency={concurrency:<3} median {runs[len(runs) // 2] * 1000:7.1f} ms  max {runs[-1] * 1000:7.1f} ms")
+        runs = sorted([await submit_staged(bot, api, files_meta) for _ in range(args.repeat)])
+        print(f"staged          median {runs[len(runs) // 2] * 1000:7.1f} ms  max {runs[-1] * 1000:7.1f} ms")
+    finally:
+        await api.close()
+        await bot.session.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""
+Webhook rejimi uchun lokal benchmark: sintetik Telegram update'larini
+webhook serverga yuboradi va turli pul o'lchamlarida o'tkazuvchanlik,
+kechikish (so'rov -> handler tugashi) va foydalanuvchi bo'yicha tartibni
+o'lchaydi. Telegram ga ulanmaydi.
+
+    python bot/bench_webhook.py --updates 2000 --users 200 --work-ms 20
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import web
+
+from app.webhook import UpdatePool, build_app
+
+PATH = "/tg/webhook"
+
+
+def synthetic_update(update_id: int, user_id: int, seq: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+            "text": str(seq),
+        },
+    }
+
+
+async def run(workers: int, args) -> dict:
+    sent_at, done_at, seen = {}, {}, {}
+    disorder = 0
+
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message):
+        nonlocal disorder
+        await asyncio.sleep(args.work_ms / 1000)  # handler ichidagi API / DB kutish
+        seq = int(message.text)
+        if seq < seen.get(message.from_user.id, -1):
+            disorder += 1
+        seen[message.from_user.id] = seq
+        done_at[message.message_id] = time.perf_counter()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot("123456:BENCH")
+    pool = UpdatePool(bot, dp, workers=workers, queue_size=args.queue)
+    pool.start()
+
+    runner = web.AppRunner(build_app(pool, PATH))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    url = f"http://127.0.0.1:{port}{PATH}"
+
+    updates = [
+        synthetic_update(i, 1000 + i % args.users, i // args.users)
+        for i in range(args.updates)
+    ]
+    statuses = {}
+    sem = asyncio.Semaphore(args.connections)
+
+    async def post(session, upd):
+        async with sem:
+            sent_at[upd["update_id"]] = time.perf_counter()
+            async with session.post(url, json=upd) as r:
+                statuses[r.status] = statuses.get(r.status, 0) + 1
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=args.connections)) as session:
+        # bitta foydalanuvchining update'lari ketma-ket (Telegram kabi), foydalanuvchilar parallel
+        async def replay_user(user_updates):
+            for upd in user_updates:
+                await post(session, upd)
+
+        by_user = {}
+        for upd in updates:
+            by_user.setdefault(upd["message"]["from"]["id"], []).append(upd)
+        await asyncio.gather(*(replay_user(u) for u in by_user.values()))
+
+    await pool.close()
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+    await bot.session.close()
+
+    lat = sorted(done_at[i] - sent_at[i] for i in done_at)
+    return {
+        "workers": workers,
+        "upd_s": len(done_at) / elapsed,
+        "p50_ms": lat[len(lat) // 2] * 1000 if lat else 0,
+        "p95_ms": lat[int(len(lat) * 0.95)] * 1000 if lat else 0,
+        "statuses": statuses,
+        "disorder": disorder,
+        **pool.stats(),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--work-ms", type=float, default=20.0)
+    parser.add_argument("--connections", type=int, default=40)  # Telegram max_connections
+    parser.add_argument("--queue", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32, 64])
+    args = parser.parse_args()
+
+    print(f"{args.updates} update, {args.users} user, handler {args.work_ms} ms")
+    for workers in args.workers:
+        r = await run(workers, args)
+        print(
+            f"workers={r['workers']:<4} {r['upd_s']:8.1f} upd/s  p50 {r['p50_ms']:7.1f} ms  "
+            f"p95 {r['p95_ms']:7.1f} ms  http={r['statuses']}  tartib buzilishi={r['disorder']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
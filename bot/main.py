@@ -1,31 +1,179 @@
 import asyncio
+import logging
+import multiprocessing as mp
+import signal
+from functools import partial
+
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiohttp import web
 
 from app.config import get_settings
 from app.db import BotDB
 from app.api import ApiClient
+from app.tokens import TokenManager
+from app.staging import MediaStager
+from app.storage import make_storage
+from app.sharding import consume, distribute
+from app.webhook import UpdatePool, build_app
 from app.handlers.init import get_routers
+from app.handlers.report import notify_flow_expired
+
+log = logging.getLogger(__name__)
 
-async def main():
-    settings = get_settings()
 
+async def setup(settings):
     bot = Bot(token=settings.bot_token)
-    dp = Dispatcher(storage=MemoryStorage())
+    storage = make_storage(settings.fsm_storage, ttl=settings.fsm_ttl)
+    dp = Dispatcher(storage=storage)
 
     db = BotDB()
     await db.init()
 
-    api = ApiClient(settings.api_base_url)
+    # bitta sessiya (keep-alive pul) — barcha handlerlar uchun
+    api = ApiClient(settings.api_base_url, secret=settings.api_secret)
+    await api.start()
 
     # dependencies (oddiy usul: dp["db"]=..., handlerda parametr sifatida ishlatamiz)
+    # token yangilash (single-flight) — barcha handlerlar uchun bitta
+    tokens = TokenManager(db, api)
+    # media yig'ish paytida fonda yuklash
+    stager = MediaStager(api, tokens)
+
     dp["db"] = db
     dp["api"] = api
+    dp["tokens"] = tokens
+    dp["stager"] = stager
 
     for r in get_routers():
         dp.include_router(r)
 
-    await dp.start_polling(bot, db=db, api=api)
+    return bot, dp
+
+
+async def cleanup(bot, dp):
+    log.info("API stats: %s", dp["api"].stats_snapshot())
+    log.info("BotDB cache: %s", dp["db"].cache_stats())
+    await dp["api"].close()
+    await dp["db"].close()
+    await dp.storage.close()
+    await bot.session.close()
+
+
+def _start_expiry(bot, dp):
+    # SQLite storage muddati o'tgan flowlar haqida xabar beradi (Redis TTL jim o'chiradi)
+    run_expiry = getattr(dp.storage, "run_expiry", None)
+    if run_expiry is None:
+        return None
+    return asyncio.create_task(run_expiry(partial(notify_flow_expired, bot, dp["stager"])))
+
+
+def _cancel_on_signals():
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+
+
+async def run_polling(settings):
+    bot, dp = await setup(settings)
+    expiry = _start_expiry(bot, dp)
+    try:
+        # avval webhook rejimida ishlagan bo'lsa getUpdates ishlamaydi
+        await bot.delete_webhook()
+        await dp.start_polling(
+            bot, db=dp["db"], api=dp["api"], tokens=dp["tokens"], stager=dp["stager"], close_bot_session=False,
+        )
+    finally:
+        if expiry:
+            expiry.cancel()
+        await cleanup(bot, dp)
+
+
+async def _worker(queue):
+    bot, dp = await setup(get_settings())
+    expiry = _start_expiry(bot, dp)
+    try:
+        await consume(bot, dp, queue)
+    finally:
+        if expiry:
+            expiry.cancel()
+        await cleanup(bot, dp)
+
+
+def worker_main(queue):
+    # to'xtatishni bosh jarayon boshqaradi (navbatga None)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker(queue))
+
+
+async def run_sharded(settings):
+    ctx = mp.get_context("spawn")
+    queues = [ctx.Queue() for _ in range(settings.workers)]
+    procs = [ctx.Process(target=worker_main, args=(q,), daemon=True) for q in queues]
+    for p in procs:
+        p.start()
+
+    # faqat update turlarini aniqlash uchun (handlerlar workerlarda ishlaydi)
+    dp = Dispatcher()
+    dp.include_routers(*get_routers())
+    bot = Bot(token=settings.bot_token)
+    loop = asyncio.get_running_loop()
+    _cancel_on_signals()
+
+    log.info("Sharded polling: %s workers", settings.workers)
+    try:
+        await bot.delete_webhook()
+        await distribute(bot, queues, allowed_updates=dp.resolve_used_update_types())
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for q in queues:
+            q.put(None)
+        for p in procs:
+            await loop.run_in_executor(None, p.join, 30)
+        await bot.session.close()
+
+
+async def run_webhook(settings):
+    bot, dp = await setup(settings)
+    expiry = _start_expiry(bot, dp)
+    pool = UpdatePool(bot, dp, workers=settings.webhook_workers, queue_size=settings.webhook_queue)
+    pool.start()
+
+    runner = web.AppRunner(build_app(pool, settings.webhook_path, settings.webhook_secret))
+    await runner.setup()
+    await web.TCPSite(runner, settings.webhook_host, settings.webhook_port).start()
+    _cancel_on_signals()
+
+    try:
+        await bot.set_webhook(
+            settings.webhook_url,
+            secret_token=settings.webhook_secret or None,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=min(100, settings.webhook_workers),
+        )
+        log.info("Webhook: %s -> %s:%s%s", settings.webhook_url, settings.webhook_host, settings.webhook_port, settings.webhook_path)
+        await asyncio.Event().wait()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        # yangi so'rov qabul qilinmaydi, navbatdagilar tugatiladi
+        await runner.cleanup()
+        await pool.close()
+        log.info("Webhook pool: %s", pool.stats())
+        if expiry:
+            expiry.cancel()
+        await cleanup(bot, dp)
+
+
+async def main():
+    settings = get_settings()
+    if settings.mode == "webhook":
+        await run_webhook(settings)
+    elif settings.workers > 1:
+        await run_sharded(settings)
+    else:
+        await run_polling(settings)
 
 if __name__ == "__main__":
     asyncio.run(main())
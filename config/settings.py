@@ -51,7 +51,8 @@ INSTALLED_APPS = [
     'users',
     'reports',
     'organizations',
-    'dashboard'
+    'dashboard',
+    'notifications',
 ]
 
 REST_FRAMEWORK ={
@@ -107,7 +108,8 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # docker-compose: web va fon workerlari bitta bazani ko'rishi uchun umumiy volume dagi yo'l
+        'NAME': os.getenv("SQLITE_PATH") or BASE_DIR / 'db.sqlite3',
     }
 }
 
@@ -184,6 +186,41 @@ SWAGGER_SETTINGS = {
 }
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Bot -> backend imzolangan so'rovlar (users.bot_auth); bo'sh bo'lsa token almashish o'chiq
+BOT_API_SECRET = os.getenv("BOT_API_SECRET", "")
+BOT_SIGNATURE_MAX_AGE = int(os.getenv("BOT_SIGNATURE_MAX_AGE", "300"))
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+# Outbox worker (notifications): Telegram umumiy limiti ~30 xabar/soniya
+TELEGRAM_OUTBOX_RATE = float(os.getenv("TELEGRAM_OUTBOX_RATE", "25"))
+TELEGRAM_OUTBOX_CONCURRENCY = int(os.getenv("TELEGRAM_OUTBOX_CONCURRENCY", "10"))
+TELEGRAM_OUTBOX_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_OUTBOX_MAX_ATTEMPTS", "8"))
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024
-FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024
\ No newline at end of file
+# bundan katta multipart fayllar xotirada emas, vaqtinchalik faylda turadi
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("FILE_UPLOAD_MAX_MEMORY_KB", "2560")) * 1024
+# Dublikat murojaatlar: shu radius (metr) va shu kunlar ichidagi ochiq reportlar
+REPORT_DUPLICATE_RADIUS_M = int(os.getenv("REPORT_DUPLICATE_RADIUS_M", "100"))
+REPORT_DUPLICATE_WINDOW_DAYS = int(os.getenv("REPORT_DUPLICATE_WINDOW_DAYS", "14"))
+# Oldindan yuklangan (report ga biriktirilmagan) fayllar shuncha soatdan keyin o'chiriladi
+STAGED_UPLOAD_TTL_HOURS = int(os.getenv("STAGED_UPLOAD_TTL_HOURS", "24"))
+# Bo'laklab yuklash (reports.uploads): fayl va bitta bo'lak uchun chegara
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv("CHUNKED_UPLOAD_MAX_MB", "500")) * 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK = int(os.getenv("CHUNKED_UPLOAD_MAX_CHUNK_MB", "8")) * 1024 * 1024
+# Oldindan va bo'laklab yuklanadigan fayllar uchun ruxsat etilgan mime turlari (prefiks)
+UPLOAD_ALLOWED_MIME_PREFIXES = tuple(os.getenv(
+    "UPLOAD_ALLOWED_MIME_PREFIXES",
+    "image/,video/,audio/,text/plain,application/pdf,application/msword,"
+    "application/vnd.openxmlformats-officedocument.,application/vnd.ms-,application/vnd.oasis.opendocument.",
+).split(","))
+# Hech bir attachment ishlatmayotgan blob shuncha soatdan keyin o'chiriladi (gc_blobs)
+BLOB_GC_GRACE_HOURS = int(os.getenv("BLOB_GC_GRACE_HOURS", "24"))
+# Rasm/video attachment lar uchun WebP nusxalar (run_preview_worker): eng uzun tomon, px
+ATTACHMENT_PREVIEW_SIZES = [int(x) for x in os.getenv("ATTACHMENT_PREVIEW_SIZES", "320,1024").split(",")]
+ATTACHMENT_PREVIEW_QUALITY = int(os.getenv("ATTACHMENT_PREVIEW_QUALITY", "80"))
+# Yuklangan rasmlarni fonda kichraytirish va qayta kodlash (EXIF olib tashlanadi).
+# INGEST_IMAGE_MAX_SIDE=0 — o'chiq. Asl nusxa INGEST_KEEP_ORIGINAL bo'lsa saqlanadi.
+INGEST_IMAGE_MAX_SIDE = int(os.getenv("INGEST_IMAGE_MAX_SIDE", "2048"))
+INGEST_IMAGE_FORMAT = os.getenv("INGEST_IMAGE_FORMAT", "WEBP").upper()
+INGEST_IMAGE_QUALITY = int(os.getenv("INGEST_IMAGE_QUALITY", "82"))
+INGEST_MIN_SAVING = float(os.getenv("INGEST_MIN_SAVING", "0.1"))
+INGEST_KEEP_ORIGINAL = os.getenv("INGEST_KEEP_ORIGINAL", "0") == "1"
@@ -0,0 +1,67 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from dashboard.stats import report_stats
+from organizations.models import Organization
+from reports.choices import ReportStatus
+from reports.models import Report
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "report_stats() uchun benchmark: sintetik reportlar ustida so'rovlar soni "
+        "va vaqtni o'lchaydi. Ma'lumotlar oxirida rollback qilinadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+        parser.add_argument("--batch", type=int, default=5000)
+
+    def handle(self, *args, **opts):
+        sizes = sorted(opts["sizes"])
+        batch = opts["batch"]
+        statuses = ReportStatus.values
+
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create(username="bench_stats_user")
+                org = Organization.objects.create(name="bench_stats_org")
+                created = 0
+
+                self.stdout.write(f"{'rows':>10} {'queries':>8} {'ms':>10}")
+                for size in sizes:
+                    while created < size:
+                        n = min(batch, size - created)
+                        Report.objects.bulk_create([
+                            Report(
+                                user=user,
+                                organization=org,
+                                description="bench",
+                                latitude=Decimal("41.311100"),
+                                longitude=Decimal("69.279700"),
+                                status=statuses[(created + i) % len(statuses)],
+                            )
+                            for i in range(n)
+                        ], batch_size=batch)
+                        created += n
+
+                    qs = Report.objects.filter(organization=org)
+                    with CaptureQueriesContext(connection) as ctx:
+                        t0 = time.perf_counter()
+                        report_stats(qs)
+                        elapsed = (time.perf_counter() - t0) * 1000
+
+                    self.stdout.write(f"{size:>10} {len(ctx.captured_queries):>8} {elapsed:>10.1f}")
+
+                raise _Rollback()
+        except _Rollback:
+            pass
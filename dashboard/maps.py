@@ -0,0 +1,192 @@
+# dashboard/maps.py
+"""
+Leaflet xaritalari uchun yordamchilar: viewport (bbox) bo'yicha
+yengil nuqtalar yoki server tomonda guruhlangan klasterlar.
+"""
+import hashlib
+
+from django.db.models import Count, FloatField, Max, Min, Sum
+from django.db.models.functions import Cast, Floor, Substr
+
+from reports.choices import ReportStatus
+from reports.geo import CLUSTER_ZOOMS, cell_range, cell_size
+from reports.models import Report, ReportClusterCell, ReportDailyCounter
+
+
+# Shundan ko'p nuqta bo'lsa — klaster qaytaramiz
+MAX_POINTS = 1000
+
+MAX_ZOOM = 19
+
+POPUP_DESCRIPTION_CHARS = 80
+
+_STATUS_LABELS = dict(ReportStatus.choices)
+
+
+def parse_bbox(raw: str):
+    """
+    "west,south,east,north" -> (w, s, e, n) yoki None.
+    """
+    try:
+        w, s, e, n = [float(x) for x in (raw or "").split(",")]
+    except ValueError:
+        return None
+
+    w, e = max(-180.0, w), min(180.0, e)
+    s, n = max(-90.0, s), min(90.0, n)
+    if w >= e or s >= n:
+        return None
+    return w, s, e, n
+
+
+def parse_zoom(raw) -> int:
+    try:
+        z = int(raw)
+    except (TypeError, ValueError):
+        z = 12
+    return max(0, min(MAX_ZOOM, z))
+
+
+def map_etag(params, organization_id=None) -> str:
+    """
+    Javobni qurmasdan ETag: so'rov parametrlari + qamrovdagi eng oxirgi
+    updated_at (indeks bo'yicha: (organization, updated_at) yoki updated_at)
+    va ReportDailyCounter dagi son (o'chirishda rollup kamaytiradi).
+    Reportlar jadvali skan qilinmaydi; 304 da nuqta/klaster so'rovlari
+    umuman bajarilmaydi.
+    """
+    reports = Report.objects.order_by()
+    counters = ReportDailyCounter.objects.order_by()
+    if organization_id:
+        reports = reports.filter(organization_id=organization_id)
+        counters = counters.filter(organization_id=organization_id)
+    last = reports.aggregate(last=Max("updated_at"))["last"]
+    total = counters.aggregate(n=Sum("count"))["n"]
+    key = f"{sorted(params.lists())}|{total}|{last}"
+    return '"%s"' % hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def in_bbox(qs, bbox):
+    # Report.grid_cell indeksi orqali (ReportQuerySet.in_bbox)
+    return qs.in_bbox(*bbox)
+
+
+def light_points(qs, limit: int = MAX_POINTS):
+    """
+    Popup uchun yetarli minimal maydonlar. `limit + 1` ta o'qiymiz —
+    sig'maganini bilish uchun.
+    """
+    rows = (
+        qs.order_by("-created_at")
+        .annotate(short_description=Substr("description", 1, POPUP_DESCRIPTION_CHARS))
+        .values(
+            "id", "latitude", "longitude", "status", "created_at",
+            "organization__name", "user__username", "user__first_name", "user__last_name",
+            "short_description",
+        )[: limit + 1]
+    )
+
+    points = []
+    for r in rows:
+        points.append({
+            "id": str(r["id"]),
+            "lat": float(r["latitude"]),
+            "lng": float(r["longitude"]),
+            "status": r["status"],
+            "status_label": _STATUS_LABELS.get(r["status"], r["status"]),
+            "org": r["organization__name"] or "-",
+            "created_at": r["created_at"].isoformat() if r["created_at"] else None,
+            "user_username": r["user__username"] or "",
+            "user_full_name": f"{r['user__first_name'] or ''} {r['user__last_name'] or ''}".strip(),
+            "description": r["short_description"] or "",
+        })
+    return points
+
+
+def _merge_cells(rows):
+    """
+    (cy, cx, status, count, lat_sum, lng_sum) qatorlarini katak bo'yicha
+    birlashtiradi: markaz, jami son va status taqsimoti.
+    """
+    cells = {}
+    for cy, cx, status, count, lat_sum, lng_sum in rows:
+        if not count:
+            continue
+        c = cells.setdefault((cy, cx), {"count": 0, "lat_sum": 0.0, "lng_sum": 0.0, "statuses": {}})
+        c["count"] += count
+        c["lat_sum"] += lat_sum
+        c["lng_sum"] += lng_sum
+        c["statuses"][status] = c["statuses"].get(status, 0) + count
+
+    return [
+        {
+            "lat": round(c["lat_sum"] / c["count"], 6),
+            "lng": round(c["lng_sum"] / c["count"], 6),
+            "count": c["count"],
+            "statuses": c["statuses"],
+        }
+        for c in cells.values()
+    ]
+
+
+def grid_clusters(qs, zoom: int):
+    """
+    Nuqtalarni zoom ga mos katakka bo'lib, har katak uchun markaz,
+    son va status taqsimotini qaytaradi (reportlarning o'zidan, SQL da).
+    """
+    size = cell_size(zoom)
+    lat = Cast("latitude", FloatField())
+    lng = Cast("longitude", FloatField())
+
+    rows = (
+        qs.order_by()
+        .annotate(cy=Floor(lat / size), cx=Floor(lng / size))
+        .values("cy", "cx", "status")
+        .annotate(count=Count("id"), lat_sum=Sum(lat), lng_sum=Sum(lng))
+        .values_list("cy", "cx", "status", "count", "lat_sum", "lng_sum")
+    )
+    return _merge_cells(rows)
+
+
+def has_cluster_layer(zoom: int) -> bool:
+    return zoom in CLUSTER_ZOOMS
+
+
+def layer_clusters(bbox, zoom: int, organization_id=None, statuses=None):
+    """
+    Oldindan hisoblangan ReportClusterCell qatlamidan klasterlar.
+    Narxi reportlar soniga emas, ko'rinib turgan kataklar soniga bog'liq.
+    organization_id=None -> barcha tashkilotlar.
+    """
+    cy0, cy1, cx0, cx1 = cell_range(bbox, zoom)
+    qs = ReportClusterCell.objects.filter(
+        zoom=zoom, cy__gte=cy0, cy__lte=cy1, cx__gte=cx0, cx__lte=cx1, count__gt=0,
+    )
+    if organization_id:
+        qs = qs.filter(organization_id=organization_id)
+    if statuses:
+        qs = qs.filter(status__in=statuses)
+
+    return _merge_cells(qs.values_list("cy", "cx", "status", "count", "lat_sum", "lng_sum"))
+
+
+def points_extent(qs):
+    """
+    Boshlang'ich xarita ko'rinishi uchun [[south, west], [north, east]] yoki None.
+    """
+    ext = qs.order_by().aggregate(
+        s=Min("latitude"), n=Max("latitude"), w=Min("longitude"), e=Max("longitude"),
+    )
+    if ext["s"] is None:
+        return None
+    return [[float(ext["s"]), float(ext["w"])], [float(ext["n"]), float(ext["e"])]]
+
+
+def map_filters_query(request) -> str:
+    """
+    Sahifadagi filterlar (org/q/status) — xarita endpointiga uzatish uchun.
+    """
+    params = request.GET.copy()
+    for key in ("page", "bbox", "zoom"):
+        params.pop(key, None)
+    return params.urlencode()
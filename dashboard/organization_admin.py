@@ -8,12 +8,13 @@ from django.db import transaction
 from users.models import User
 from users.choices import UserChoices
 from reports.models import Report
+from reports.search import search_reports
 from organizations.models import Organization, OrganizationMember
-from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Count
 import json
 
+from .maps import map_filters_query, points_extent
+from .stats import report_stats, rollup_stats, status_chart_values
+
 
 def org_admin_required(view_func):
     @login_required
@@ -282,6 +283,16 @@ def _get_user_organization(user):
     return None
 
 
+def filter_org_reports(reports, q: str, statuses):
+    """
+    Org dashboard filterlari (dashboard va xarita endpointi uchun umumiy).
+    """
+    if statuses:
+        reports = reports.filter(status__in=statuses)
+
+    return search_reports(reports, q)
+
+
 @login_required
 @user_passes_test(_is_org_admin, login_url="/login/")
 def organization_admin_dashboard(request):
@@ -294,31 +305,19 @@ def organization_admin_dashboard(request):
     q = (request.GET.get("q") or "").strip()
     selected_statuses = request.GET.getlist("status")  # bo'sh bo'lsa -> hammasi
 
-    reports = Report.objects.select_related("user", "organization").filter(organization=org)
+    reports = filter_org_reports(Report.objects.filter(organization=org), q, selected_statuses)
 
+    # ---- KPI (kartalar + status + trend) ----
+    # q bo'lmasa rollup jadvalidan, aks holda reportlarning o'zidan sanaymiz
     if q:
-        reports = reports.filter(
-            Q(description__icontains=q)
-            | Q(user__username__icontains=q)
-            | Q(user__first_name__icontains=q)
-            | Q(user__last_name__icontains=q)
-            | Q(user__phone_number__icontains=q)
-        )
-
-    if selected_statuses:
-        reports = reports.filter(status__in=selected_statuses)
-
-    # ---- KPI ----
-    now = timezone.localtime()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    week_start = today_start - timedelta(days=7)
+        stats = report_stats(reports)
+    else:
+        stats = rollup_stats(organization_id=org.id, statuses=selected_statuses)
 
-    total_count = reports.count()
-    today_count = reports.filter(created_at__gte=today_start).count()
-    week_count = reports.filter(created_at__gte=week_start).count()
-
-    status_counts_global_qs = reports.values("status").annotate(c=Count("id"))
-    status_counts_global = {row["status"]: row["c"] for row in status_counts_global_qs}
+    total_count = stats["total"]
+    today_count = stats["today"]
+    week_count = stats["week"]
+    status_counts_global = stats["status_counts"]
 
     # ---- Status options (sizdagi choice/label'ga mos) ----
     # Agar Report modelida status choices bo'lsa:
@@ -341,54 +340,17 @@ def organization_admin_dashboard(request):
                 ("redirected", "Yo‘naltirilgan"),
             ]
 
-    # ---- Points (Leaflet uchun) ----
-    points = []
-    for r in reports:
-        # status label (agar get_status_uz bo'lsa ishlatamiz, bo'lmasa display)
-        if hasattr(r, "get_status_uz"):
-            status_label = r.get_status_uz()
-        else:
-            try:
-                status_label = r.get_status_display()
-            except Exception:
-                status_label = r.status
-
-        u = r.user
-        points.append(
-            {
-                "id": str(r.id),
-                "lat": float(r.latitude) if r.latitude is not None else None,
-                "lng": float(r.longitude) if r.longitude is not None else None,
-                "status": r.status,
-                "status_label": status_label,
-                "description": r.description or "",
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-                "org": org.name,
-
-                "user_username": getattr(u, "username", "") if u else "",
-                "user_full_name": (f"{getattr(u,'first_name','') or ''} {getattr(u,'last_name','') or ''}").strip() if u else "",
-                "user_phone": getattr(u, "phone_number", "") if u else "",
-                "user": getattr(u, "username", "") if u else "",
-            }
-        )
+    # ---- Xarita: nuqtalar viewport bo'yicha dashboard:map_points dan olinadi ----
+    map_extent = points_extent(reports)
 
     # ---- Charts ----
     # Status chart (labels/values) - filtered holat bo'yicha
     chart_status_labels = [lbl for key, lbl in status_options]
-    chart_status_values_filtered = [status_counts_global.get(key, 0) for key, _lbl in status_options]
+    chart_status_values_filtered = status_chart_values(status_counts_global, status_options)
 
     # 7 kunlik trend
-    days = []
-    day_labels = []
-    for i in range(6, -1, -1):
-        d = today_start - timedelta(days=i)
-        days.append(d)
-        day_labels.append(d.strftime("%d/%m"))
-
-    day_values = []
-    for d in days:
-        d2 = d + timedelta(days=1)
-        day_values.append(reports.filter(created_at__gte=d, created_at__lt=d2).count())
+    day_labels = stats["days_labels"]
+    day_values = stats["days_values"]
 
     context = {
         "org": org,
@@ -402,7 +364,8 @@ def organization_admin_dashboard(request):
         "week_count": week_count,
         "status_counts_global": status_counts_global,
 
-        "points": json.dumps(points, ensure_ascii=False),
+        "map_extent": json.dumps(map_extent),
+        "map_query": map_filters_query(request),
 
         "chart_status_labels": json.dumps(chart_status_labels, ensure_ascii=False),
         "chart_status_values_filtered": json.dumps(chart_status_values_filtered, ensure_ascii=False),
@@ -0,0 +1,107 @@
+# dashboard/stats.py
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from reports.choices import ReportStatus
+from reports.models import ReportDailyCounter
+
+
+TREND_DAYS = 7
+
+
+def _day_windows(today_start, days: int):
+    """
+    Oxirgi `days` kunlik oynalar: [(label, d0, d1), ...] (eskidan yangiga).
+    """
+    windows = []
+    for i in range(days - 1, -1, -1):
+        d0 = today_start - timedelta(days=i)
+        d1 = d0 + timedelta(days=1)
+        windows.append((d0.strftime("%d/%m"), d0, d1))
+    return windows
+
+
+def _windows_for(now, days: int):
+    now = timezone.localtime(now)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today_start - timedelta(days=7)
+    return today_start, week_start, _day_windows(today_start, days)
+
+
+def _pack(row: dict, windows) -> dict:
+    return {
+        "total": row["total"],
+        "today": row["today"],
+        "week": row["week"],
+        "status_counts": {key: row[f"status_{key}"] for key in ReportStatus.values},
+        "days_labels": [label for label, _d0, _d1 in windows],
+        "days_values": [row[f"day_{i}"] for i in range(len(windows))],
+    }
+
+
+def report_stats(qs, days: int = TREND_DAYS, now=None) -> dict:
+    """
+    Dashboard kartalari, status taqsimoti va kunlik trendni
+    BITTA so'rovda hisoblaydi (conditional aggregate).
+
+    Natija:
+      {
+        "total": int, "today": int, "week": int,
+        "status_counts": {"new": 3, ...},
+        "days_labels": ["01/01", ...], "days_values": [0, ...],
+      }
+    """
+    today_start, week_start, windows = _windows_for(now, days)
+
+    aggregates = {
+        "total": Count("id"),
+        "today": Count("id", filter=Q(created_at__gte=today_start)),
+        "week": Count("id", filter=Q(created_at__gte=week_start)),
+    }
+    for key in ReportStatus.values:
+        aggregates[f"status_{key}"] = Count("id", filter=Q(status=key))
+    for i, (_label, d0, d1) in enumerate(windows):
+        aggregates[f"day_{i}"] = Count("id", filter=Q(created_at__gte=d0, created_at__lt=d1))
+
+    row = qs.order_by().aggregate(**aggregates)
+    return _pack(row, windows)
+
+
+def rollup_stats(organization_id=None, statuses=None, days: int = TREND_DAYS, now=None) -> dict:
+    """
+    report_stats() bilan bir xil natija, lekin ReportDailyCounter dan o'qiydi:
+    narxi reportlar soniga emas, kunlar*statuslar soniga bog'liq.
+    Matnli qidiruv (q) bo'lsa ishlatib bo'lmaydi — u holda report_stats().
+
+    organization_id=None -> barcha tashkilotlar (global).
+    """
+    today_start, week_start, windows = _windows_for(now, days)
+
+    qs = ReportDailyCounter.objects.all()
+    if organization_id:
+        qs = qs.filter(organization_id=organization_id)
+    if statuses:
+        qs = qs.filter(status__in=statuses)
+
+    def total(q=None):
+        return Coalesce(Sum("count", filter=q), 0)
+
+    aggregates = {
+        "total": total(),
+        "today": total(Q(day__gte=today_start.date())),
+        "week": total(Q(day__gte=week_start.date())),
+    }
+    for key in ReportStatus.values:
+        aggregates[f"status_{key}"] = total(Q(status=key))
+    for i, (_label, d0, _d1) in enumerate(windows):
+        aggregates[f"day_{i}"] = total(Q(day=d0.date()))
+
+    row = qs.order_by().aggregate(**aggregates)
+    return _pack(row, windows)
+
+
+def status_chart_values(status_counts: dict, status_options) -> list:
+    return [status_counts.get(key, 0) for key, _label in status_options]
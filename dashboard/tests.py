@@ -1,3 +1,137 @@
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import QueryDict
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from organizations.models import Organization
+from reports.choices import ReportStatus
+from reports.models import Report
+from reports.rollup import rebuild_clusters, rebuild_counters, set_status
+
+from . import views
+from .maps import map_etag
+from .stats import report_stats, rollup_stats
+
+
+class ReportStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="reporter")
+        cls.org = Organization.objects.create(name="Org")
+
+    def _make(self, n, status=ReportStatus.NEW):
+        Report.objects.bulk_create([
+            Report(
+                user=self.user,
+                organization=self.org,
+                description="x",
+                latitude=Decimal("41.3"),
+                longitude=Decimal("69.2"),
+                status=status,
+            )
+            for _ in range(n)
+        ])
+
+    def test_counts(self):
+        self._make(3)
+        self._make(2, ReportStatus.RESOLVED)
+
+        stats = report_stats(Report.objects.all())
+
+        self.assertEqual(stats["total"], 5)
+        self.assertEqual(stats["today"], 5)
+        self.assertEqual(stats["week"], 5)
+        self.assertEqual(stats["status_counts"][ReportStatus.NEW], 3)
+        self.assertEqual(stats["status_counts"][ReportStatus.RESOLVED], 2)
+        self.assertEqual(stats["status_counts"][ReportStatus.REJECTED], 0)
+        self.assertEqual(len(stats["days_values"]), 7)
+        self.assertEqual(stats["days_values"][-1], 5)
+
+    def test_query_count_is_constant(self):
+        for n in (1, 50):
+            self._make(n)
+            with self.assertNumQueries(1):
+                report_stats(Report.objects.filter(organization=self.org))
+
+    def test_rollup_matches_report_stats(self):
+        self._make(4)
+        self._make(1, ReportStatus.REJECTED)
+        rebuild_counters()
+
+        self.assertEqual(
+            rollup_stats(organization_id=self.org.id),
+            report_stats(Report.objects.filter(organization=self.org)),
+        )
+
+
+class MapPointsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create(username="admin", is_superuser=True)
+        user = User.objects.create(username="reporter")
+        org = Organization.objects.create(name="Org")
+        for lat, lng in (("41.30", "69.20"), ("41.31", "69.21"), ("40.00", "65.00")):
+            Report.objects.create(
+                user=user, organization=org, description="x",
+                latitude=Decimal(lat), longitude=Decimal(lng),
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_bbox_and_etag(self):
+        url = "/map/points/?bbox=69,41,70,42&zoom=14"
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["type"], "points")
+        self.assertEqual(len(r.json()["points"]), 2)
+
+        # 304 — nuqtalar so'rovi bajarilmaydi
+        with mock.patch.object(views, "light_points") as points:
+            r2 = self.client.get(url, HTTP_IF_NONE_MATCH=r["ETag"])
+        self.assertEqual(r2.status_code, 304)
+        points.assert_not_called()
+
+        # status o'zgarsa ETag ham o'zgaradi
+        report = Report.objects.first()
+        set_status(report, ReportStatus.RESOLVED)
+        r3 = self.client.get(url, HTTP_IF_NONE_MATCH=r["ETag"])
+        self.assertEqual(r3.status_code, 200)
+        self.assertNotEqual(r3["ETag"], r["ETag"])
+
+        # o'chirish — rollup soni orqali
+        Report.objects.exclude(pk=report.pk).first().delete()
+        r4 = self.client.get(url, HTTP_IF_NONE_MATCH=r3["ETag"])
+        self.assertEqual(r4.status_code, 200)
+        self.assertNotEqual(r4["ETag"], r3["ETag"])
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN")
+    def test_etag_does_not_scan_reports(self):
+        org = Organization.objects.get()
+        indexes = [i.name for i in Report._meta.indexes if "updated_at" in i.fields]
+        for org_id in (None, org.id):
+            with CaptureQueriesContext(connection) as ctx:
+                map_etag(QueryDict("bbox=1,2,3,4"), org_id)
+            sql = next(q["sql"] for q in ctx.captured_queries if "reports_report" in q["sql"])
+            with connection.cursor() as cur:
+                cur.execute("EXPLAIN QUERY PLAN " + sql)
+                plan = " ".join(row[-1] for row in cur.fetchall())
+            self.assertTrue(any(name in plan for name in indexes), plan)
+
+    def test_bad_bbox(self):
+        self.assertEqual(self.client.get("/map/points/?bbox=1,2").status_code, 400)
+
+    def test_cluster_layer(self):
+        rebuild_clusters()
+        with mock.patch.object(views, "MAX_POINTS", 1):
+            r = self.client.get("/map/points/?bbox=60,35,75,45&zoom=5")
 
-# Create your tests here.
+        data = r.json()
+        self.assertEqual(data["type"], "clusters")
+        self.assertEqual(sum(c["count"] for c in data["clusters"]), 3)
+        self.assertEqual(sum(c["statuses"].get(ReportStatus.NEW, 0) for c in data["clusters"]), 3)
@@ -15,6 +15,7 @@ urlpatterns = [
     path("users/<uuid:pk>/", views.user_detail, name="user_detail"),
     path("shikoyatlar/<uuid:pk>/", views.report_detail, name="report_detail"),
     path("report/<uuid:pk>/", views.report_detail_json, name="report_detail_json"),
+    path("map/points/", views.map_points, name="map_points"),
 
     path("org/", organization_admin.organization_admin_dashboard, name="org-dashboard"),
     path("org-admin/users/", organization_admin.org_users_list, name="org_users"),
@@ -1,3 +1,5 @@
+import json
+
 from django.contrib.auth import login
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
@@ -11,16 +13,36 @@ from organizations.models import Organization, OrganizationMember
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.contrib import messages
-from django.http import JsonResponse
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from datetime import timedelta
 from django.http import Http404
 from users.choices import UserChoices
+from utils.pagination import keyset_page
 from django.http import HttpResponseForbidden
 from django.db.models import Prefetch
-from utils.telegram import send_telegram_message
+from reports.rollup import set_status
+from reports.search import search_reports
+from notifications.outbox import enqueue_telegram_message
 
 
 from .forms import LoginForm
+from .maps import (
+    MAX_POINTS,
+    grid_clusters,
+    has_cluster_layer,
+    in_bbox,
+    layer_clusters,
+    light_points,
+    map_etag,
+    map_filters_query,
+    parse_bbox,
+    parse_zoom,
+    points_extent,
+)
+from .organization_admin import _get_user_organization, _is_org_admin, filter_org_reports
+from .stats import report_stats, rollup_stats, status_chart_values
 
 
 User = get_user_model()
@@ -82,24 +104,17 @@ def complaints_list(request):
 
     qs = Report.objects.all().order_by("-created_at")
 
-    if q:
-        qs = qs.filter(
-            Q(description__icontains=q) |
-            Q(id__icontains=q)
-        )
+    qs = search_reports(qs, q)
 
     if status:
         qs = qs.filter(status=status)
 
-    paginator = Paginator(qs, per_page)
-    page_number = request.GET.get("page") or 1
-    page_obj = paginator.get_page(page_number)
+    page_obj = keyset_page(qs, request.GET.get("cursor") or "", per_page, with_count=True)
 
     status_choices = ReportStatus.choices
 
     context = {
         "page_obj": page_obj,
-        "paginator": paginator,
         "q": q,
         "status": status,
         "per_page": per_page,
@@ -273,7 +288,7 @@ def report_detail(request, pk):
         Report.objects
         .select_related("user", "organization")
         .prefetch_related(
-            "attachments",
+            "attachments__blob",
 
             # ✅ reads ichida organization/read_by ni ham olib kelamiz
             Prefetch(
@@ -410,6 +425,19 @@ def _status_uz(status: str) -> str:
     return m.get(status, str(status))
 
 
+def filter_superadmin_reports(qs, org_id, statuses, q: str):
+    """
+    Superadmin dashboard filterlari (dashboard va xarita endpointi uchun umumiy).
+    """
+    if org_id:
+        qs = qs.filter(organization_id=org_id)
+
+    if statuses:
+        qs = qs.filter(status__in=statuses)
+
+    return search_reports(qs, q)
+
+
 @login_required
 def superadmin_dashboard(request):
     if not request.user.is_superuser:
@@ -418,19 +446,12 @@ def superadmin_dashboard(request):
     # --------- Base queryset (for global stats) ----------
     base_qs = Report.objects.select_related("user", "organization").order_by("-created_at")
 
-    now = timezone.now()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    week_start = now - timedelta(days=7)
-
-    # Global counters
-    total_count = base_qs.count()
-    today_count = base_qs.filter(created_at__gte=today_start).count()
-    week_count = base_qs.filter(created_at__gte=week_start).count()
-
-    # Status counters (global)
-    status_counts_global = dict(
-        base_qs.values("status").annotate(c=Count("id")).values_list("status", "c")
-    )
+    # Global counters + status + trend (rollup jadvalidan)
+    global_stats = rollup_stats()
+    total_count = global_stats["total"]
+    today_count = global_stats["today"]
+    week_count = global_stats["week"]
+    status_counts_global = global_stats["status_counts"]
 
     # --------- Filters (GET) ----------
     org_id = request.GET.get("org") or ""
@@ -443,60 +464,34 @@ def superadmin_dashboard(request):
         if s:
             selected_statuses = [s]
 
-    qs = base_qs
-    if org_id:
-        qs = qs.filter(organization_id=org_id)
-
-    if selected_statuses:
-        qs = qs.filter(status__in=selected_statuses)
-
-    if q:
-        qs = qs.filter(description__icontains=q) | qs.filter(user__username__icontains=q) | qs.filter(user__email__icontains=q)
+    qs = filter_superadmin_reports(base_qs, org_id, selected_statuses, q)
 
     # organizations
     organizations = Organization.objects.filter(is_active=True).order_by("name")
 
-    # --------- Map points (limit) ----------
-    map_reports = qs.exclude(latitude__isnull=True).exclude(longitude__isnull=True)[:1500]
-    points = []
-    for r in map_reports:
-        points.append({
-            "id": str(r.id),
-            "lat": float(r.latitude),
-            "lng": float(r.longitude),
-            "status": r.status,
-            "status_label": _status_uz(r.status),
-            "org": r.organization.name if r.organization else "-",
-            "org_id": str(r.organization_id) if r.organization_id else "",
-            "created_at": r.created_at.isoformat(),
-            "user": r.user.username,
-            "user_full_name": f"{(r.user.first_name or '').strip()} {(r.user.last_name or '').strip()}".strip(),
-            "user_username": r.user.username or "",
-            "description": r.description or ""
-        })
+    # --------- Map: nuqtalar viewport bo'yicha map_points dan olinadi ----------
+    map_extent = points_extent(qs)
 
-    # --------- Table pagination ----------
-    paginator = Paginator(qs, 20)
-    page_obj = paginator.get_page(request.GET.get("page") or 1)
+    # --------- Table pagination (keyset: COUNT/OFFSET siz) ----------
+    page_obj = keyset_page(qs, request.GET.get("cursor") or "", 20)
 
     # --------- Charts data ----------
-    # 1) Filterlangan status taqsimoti
-    status_counts_filtered = dict(
-        qs.values("status").annotate(c=Count("id")).values_list("status", "c")
-    )
+    # Filter bo'lmasa global statistikani qayta ishlatamiz (ortiqcha so'rovsiz).
+    # Matnli qidiruvni rollup bilmaydi — faqat shunda reportlarning o'zidan sanaymiz.
+    if q:
+        filtered_stats = report_stats(qs)
+    elif org_id or selected_statuses:
+        filtered_stats = rollup_stats(organization_id=org_id, statuses=selected_statuses)
+    else:
+        filtered_stats = global_stats
 
     chart_status_labels = [label for _, label in STATUS_OPTIONS]
-    chart_status_values_filtered = [status_counts_filtered.get(key, 0) for key, _ in STATUS_OPTIONS]
-    chart_status_values_global = [status_counts_global.get(key, 0) for key, _ in STATUS_OPTIONS]
-
-    # 2) 7 kunlik trend: har kun nechta report
-    days = []
-    day_counts = []
-    for i in range(6, -1, -1):
-        d0 = (today_start - timedelta(days=i))
-        d1 = d0 + timedelta(days=1)
-        days.append(d0.strftime("%d/%m"))
-        day_counts.append(qs.filter(created_at__gte=d0, created_at__lt=d1).count())
+    chart_status_values_filtered = status_chart_values(filtered_stats["status_counts"], STATUS_OPTIONS)
+    chart_status_values_global = status_chart_values(status_counts_global, STATUS_OPTIONS)
+
+    # 7 kunlik trend: har kun nechta report
+    days = filtered_stats["days_labels"]
+    day_counts = filtered_stats["days_values"]
 
     context = {
         # cards
@@ -513,7 +508,8 @@ def superadmin_dashboard(request):
         "q": q,
 
         # map/table
-        "points": points,
+        "map_extent": json.dumps(map_extent),
+        "map_query": map_filters_query(request),
         "page_obj": page_obj,
 
         # charts
@@ -534,7 +530,7 @@ def report_detail_json(request, pk):
     r = (
         Report.objects.select_related("user", "organization")
         .prefetch_related(
-            "attachments",
+            "attachments__blob",
             "reads__organization", "reads__read_by",
             "assignments__assigned_to", "assignments__assigned_by",
             "redirects__from_organization", "redirects__to_organization",
@@ -548,6 +544,9 @@ def report_detail_json(request, pk):
             "type": getattr(a, "type", ""),
             "name": getattr(a, "original_name", "") or "file",
             "url": a.file.url if getattr(a, "file", None) else "",
+            # WebP nusxalar (reports.previews): {"320": url, ...}, thumb — eng kichigi
+            "thumb": a.thumbnail_url,
+            "previews": a.preview_urls,
         })
 
     events = []
@@ -604,6 +603,67 @@ def report_detail_json(request, pk):
 
 
 
+@login_required
+def map_points(request):
+    """
+    GET /map/points/?bbox=w,s,e,n&zoom=12[&scope=org][&org=..&q=..&status=..]
+
+    Faqat ko'rinib turgan hudud uchun yengil nuqtalar, ular juda ko'p bo'lsa —
+    server tomonda guruhlangan klasterlar. ETag + If-None-Match (304) qo'llanadi.
+    """
+    bbox = parse_bbox(request.GET.get("bbox"))
+    if not bbox:
+        return JsonResponse({"detail": "bbox noto‘g‘ri (west,south,east,north)."}, status=400)
+    zoom = parse_zoom(request.GET.get("zoom"))
+
+    q = (request.GET.get("q") or "").strip()
+    statuses = request.GET.getlist("status")
+
+    if request.GET.get("scope") == "org":
+        if not _is_org_admin(request.user):
+            return HttpResponseForbidden("Forbidden")
+        org = _get_user_organization(request.user)
+        if not org:
+            raise Http404()
+        org_id = org.id
+        qs = filter_org_reports(Report.objects.filter(organization=org), q, statuses)
+    else:
+        if not request.user.is_superuser:
+            return HttpResponseForbidden("Forbidden")
+        org_id = request.GET.get("org") or ""
+        qs = filter_superadmin_reports(Report.objects.all(), org_id, statuses, q)
+
+    # ETag javob tanasidan emas — arzon kirishlardan, 304 da hech narsa hisoblanmaydi
+    etag = map_etag(request.GET, org_id)
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    qs = in_bbox(qs, bbox)
+    data = None
+
+    # Matnli qidiruv bo'lmasa — oldindan hisoblangan klaster qatlamidan o'qiymiz
+    if not q and has_cluster_layer(zoom):
+        clusters = layer_clusters(bbox, zoom, organization_id=org_id, statuses=statuses)
+        if sum(c["count"] for c in clusters) > MAX_POINTS:
+            data = {"type": "clusters", "zoom": zoom, "clusters": clusters}
+
+    if data is None:
+        points = light_points(qs)
+        if len(points) <= MAX_POINTS:
+            data = {"type": "points", "zoom": zoom, "points": points}
+        else:
+            data = {"type": "clusters", "zoom": zoom, "clusters": grid_clusters(qs, zoom)}
+
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 def _get_org_admin_membership(request):
     """
     Org adminni aniqlaydi va organizationni qaytaradi.
@@ -636,12 +696,12 @@ def org_reports_list(request):
     # Incoming filters
     iq = (request.GET.get("iq") or "").strip()
     iper_page = request.GET.get("iper_page") or "10"
-    ipage = request.GET.get("ipage") or 1
+    icursor = request.GET.get("icursor") or ""
 
     # Resolved filters
     rq = (request.GET.get("rq") or "").strip()
     rper_page = request.GET.get("rper_page") or "10"
-    rpage = request.GET.get("rpage") or 1
+    rcursor = request.GET.get("rcursor") or ""
 
     def parse_per_page(v):
         try:
@@ -655,42 +715,32 @@ def org_reports_list(request):
 
     base_qs = Report.objects.filter(organization=org).select_related("user", "organization").order_by("-created_at")
 
-    # ======= KPI / statistikalar =======
-    total_count = base_qs.count()
-    new_count = base_qs.filter(status=ReportStatus.NEW).count()
-    sent_count = base_qs.filter(status=ReportStatus.SENT).count()
-    read_count = base_qs.filter(status=ReportStatus.READ).count()
-    accepted_count = base_qs.filter(status=ReportStatus.ACCEPTED).count()
-    in_progress_count = base_qs.filter(status=ReportStatus.IN_PROGRESS).count()
-    resolved_count = base_qs.filter(status=ReportStatus.RESOLVED).count()
-    rejected_count = base_qs.filter(status=ReportStatus.REJECTED).count()
-    redirected_count = base_qs.filter(status=ReportStatus.REDIRECTED).count()
+    # ======= KPI / statistikalar (rollup jadvalidan) =======
+    stats = rollup_stats(organization_id=org.id)
+    counts = stats["status_counts"]
+    total_count = stats["total"]
+    new_count = counts[ReportStatus.NEW]
+    sent_count = counts[ReportStatus.SENT]
+    read_count = counts[ReportStatus.READ]
+    accepted_count = counts[ReportStatus.ACCEPTED]
+    in_progress_count = counts[ReportStatus.IN_PROGRESS]
+    resolved_count = counts[ReportStatus.RESOLVED]
+    rejected_count = counts[ReportStatus.REJECTED]
+    redirected_count = counts[ReportStatus.REDIRECTED]
 
     # ======= Incoming (resolved emas) =======
     incoming_qs = base_qs.exclude(status=ReportStatus.RESOLVED)
 
-    if iq:
-        incoming_qs = incoming_qs.filter(
-            Q(description__icontains=iq) |
-            Q(user__username__icontains=iq) |
-            Q(user__first_name__icontains=iq) |
-            Q(user__last_name__icontains=iq)
-        )
+    incoming_qs = search_reports(incoming_qs, iq)
 
-    incoming_page_obj = Paginator(incoming_qs, iper_page).get_page(ipage)
+    incoming_page_obj = keyset_page(incoming_qs, icursor, iper_page, with_count=True)
 
     # ======= Resolved =======
     resolved_qs = base_qs.filter(status=ReportStatus.RESOLVED)
 
-    if rq:
-        resolved_qs = resolved_qs.filter(
-            Q(description__icontains=rq) |
-            Q(user__username__icontains=rq) |
-            Q(user__first_name__icontains=rq) |
-            Q(user__last_name__icontains=rq)
-        )
+    resolved_qs = search_reports(resolved_qs, rq)
 
-    resolved_page_obj = Paginator(resolved_qs, rper_page).get_page(rpage)
+    resolved_page_obj = keyset_page(resolved_qs, rcursor, rper_page, with_count=True)
 
     return render(request, "organization_admin/reports_list.html", {
         "org": org,
@@ -742,7 +792,7 @@ def org_report_detail(request, pk):
     org = membership.organization
 
     report = get_object_or_404(
-        Report.objects.select_related("user", "organization").prefetch_related("attachments"),
+        Report.objects.select_related("user", "organization").prefetch_related("attachments__blob"),
         pk=pk,
         organization=org
     )
@@ -754,17 +804,17 @@ def org_report_detail(request, pk):
         defaults={"read_by": request.user}
     )
     if created:
-        if report.status in (ReportStatus.NEW, ReportStatus.SENT):
-            report.status = ReportStatus.READ
-            report.save(update_fields=["status", "updated_at"])
-
-        if getattr(report.user, "telegram_id", None):
-            msg = (
-                f"👀 Sizning shikoyatingiz o‘qildi.\n"
-                f"Tashkilot: {org.name}\n"
-                f"Admin: {_full_name(request.user)}"
-            )
-            send_telegram_message(report.user.telegram_id, msg)
+        with transaction.atomic():
+            if report.status in (ReportStatus.NEW, ReportStatus.SENT):
+                set_status(report, ReportStatus.READ)
+
+            if getattr(report.user, "telegram_id", None):
+                msg = (
+                    f"👀 Sizning shikoyatingiz o‘qildi.\n"
+                    f"Tashkilot: {org.name}\n"
+                    f"Admin: {_full_name(request.user)}"
+                )
+                enqueue_telegram_message(report.user.telegram_id, msg)
 
     # ========== ACTION faqat NEW/SENT/READ ==========
     can_act = report.status in (ReportStatus.NEW, ReportStatus.SENT, ReportStatus.READ)
@@ -832,35 +882,37 @@ def org_report_detail(request, pk):
                 messages.error(request, "Tanlangan foydalanuvchilar shu tashkilot a’zosi emas.")
                 return redirect(f"{request.path}?open_assign=1&staff_q={staff_q}&staff_per_page={staff_per_page}")
 
-            # acceptance (1 marta)
-            ReportAcceptance.objects.get_or_create(
-                report=report,
-                defaults={"organization": org, "accepted_by": request.user}
-            )
+            with transaction.atomic():
+                # status -> IN_PROGRESS (shartli — parallel amal bo'lsa hech narsa yozilmaydi)
+                if not set_status(report, ReportStatus.IN_PROGRESS):
+                    messages.error(request, "Shikoyat holati shu orada o‘zgardi, sahifani yangilang.")
+                    return redirect(request.path)
 
-            # assignments
-            for m in valid_memberships:
-                ReportAssignment.objects.get_or_create(
+                # acceptance (1 marta)
+                ReportAcceptance.objects.get_or_create(
                     report=report,
-                    organization=org,
-                    assigned_to=m.user,
-                    defaults={"assigned_by": request.user}
+                    defaults={"organization": org, "accepted_by": request.user}
                 )
 
-            # status -> IN_PROGRESS
-            report.status = ReportStatus.IN_PROGRESS
-            report.save(update_fields=["status", "updated_at"])
-
-            # telegram notify
-            if getattr(report.user, "telegram_id", None):
-                assignees = ", ".join([_full_name(m.user) for m in valid_memberships])
-                msg = (
-                    f"✅ Shikoyat qabul qilindi va biriktirildi.\n"
-                    f"Tashkilot: {org.name}\n"
-                    f"Biriktirildi: {assignees}\n"
-                    f"Shikoyat holati: Jarayonda"
-                )
-                send_telegram_message(report.user.telegram_id, msg)
+                # assignments
+                for m in valid_memberships:
+                    ReportAssignment.objects.get_or_create(
+                        report=report,
+                        organization=org,
+                        assigned_to=m.user,
+                        defaults={"assigned_by": request.user}
+                    )
+
+                # telegram notify (outbox — worker yuboradi)
+                if getattr(report.user, "telegram_id", None):
+                    assignees = ", ".join([_full_name(m.user) for m in valid_memberships])
+                    msg = (
+                        f"✅ Shikoyat qabul qilindi va biriktirildi.\n"
+                        f"Tashkilot: {org.name}\n"
+                        f"Biriktirildi: {assignees}\n"
+                        f"Shikoyat holati: Jarayonda"
+                    )
+                    enqueue_telegram_message(report.user.telegram_id, msg)
 
             messages.success(request, "Qabul qilindi va tanlangan a’zolarga biriktirildi. Status: Jarayonda.")
             return redirect(request.path)
@@ -872,27 +924,29 @@ def org_report_detail(request, pk):
                 messages.error(request, "Sabab kamida 20 ta belgi bo‘lishi kerak.")
                 return redirect(f"{request.path}?open_reject=1")
 
-            ReportRejection.objects.update_or_create(
-                report=report,
-                defaults={
-                    "organization": org,
-                    "reason": reason,
-                    "rejected_by": request.user,
-                }
-            )
-
-            report.status = ReportStatus.REJECTED
-            report.save(update_fields=["status", "updated_at"])
+            with transaction.atomic():
+                if not set_status(report, ReportStatus.REJECTED):
+                    messages.error(request, "Shikoyat holati shu orada o‘zgardi, sahifani yangilang.")
+                    return redirect(request.path)
 
-            if getattr(report.user, "telegram_id", None):
-                msg = (
-                    f"⛔ Shikoyat rad etildi.\n"
-                    f"Tashkilot: {org.name}\n"
-                    f"Rad etgan: {_full_name(request.user)}\n"
-                    f"Sabab: {reason}\n"
-                    f"Shikoyat id raqami: {report.id}"
+                ReportRejection.objects.update_or_create(
+                    report=report,
+                    defaults={
+                        "organization": org,
+                        "reason": reason,
+                        "rejected_by": request.user,
+                    }
                 )
-                send_telegram_message(report.user.telegram_id, msg)
+
+                if getattr(report.user, "telegram_id", None):
+                    msg = (
+                        f"⛔ Shikoyat rad etildi.\n"
+                        f"Tashkilot: {org.name}\n"
+                        f"Rad etgan: {_full_name(request.user)}\n"
+                        f"Sabab: {reason}\n"
+                        f"Shikoyat id raqami: {report.id}"
+                    )
+                    enqueue_telegram_message(report.user.telegram_id, msg)
 
             messages.success(request, "Rad etildi va sabab reporterga yuborildi.")
             return redirect(request.path)
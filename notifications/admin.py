@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .choices import OutboxStatus
+from .models import TelegramOutbox
+
+
+@admin.register(TelegramOutbox)
+class TelegramOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "chat_id", "status", "attempts", "available_at", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("chat_id", "text", "last_error")
+    ordering = ("-created_at",)
+    actions = ("retry",)
+
+    @admin.action(description="Qayta navbatga qo'yish")
+    def retry(self, request, queryset):
+        queryset.exclude(status=OutboxStatus.SENT).update(
+            status=OutboxStatus.PENDING, attempts=0, available_at=timezone.now(),
+        )
@@ -0,0 +1,7 @@
+from django.db import models
+
+
+class OutboxStatus(models.TextChoices):
+    PENDING = "pending", "Navbatda"  # yuborilishi (yoki qayta urinilishi) kutilmoqda
+    SENT = "sent", "Yuborildi"
+    DEAD = "dead", "Yuborib bo'lmadi"  # urinishlar tugadi yoki doimiy xato
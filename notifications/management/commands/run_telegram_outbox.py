@@ -0,0 +1,50 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.worker import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "TelegramOutbox navbatidagi xabarlarni yuboradi (to'xtatilguncha). "
+        "--once — navbat bo'shaguncha yuborib chiqadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true")
+        parser.add_argument("--batch", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=None)
+        parser.add_argument("--rate", type=float, default=None, help="xabar/soniya (umumiy)")
+        parser.add_argument("--idle", type=float, default=1.0, help="navbat bo'sh bo'lsa kutish (soniya)")
+
+    def handle(self, *args, **opts):
+        token = getattr(settings, "TELEGRAM_BOT_TOKEN", None)
+        if not token:
+            raise CommandError("TELEGRAM_BOT_TOKEN o'rnatilmagan.")
+
+        worker = OutboxWorker(
+            token,
+            concurrency=opts["concurrency"],
+            rate=opts["rate"],
+            batch=opts["batch"],
+        )
+        try:
+            if opts["once"]:
+                total = asyncio.run(self._drain(worker))
+                self.stdout.write(f"Yuborishlar: {worker.notifier.metrics.snapshot()}")
+                self.stdout.write(self.style.SUCCESS(f"{total} ta xabar qayta ishlandi."))
+            else:
+                asyncio.run(worker.run(idle=opts["idle"]))
+        except KeyboardInterrupt:
+            pass
+
+    async def _drain(self, worker):
+        total = 0
+        try:
+            while n := await worker.drain_once():
+                total += n
+        finally:
+            await worker.notifier.aclose()
+        return total
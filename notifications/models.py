@@ -0,0 +1,35 @@
+from django.db import models
+from django.utils import timezone
+
+from .choices import OutboxStatus
+
+
+class TelegramOutbox(models.Model):
+    """
+    Yuborilishi kerak bo'lgan Telegram xabari. View o'z tranzaksiyasi ichida
+    yozadi (notifications.outbox.enqueue_telegram_message), alohida worker
+    (`run_telegram_outbox`) yuboradi.
+    """
+    chat_id = models.BigIntegerField()
+    text = models.TextField()
+
+    status = models.CharField(
+        max_length=10,
+        choices=OutboxStatus.choices,
+        default=OutboxStatus.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    # keyingi urinish vaqti; worker olgan qatorlar uchun — lease tugash vaqti
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+        ]
+
+    def __str__(self):
+        return f"Telegram -> {self.chat_id} ({self.status})"
@@ -0,0 +1,12 @@
+# notifications/outbox.py
+from .models import TelegramOutbox
+
+
+def enqueue_telegram_message(telegram_id: int, text: str):
+    """
+    Xabarni navbatga yozadi (chaqiruvchining tranzaksiyasi ichida) — tarmoqqa
+    chiqmaydi. telegram_id bo'sh bo'lsa hech narsa qilmaydi.
+    """
+    if not telegram_id:
+        return None
+    return TelegramOutbox.objects.create(chat_id=telegram_id, text=text)
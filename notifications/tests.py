@@ -0,0 +1,137 @@
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from utils.telegram import TelegramNotifier
+
+from .choices import OutboxStatus
+from .models import TelegramOutbox
+from .outbox import enqueue_telegram_message
+from .worker import OutboxWorker, claim_batch
+
+
+class FakeTelegram:
+    """
+    Lokal soxta Bot API: chat_id bo'yicha oldindan berilgan javoblar ketma-ketligi.
+    """
+
+    def __init__(self, script):
+        self.script = {chat: list(replies) for chat, replies in script.items()}
+        self.received = []
+        self.on_send = None
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/sendMessage", self.send_message)
+
+    async def send_message(self, request):
+        data = await request.json()
+        self.received.append((data["chat_id"], data["text"]))
+        if self.on_send:
+            await self.on_send()
+        replies = self.script.get(data["chat_id"]) or [200]
+        status = replies.pop(0) if len(replies) > 1 else replies[0]
+        if status == 200:
+            return web.json_response({"ok": True, "result": {}})
+        body = {"ok": False, "description": "fake"}
+        if status == 429:
+            body["parameters"] = {"retry_after": 0}
+        return web.json_response(body, status=status)
+
+
+class TelegramNotifierTests(TestCase):
+    async def test_send_many(self):
+        fake = FakeTelegram({2: [403], 3: [500, 200]})
+        server = TestServer(fake.app)
+        await server.start_server()
+        notifier = TelegramNotifier("TOKEN", str(server.make_url("")), rate=0, per_chat_interval=0)
+        try:
+            results = await notifier.send_many([(1, "a"), (2, "b"), (3, "c1"), (1, "d"), (3, "c2")])
+        finally:
+            await notifier.aclose()
+            await server.close()
+
+        self.assertEqual([r.ok if r else None for r in results], [True, False, False, True, None])
+        self.assertTrue(results[1].permanent)
+        # 3-chat: c1 yiqildi -> c2 yuborilmadi
+        self.assertNotIn((3, "c2"), fake.received)
+
+        stats = notifier.metrics.snapshot()
+        self.assertEqual((stats["count"], stats["errors"]), (4, 2))
+        self.assertIsNotNone(stats["p95_ms"])
+
+
+class TelegramOutboxTests(TestCase):
+    def test_enqueue_follows_transaction(self):
+        try:
+            with transaction.atomic():
+                enqueue_telegram_message(1, "bekor")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        enqueue_telegram_message(None, "chat yo'q")
+        enqueue_telegram_message(2, "ok")
+        self.assertEqual(list(TelegramOutbox.objects.values_list("chat_id", flat=True)), [2])
+
+    async def _drain(self, script, on_send=None, **kwargs):
+        fake = FakeTelegram(script)
+        fake.on_send = on_send
+        server = TestServer(fake.app)
+        await server.start_server()
+        kwargs = {"rate": 0, "per_chat_interval": 0, **kwargs}
+        worker = OutboxWorker("TOKEN", api_url=str(server.make_url("")), **kwargs)
+        try:
+            await worker.drain_once()
+        finally:
+            await worker.notifier.aclose()
+            await server.close()
+        return fake
+
+    def _rows(self):
+        return {r.text: r for r in TelegramOutbox.objects.all()}
+
+    async def test_drain(self):
+        for chat, text in [(10, "a1"), (10, "a2"), (20, "b"), (30, "c"), (40, "d")]:
+            await sync_to_async(enqueue_telegram_message)(chat, text)
+
+        # 10: ok; 20: 500 -> backoff; 30: 403 -> dead; 40: 429 -> retry_after
+        with self.assertLogs("notifications.worker", "WARNING"):
+            fake = await self._drain({10: [200], 20: [500], 30: [403], 40: [429]})
+        self.assertEqual(sorted(fake.received), [(10, "a1"), (10, "a2"), (20, "b"), (30, "c"), (40, "d")])
+
+        rows = await sync_to_async(self._rows)()
+        self.assertEqual(rows["a1"].status, OutboxStatus.SENT)
+        self.assertEqual(rows["a2"].status, OutboxStatus.SENT)
+        self.assertEqual(rows["c"].status, OutboxStatus.DEAD)
+        self.assertEqual((rows["b"].status, rows["b"].attempts), (OutboxStatus.PENDING, 1))
+        self.assertGreater(rows["b"].available_at, timezone.now())
+        self.assertEqual((rows["d"].status, rows["d"].attempts), (OutboxStatus.PENDING, 1))
+
+    async def test_order_per_chat_and_dead_letter(self):
+        await sync_to_async(enqueue_telegram_message)(10, "birinchi")
+        await sync_to_async(enqueue_telegram_message)(10, "ikkinchi")
+
+        # birinchisi yiqilsa ikkinchisi yuborilmaydi (tartib buzilmasin)
+        with self.assertLogs("notifications.worker", "WARNING"):
+            fake = await self._drain({10: [502]}, max_attempts=1)
+        self.assertEqual(fake.received, [(10, "birinchi")])
+
+        rows = await sync_to_async(self._rows)()
+        self.assertEqual(rows["birinchi"].status, OutboxStatus.DEAD)
+        self.assertEqual((rows["ikkinchi"].status, rows["ikkinchi"].attempts), (OutboxStatus.PENDING, 0))
+
+    async def test_lease_renewed_while_sending(self):
+        for text in ("a", "b", "c"):
+            await sync_to_async(enqueue_telegram_message)(10, text)
+
+        # bitta chat: 3 xabar x 0.2 s > lease (0.2 s) — boshqa worker ularni ololmasligi kerak
+        stolen = []
+
+        async def other_worker():
+            stolen.extend(await sync_to_async(claim_batch)(10))
+
+        await self._drain({10: [200]}, on_send=other_worker, lease=0.2, per_chat_interval=0.2)
+        self.assertEqual(stolen, [])
+        rows = await sync_to_async(self._rows)()
+        self.assertEqual({r.status for r in rows.values()}, {OutboxStatus.SENT})
@@ -0,0 +1,180 @@
+# notifications/worker.py
+"""
+TelegramOutbox navbatini bo'shatuvchi async worker (`run_telegram_outbox`).
+
+  - navbatdan `batch` ta qator olinadi; olingan qatorlarning available_at i
+    LEASE_SECONDS ga suriladi — worker yiqilsa ular keyin yana olinadi.
+    Yuborish davomida lease har lease/3 da yangilanadi: chat bo'yicha
+    interval va 429 pauzalari lease dan uzoq cho'zilsa ham boshqa worker
+    shu qatorlarni olib ikkinchi marta yubormaydi
+  - partiya TelegramNotifier.send_many() bilan yuboriladi: turli chatlarga
+    parallel, umumiy va chat bo'yicha tezlik limitlari, bitta chatga tartib
+  - 429 -> retry_after ga rioya qilinadi (butun worker to'xtab turadi)
+  - 5xx / tarmoq xatosi -> eksponensial backoff, max_attempts dan keyin DEAD
+  - 400/403/404 (chat topilmadi, bot bloklangan) -> darhol DEAD
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from utils.telegram import PER_CHAT_INTERVAL, TelegramNotifier
+
+from .choices import OutboxStatus
+from .models import TelegramOutbox
+
+log = logging.getLogger(__name__)
+
+LEASE_SECONDS = 60
+
+# metrikalar logga shu oraliqda yoziladi (soniya)
+METRICS_LOG_INTERVAL = 60
+
+
+def backoff_delay(attempts: int, base: float, cap: float) -> float:
+    """
+    base * 2^(attempts-1), cap bilan cheklangan; jitter — bir vaqtda yiqilgan
+    xabarlar bir vaqtda qaytmasin.
+    """
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+# ---------------------------------------------------------------------------
+# Baza (sync) — worker ichida sync_to_async orqali
+# ---------------------------------------------------------------------------
+def claim_batch(limit: int, lease: float = LEASE_SECONDS):
+    now = timezone.now()
+    with transaction.atomic():
+        qs = (
+            TelegramOutbox.objects
+            .filter(status=OutboxStatus.PENDING, available_at__lte=now)
+            .order_by("available_at", "id")
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        rows = list(qs[:limit])
+        TelegramOutbox.objects.filter(pk__in=[r.pk for r in rows]).update(
+            available_at=now + timedelta(seconds=lease),
+        )
+    return rows
+
+
+def renew_lease(ids, lease: float = LEASE_SECONDS) -> int:
+    """
+    Hali yozilmagan (PENDING) olingan qatorlarning lease ini uzaytiradi.
+    """
+    return TelegramOutbox.objects.filter(pk__in=ids, status=OutboxStatus.PENDING).update(
+        available_at=timezone.now() + timedelta(seconds=lease),
+    )
+
+
+def record_results(results, max_attempts: int, backoff_base: float, backoff_max: float):
+    """
+    results: [(row, SendResult | None)]. None — yuborilmadi (shu chatning
+    oldingi xabari yiqildi), urinish hisoblanmaydi, o'sha bilan birga qaytadi.
+    """
+    now = timezone.now()
+    retry_at = {}
+    rows = []
+    for row, res in results:
+        if res is None:
+            row.available_at = retry_at.get(row.chat_id, now)
+            rows.append(row)
+            continue
+
+        row.attempts += 1
+        row.last_error = res.error[:1000]
+        if res.ok:
+            row.status = OutboxStatus.SENT
+            row.sent_at = now
+        elif res.permanent or row.attempts >= max_attempts:
+            row.status = OutboxStatus.DEAD
+            log.warning("Telegram outbox #%s dead: %s", row.pk, res.error)
+        else:
+            delay = res.retry_after if res.retry_after is not None else backoff_delay(
+                row.attempts, backoff_base, backoff_max,
+            )
+            row.available_at = now + timedelta(seconds=delay)
+            retry_at[row.chat_id] = row.available_at
+        rows.append(row)
+
+    TelegramOutbox.objects.bulk_update(rows, ["status", "attempts", "available_at", "last_error", "sent_at"])
+
+
+# ---------------------------------------------------------------------------
+class OutboxWorker:
+    def __init__(
+        self,
+        token: str,
+        api_url: str = None,
+        concurrency: int = None,
+        rate: float = None,
+        batch: int = 100,
+        max_attempts: int = None,
+        backoff_base: float = 2.0,
+        backoff_max: float = 3600.0,
+        per_chat_interval: float = PER_CHAT_INTERVAL,
+        lease: float = LEASE_SECONDS,
+    ):
+        self.notifier = TelegramNotifier(
+            token, api_url, rate=rate, concurrency=concurrency, per_chat_interval=per_chat_interval,
+        )
+        self.batch = batch
+        self.max_attempts = max_attempts or settings.TELEGRAM_OUTBOX_MAX_ATTEMPTS
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+
+    async def drain_once(self) -> int:
+        """
+        Bitta partiya: olish -> yuborish -> natijani yozish. Olingan qatorlar sonini qaytaradi.
+        """
+        rows = await sync_to_async(claim_batch)(self.batch, self.lease)
+        if not rows:
+            return 0
+
+        renewer = asyncio.create_task(self._keep_lease([row.pk for row in rows]))
+        try:
+            results = await self.notifier.send_many([(row.chat_id, row.text) for row in rows])
+        finally:
+            renewer.cancel()
+        await sync_to_async(record_results)(
+            list(zip(rows, results)), self.max_attempts, self.backoff_base, self.backoff_max,
+        )
+        return len(rows)
+
+    async def _keep_lease(self, ids):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await sync_to_async(renew_lease)(ids, self.lease)
+            except Exception:
+                # baza vaqtincha ishlamasa — keyingi urinishda
+                log.exception("Telegram outbox lease renewal failed")
+
+    async def run(self, stop: asyncio.Event = None, idle: float = 1.0):
+        """
+        stop o'rnatilguncha navbatni bo'shatadi; navbat bo'sh bo'lsa `idle` soniya kutadi.
+        """
+        stop = stop or asyncio.Event()
+        logged_at = time.monotonic()
+        try:
+            while not stop.is_set():
+                n = await self.drain_once()
+                if time.monotonic() - logged_at >= METRICS_LOG_INTERVAL:
+                    log.info("Telegram outbox: %s", self.notifier.metrics.snapshot())
+                    logged_at = time.monotonic()
+                if n < self.batch:
+                    try:
+                        await asyncio.wait_for(stop.wait(), idle)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            await self.notifier.aclose()
@@ -11,6 +11,7 @@ from .models import (
     ReportRedirect,
 )
 from .models import ReportStatus
+from .rollup import on_report_changed, on_report_created
 
 
 # =========================
@@ -29,6 +30,13 @@ class ReportAttachmentInline(admin.TabularInline):
     )
 
     def file_link(self, obj):
+        if obj.file and obj.thumbnail_url:
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" loading="lazy" '
+                'style="width:80px;height:80px;object-fit:cover;"></a>',
+                obj.file.url,
+                obj.thumbnail_url,
+            )
         if obj.file:
             return format_html(
                 '<a href="{}" target="_blank">📎 Faylni ochish</a>',
@@ -37,6 +45,10 @@ class ReportAttachmentInline(admin.TabularInline):
         return "-"
     file_link.short_description = "Fayl"
 
+    def get_queryset(self, request):
+        # thumbnail_url -> blob.previews
+        return super().get_queryset(request).select_related("blob")
+
 
 class ReportReadInline(admin.TabularInline):
     model = ReportRead
@@ -142,6 +154,16 @@ class ReportAdmin(admin.ModelAdmin):
 
     list_per_page = 25
 
+    def save_model(self, request, obj, form, change):
+        # tashkilot/status/koordinata qo'lda o'zgarsa hisoblagichlar ham
+        # (reports.rollup) ko'chadi; changeform_view tranzaksiya ichida
+        old = Report.objects.select_for_update().get(pk=obj.pk) if change else None
+        super().save_model(request, obj, form, change)
+        if old is None:
+            on_report_created(obj)
+        else:
+            on_report_changed(old, obj)
+
     # =========================
     # Custom columns
     # =========================
@@ -1,5 +1,37 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, pre_delete
+
+
+def _install_search(sender, using="default", **kwargs):
+    from .search import install
+    install(using)
+
+
+def _release_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        from .blobs import release
+        release(instance.blob_id)
+
+
+def _report_deleted(sender, instance, **kwargs):
+    from .rollup import on_report_deleted
+    on_report_deleted(instance)
+
+
+def _organization_deleted(sender, instance, **kwargs):
+    from .rollup import on_organization_deleted
+    on_organization_deleted(instance.pk)
 
 
 class ReportsConfig(AppConfig):
     name = 'reports'
+
+    def ready(self):
+        # FTS virtual jadvali / GIN indeksi migratsiyalardan keyin yaratiladi
+        post_migrate.connect(_install_search, sender=self)
+        # attachment o'chsa blob ref kamayadi (fayl gc_blobs da o'chadi)
+        post_delete.connect(_release_blob, sender="reports.ReportAttachment")
+        # report o'chsa kunlik hisoblagich va klaster kataklari kamayadi
+        post_delete.connect(_report_deleted, sender="reports.Report")
+        # tashkilot o'chsa reportlari NULL ga o'tadi — hisoblagichlari ham
+        pre_delete.connect(_organization_deleted, sender="organizations.Organization")
@@ -0,0 +1,181 @@
+# reports/blobs.py
+import hashlib
+import mimetypes
+import os
+import shutil
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, ProtectedError, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .choices import PreviewStatus
+from .models import Blob, ReportAttachment, blob_upload_path
+from .previews import delete_previews, previewable
+
+COPY_BUFFER = 64 * 1024
+BLOB_DIR = "blobs"
+
+
+def sha256_of(f) -> str:
+    """
+    Yuklangan fayl (UploadedFile) sha256 i — bo'laklab o'qiladi, xotirada butun fayl bo'lmaydi.
+    """
+    digest = hashlib.sha256()
+    for chunk in f.chunks(COPY_BUFFER):
+        digest.update(chunk)
+    f.seek(0)
+    return digest.hexdigest()
+
+
+def file_sha256(name: str) -> str:
+    """
+    Storage dagi fayl sha256 i.
+    """
+    digest = hashlib.sha256()
+    with default_storage.open(name, "rb") as f:
+        while buf := f.read(COPY_BUFFER):
+            digest.update(buf)
+    return digest.hexdigest()
+
+
+def _acquire(sha256: str, size: int, filename: str, write, refs: int = 1) -> Blob:
+    """
+    Blob bor bo'lsa refs += `refs`, yo'q bo'lsa `write(nom) -> saqlangan nom`
+    bilan fayl yoziladi va blob yaratiladi. Parallel so'rov shu blobni
+    birinchi yaratgan bo'lsa, yozilgan nusxa o'chiriladi va ref oshiriladi.
+    """
+    while True:
+        if Blob.objects.filter(pk=sha256).update(refs=F("refs") + refs, updated_at=timezone.now()):
+            return Blob.objects.get(pk=sha256)
+
+        blob = Blob(
+            sha256=sha256,
+            size=size,
+            refs=refs,
+            # rasm/video -> run_preview_worker navbatiga
+            preview_status=PreviewStatus.PENDING if previewable(filename) else PreviewStatus.NONE,
+        )
+        blob.file.name = write(blob_upload_path(blob, filename))
+        try:
+            with transaction.atomic():
+                blob.save(force_insert=True)
+            return blob
+        except IntegrityError:
+            default_storage.delete(blob.file.name)
+
+
+def store(f, filename: str) -> Blob:
+    """
+    Yuklangan fayl -> Blob (+1 ref). Avval sha256 hisoblanadi — shunday
+    tarkib bor bo'lsa diskka umuman yozilmaydi.
+    """
+    return _acquire(sha256_of(f), f.size, filename, lambda name: default_storage.save(name, f))
+
+
+def adopt(name: str, sha256: str, size: int, refs: int = 1) -> Blob:
+    """
+    Storage da turgan fayl (staged yoki eski reports/<id>/...) -> Blob.
+    Yangi blob uchun fayl blob manziliga hardlink qilinadi (bo'lmasa
+    nusxalanadi); asl nusxa tranzaksiya muvaffaqiyatli tugagach o'chiriladi —
+    orada jarayon to'xtasa ham fayl yo'qolmaydi.
+    """
+    def link(target: str) -> str:
+        target = default_storage.get_available_name(target)
+        dst = default_storage.path(target)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        try:
+            os.link(default_storage.path(name), dst)
+            # hardlink staged faylning eski mtime ini oladi — sweep_orphans
+            # uni Blob qatori commit bo'lguncha eski yetim deb o'chirmasin
+            os.utime(dst)
+        except OSError:
+            shutil.copyfile(default_storage.path(name), dst)
+        return target
+
+    blob = _acquire(sha256, size, os.path.basename(name), link, refs=refs)
+    if blob.file.name != name:
+        transaction.on_commit(lambda: default_storage.delete(name))
+    return blob
+
+
+def stored_mime(blob: Blob, mime: str) -> str:
+    """
+    Attachment mime i: blob qayta kodlangan bo'lsa (reports.previews) — yangi fayl turi.
+    """
+    if blob.original_size:
+        return mimetypes.guess_type(blob.file.name)[0] or mime
+    return mime
+
+
+def release(blob_id: str):
+    """
+    ReportAttachment o'chirilganda (reports.apps dagi post_delete) -1 ref.
+    """
+    Blob.objects.filter(pk=blob_id).update(refs=F("refs") - 1, updated_at=timezone.now())
+
+
+def recount() -> int:
+    """
+    refs ni ReportAttachment lardan qayta hisoblaydi (qo'lda o'chirishlardan keyin).
+    """
+    counts = (
+        ReportAttachment.objects.filter(blob=OuterRef("pk"))
+        .order_by()
+        .values("blob")
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    return Blob.objects.update(refs=Coalesce(Subquery(counts), Value(0)))
+
+
+def collect(older_than) -> tuple:
+    """
+    `older_than` dan beri ishlatilmagan (refs <= 0) bloblarni o'chiradi.
+    Qator shartli o'chiriladi — shu payt kimdir ref olgan bo'lsa blob qoladi.
+    Qaytaradi: (o'chirilganlar soni, bo'shagan baytlar).
+    """
+    n = freed = 0
+    for blob in Blob.objects.filter(refs__lte=0, updated_at__lt=older_than).iterator():
+        try:
+            deleted, _ = Blob.objects.filter(pk=blob.pk, refs__lte=0).delete()
+        except ProtectedError:
+            # refs noto'g'ri (attachment bor) — recount() kerak
+            continue
+        if deleted:
+            default_storage.delete(blob.file.name)
+            if blob.original:
+                default_storage.delete(blob.original)
+            delete_previews(blob)
+            n += 1
+            freed += blob.size
+    return n, freed
+
+
+def sweep_orphans(older_than) -> int:
+    """
+    blobs/ ichidagi, hech bir Blob qatoriga tegishli bo'lmagan fayllar
+    (yozildi, lekin tranzaksiya bekor bo'ldi). Yangi fayllarga tegilmaydi;
+    o'chirishdan oldin qator yana tekshiriladi — ro'yxat olingandan keyin
+    commit bo'lgan blob fayli qoladi.
+    """
+    root = default_storage.path(BLOB_DIR)
+    if not os.path.isdir(root):
+        return 0
+    known = set()
+    for name, original in Blob.objects.values_list("file", "original").iterator():
+        known.update((name, original))
+    cutoff = older_than.timestamp()
+    n = 0
+    for dirpath, _, filenames in os.walk(root):
+        for fn in filenames:
+            path = os.path.join(dirpath, fn)
+            name = os.path.relpath(path, default_storage.path("")).replace(os.sep, "/")
+            if name in known or os.path.getmtime(path) >= cutoff:
+                continue
+            if Blob.objects.filter(Q(file=name) | Q(original=name)).exists():
+                continue
+            os.remove(path)
+            n += 1
+    return n
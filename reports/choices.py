@@ -18,3 +18,11 @@ class AttachmentType(models.TextChoices):
     VIDEO = "video", "Video"
     VOICE = "voice", "Voice"
     FILE = "file", "File"
+
+
+class PreviewStatus(models.TextChoices):
+    NONE = "none", "Kerak emas"  # rasm/video emas
+    PENDING = "pending", "Navbatda"
+    DONE = "done", "Tayyor"
+    SKIPPED = "skipped", "O'qib bo'lmadi"  # buzuk fayl / ffmpeg yo'q
+    FAILED = "failed", "Xato"
@@ -0,0 +1,33 @@
+# reports/duplicates.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .choices import ReportStatus
+from .models import Report
+
+# Bu statuslardagi reportlar "yopilgan" — dublikat hisoblanmaydi
+CLOSED_STATUSES = (ReportStatus.RESOLVED, ReportStatus.REJECTED)
+
+
+def find_duplicates(lat, lng, organization_id=None, exclude_id=None, limit: int = 5):
+    """
+    Berilgan nuqtadan REPORT_DUPLICATE_RADIUS_M metr ichida, oxirgi
+    REPORT_DUPLICATE_WINDOW_DAYS kunda yaratilgan ochiq reportlar
+    (yaqinidan boshlab). grid_cell indeksi orqali — to'liq skan yo'q.
+    """
+    meters = settings.REPORT_DUPLICATE_RADIUS_M
+    since = timezone.now() - timedelta(days=settings.REPORT_DUPLICATE_WINDOW_DAYS)
+
+    qs = (
+        Report.objects.within_radius(float(lat), float(lng), meters)
+        .filter(created_at__gte=since)
+        .exclude(status__in=CLOSED_STATUSES)
+    )
+    if organization_id:
+        qs = qs.filter(organization_id=organization_id)
+    if exclude_id:
+        qs = qs.exclude(pk=exclude_id)
+
+    return list(qs.only("status", "latitude", "longitude").order_by("distance_m")[:limit])
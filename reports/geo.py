@@ -0,0 +1,97 @@
+# reports/geo.py
+import math
+
+# Klaster qatlamlari oldindan hisoblanadigan zoom darajalari
+CLUSTER_ZOOMS = range(3, 15)
+
+# Har bir 256px tile nechta katakka bo'linadi (katak ~64px)
+CLUSTER_CELLS_PER_TILE = 4
+
+
+def cell_size(zoom: int) -> float:
+    """
+    Berilgan zoom uchun klaster katagi (gradusda).
+    """
+    return 360.0 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+
+
+def cell_of(lat: float, lng: float, zoom: int) -> tuple[int, int]:
+    """
+    (cy, cx) — koordinata tushadigan katak indekslari.
+    """
+    size = cell_size(zoom)
+    return math.floor(float(lat) / size), math.floor(float(lng) / size)
+
+
+def cell_range(bbox, zoom: int):
+    """
+    bbox (w, s, e, n) ni qoplaydigan katak indekslari: (cy0, cy1, cx0, cx1).
+    """
+    w, s, e, n = bbox
+    cy0, cx0 = cell_of(s, w, zoom)
+    cy1, cx1 = cell_of(n, e, zoom)
+    return cy0, cy1, cx0, cx1
+
+
+# =========================
+# Report.grid_cell — qidiruv uchun indekslangan katak
+# =========================
+# ~1.1 km (kenglik bo'yicha). cell = row * GRID_COLS + col — bir qator
+# (bir xil kenglik) kataklari ketma-ket, shuning uchun bbox har qator uchun
+# bitta BETWEEN oralig'iga aylanadi.
+GRID_CELL_DEG = 0.01
+GRID_COLS = int(round(360 / GRID_CELL_DEG))
+GRID_ROWS = int(round(180 / GRID_CELL_DEG))
+
+# Bundan ko'p qator bo'lsa, har qatorni alohida emas — bitta umumiy oraliq
+MAX_GRID_RANGES = 64
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+
+
+def _grid_rc(lat: float, lng: float) -> tuple[int, int]:
+    row = math.floor((float(lat) + 90.0) / GRID_CELL_DEG)
+    col = math.floor((float(lng) + 180.0) / GRID_CELL_DEG)
+    return min(max(row, 0), GRID_ROWS - 1), min(max(col, 0), GRID_COLS - 1)
+
+
+def grid_cell(lat, lng) -> int | None:
+    if lat is None or lng is None:
+        return None
+    row, col = _grid_rc(lat, lng)
+    return row * GRID_COLS + col
+
+
+def grid_ranges(bbox) -> list[tuple[int, int]]:
+    """
+    bbox (w, s, e, n) ni qoplaydigan grid_cell oraliqlari [(lo, hi), ...].
+    """
+    w, s, e, n = bbox
+    r0, c0 = _grid_rc(s, w)
+    r1, c1 = _grid_rc(n, e)
+    if r1 - r0 + 1 > MAX_GRID_RANGES:
+        return [(r0 * GRID_COLS, r1 * GRID_COLS + GRID_COLS - 1)]
+    return [(r * GRID_COLS + c0, r * GRID_COLS + c1) for r in range(r0, r1 + 1)]
+
+
+def radius_bbox(lat: float, lng: float, meters: float):
+    """
+    Markaz + radius (m) ni o'rab turgan bbox (w, s, e, n).
+    """
+    dlat = meters / METERS_PER_DEG_LAT
+    coslat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(meters / (METERS_PER_DEG_LAT * coslat), 180.0)
+    return (
+        max(-180.0, lng - dlng), max(-90.0, lat - dlat),
+        min(180.0, lng + dlng), min(90.0, lat + dlat),
+    )
+
+
+def haversine_m(lat1, lng1, lat2, lng2) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
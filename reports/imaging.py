@@ -0,0 +1,252 @@
+# reports/imaging.py
+"""
+Pillow bilan rasm qayta ishlash. Django ga bog'liq emas — reports.previews
+uni ProcessPoolExecutor da chaqiradi, hamma yo'llar absolyut, sozlamalar
+argument sifatida keladi.
+"""
+import io
+import os
+import shutil
+import struct
+import subprocess
+import zlib
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+FFMPEG_TIMEOUT = 60
+
+# Pillow formati -> kengaytma, mime
+FORMATS = {
+    "WEBP": (".webp", "image/webp"),
+    "JPEG": (".jpg", "image/jpeg"),
+}
+
+
+class ImagingSkipped(Exception):
+    """
+    Faylni o'qib bo'lmaydi (buzuk, qo'llanmaydigan format, ffmpeg yo'q) — qayta urinilmaydi.
+    """
+
+
+def poster_frame(path: str) -> bytes:
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise ImagingSkipped("ffmpeg topilmadi")
+    # 1-soniyadagi kadr (boshida ko'pincha qora), qisqa video bo'lsa birinchisi
+    for seek in ("1", "0"):
+        out = subprocess.run(
+            [ffmpeg, "-v", "error", "-ss", seek, "-i", path, "-frames:v", "1", "-f", "image2pipe", "-vcodec", "png", "-"],
+            capture_output=True,
+            timeout=FFMPEG_TIMEOUT,
+        )
+        if out.stdout:
+            return out.stdout
+    raise ImagingSkipped(f"kadr olinmadi: {out.stderr.decode(errors='replace')[:200]}")
+
+
+# ---------------------------------------------------------------------------
+# Metadata (EXIF: GPS, kamera; XMP; IPTC; izohlar) ni qayta kodlamasdan olib tashlash
+# ---------------------------------------------------------------------------
+ORIENTATION = 0x0112
+
+_JPEG_DROP = {0xE1, 0xED, 0xFE}  # APP1 (EXIF/XMP), APP13 (IPTC), COM
+_PNG_DROP = {b"eXIf", b"tEXt", b"iTXt", b"zTXt", b"tIME"}
+_WEBP_DROP = {b"EXIF", b"XMP "}
+_WEBP_EXIF_FLAG, _WEBP_XMP_FLAG = 0x08, 0x04
+
+
+def _orientation_tiff(orientation: int) -> bytes:
+    # faqat Orientation tegi bo'lgan EXIF (TIFF qismi, "Exif\0\0" siz)
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    return exif.tobytes()[6:]
+
+
+def _strip_jpeg(data: bytes, orientation: int) -> bytes:
+    out = [data[:2]]
+    exif = None
+    if orientation != 1:
+        payload = b"Exif\x00\x00" + _orientation_tiff(orientation)
+        exif = b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            raise ValueError("JPEG segmenti buzuq")
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if exif and marker != 0xE0:
+            # JFIF (APP0) dan keyin
+            out.append(exif)
+            exif = None
+        if marker == 0xDA:
+            # skan ma'lumotlari: birinchi EOI gacha. Undan keyingisi — MPF
+            # qo'shimcha rasmlari (o'z EXIF i bilan), ular tashlanadi
+            end = data.find(b"\xff\xd9", pos)
+            out.append(data[pos:] if end < 0 else data[pos:end + 2])
+            break
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        segment = data[pos:pos + 2 + length]
+        if marker not in _JPEG_DROP and not (marker == 0xE2 and segment[4:8] == b"MPF\x00"):
+            out.append(segment)
+        pos += 2 + length
+    return b"".join(out)
+
+
+def _png_chunk(ctype: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", len(payload)) + ctype + payload + struct.pack(">I", zlib.crc32(ctype + payload))
+
+
+def _strip_png(data: bytes, orientation: int) -> bytes:
+    out = [data[:8]]
+    pos = 8
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        end = pos + 12 + length
+        if ctype not in _PNG_DROP:
+            out.append(data[pos:end])
+        if ctype == b"IHDR" and orientation != 1:
+            out.append(_png_chunk(b"eXIf", _orientation_tiff(orientation)))
+        pos = end
+        if ctype == b"IEND":
+            break
+    return b"".join(out)
+
+
+def _strip_webp(data: bytes, orientation: int) -> bytes:
+    chunks = []
+    pos = 12
+    while pos + 8 <= len(data):
+        fourcc, length = struct.unpack("<4sI", data[pos:pos + 8])
+        end = pos + 8 + length + (length & 1)
+        if fourcc not in _WEBP_DROP:
+            chunks.append([fourcc, bytearray(data[pos:end])])
+        pos = end
+    if chunks and chunks[0][0] == b"VP8X":
+        flags = chunks[0][1][8] & ~(_WEBP_EXIF_FLAG | _WEBP_XMP_FLAG)
+        if orientation != 1:
+            tiff = _orientation_tiff(orientation)
+            chunks.append([b"EXIF", struct.pack("<4sI", b"EXIF", len(tiff)) + tiff + b"\x00" * (len(tiff) & 1)])
+            flags |= _WEBP_EXIF_FLAG
+        chunks[0][1][8] = flags
+    body = b"WEBP" + b"".join(bytes(c) for _, c in chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def strip_metadata(data: bytes, orientation: int = 1):
+    """
+    JPEG/PNG/WebP baytlaridan metadata segmentlarini olib tashlaydi —
+    piksellar qayta kodlanmaydi. Orientation (1 bo'lmasa) yagona EXIF tegi
+    sifatida qoladi. Boshqa format -> None.
+    """
+    if data[:3] == b"\xff\xd8\xff":
+        return _strip_jpeg(data, orientation)
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return _strip_png(data, orientation)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _strip_webp(data, orientation)
+    return None
+
+
+def _write(img: Image.Image, path: str, fmt: str, quality: int) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    buf = io.BytesIO()
+    if fmt == "WEBP":
+        img.save(buf, fmt, quality=quality, method=4)
+    else:
+        img.save(buf, fmt, quality=quality, optimize=True, progressive=True)
+    with open(path, "wb") as f:
+        f.write(buf.getvalue())
+    return buf.tell()
+
+
+def derive(src: str, video: bool, previews: dict, preview_quality: int, optimize: dict = None, strip: str = None) -> dict:
+    """
+    src — blob fayli. previews: {o'lcham: yo'l} — WebP nusxalar.
+    optimize (faqat rasm uchun, ixtiyoriy): {path, max_side, format, quality, min_saving}
+    — eng uzun tomoni max_side gacha kichraytirilib, EXIF siz qayta kodlanadi;
+    natija asl fayldan kamida min_saving ulushga kichik bo'lmasa yozilmaydi.
+    strip (faqat rasm uchun, kengaytmasiz yo'l) — qayta kodlangan nusxa
+    yozilmasa, metadata siz nusxa shu yo'lga (+ asl kengaytma) yoziladi:
+    EXIF (GPS) asl fayl bilan birga tarqalmasin. Metadata bo'lmasa yozilmaydi.
+
+    Qaytaradi: {"previews": {o'lcham: yo'l}, "optimized": {"path", "size", "ext"?} | None}
+    — "ext" bor bo'lsa bu qayta kodlanmagan, faqat tozalangan nusxa.
+    """
+    sizes = sorted(previews, reverse=True)
+    largest = max([*sizes, optimize["max_side"] if optimize else 0])
+    try:
+        source = io.BytesIO(poster_frame(src)) if video else open(src, "rb")
+        with source as f, Image.open(f) as img:
+            animated = getattr(img, "n_frames", 1) > 1
+            exif = img.getexif()
+            orientation = exif.get(ORIENTATION, 1)
+            has_meta = bool(exif) or any(k in img.info for k in ("exif", "xmp", "XML:com.adobe.xmp"))
+            # JPEG ni kerakli o'lchamga yaqin masshtabda dekodlash — ancha tez
+            img.draft("RGB", (largest, largest))
+            # burilish EXIF dan piksellarga o'tkaziladi, EXIF ning o'zi saqlanmaydi
+            img = ImageOps.exif_transpose(img)
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ImagingSkipped(str(e)) from e
+
+    result = {"previews": {}, "optimized": None}
+
+    if optimize and not video and not animated and not (has_alpha and optimize["format"] == "JPEG"):
+        full = img.copy()
+        full.thumbnail((optimize["max_side"], optimize["max_side"]), Image.Resampling.LANCZOS)
+        size = _write(full, optimize["path"], optimize["format"], optimize["quality"])
+        if size <= os.path.getsize(src) * (1 - optimize["min_saving"]):
+            result["optimized"] = {"path": optimize["path"], "size": size}
+        else:
+            os.remove(optimize["path"])
+
+    if strip and not video and result["optimized"] is None:
+        result["optimized"] = _write_stripped(src, strip, img, orientation, has_meta, animated)
+
+    for size in sizes:
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        _write(img, previews[size], "WEBP", preview_quality)
+        result["previews"][size] = previews[size]
+    return result
+
+
+def _write_stripped(src: str, base: str, img: Image.Image, orientation: int, has_meta: bool, animated: bool):
+    with open(src, "rb") as f:
+        data = f.read()
+    try:
+        clean = strip_metadata(data, orientation)
+    except (ValueError, struct.error):
+        clean = None
+
+    if clean is not None:
+        if clean == data:
+            return None
+        ext = {b"\xff\xd8": ".jpg", b"\x89P": ".png", b"RI": ".webp"}[data[:2]]
+        path = base + ext
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(clean)
+        return {"path": path, "size": len(clean), "ext": ext}
+
+    if not has_meta or animated:
+        return None
+    # segmentlarini bilmaydigan format (TIFF, ...) yoki buzuq tuzilma —
+    # burilgan piksellar metadata siz qayta kodlanadi
+    fmt, ext = ("PNG", ".png") if img.mode == "RGBA" else ("JPEG", ".jpg")
+    path = base + ext
+    size = _write(img, path, fmt, 95)
+    return {"path": path, "size": size, "ext": ext}
+
+
+def derive_safe(job: dict):
+    """
+    Jarayonlar puli uchun: (natija, None) yoki (None, xato) — bitta buzuk
+    fayl butun partiyani to'xtatmasin.
+    """
+    try:
+        return derive(**job), None
+    except Exception as e:
+        return None, e
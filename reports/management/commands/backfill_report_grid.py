@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from reports.geo import grid_cell
+from reports.models import Report
+
+
+class Command(BaseCommand):
+    help = (
+        "Report.grid_cell bo'sh bo'lgan reportlarni bo'laklab to'ldiradi. "
+        "To'xtatilsa qayta ishga tushirish mumkin — to'ldirilganlar qayta o'qilmaydi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        batch = opts["batch"]
+        total = 0
+        last_pk = None
+
+        while True:
+            qs = Report.objects.filter(grid_cell__isnull=True).order_by("pk")
+            if last_pk is not None:
+                qs = qs.filter(pk__gt=last_pk)
+            chunk = list(qs.only("pk", "latitude", "longitude")[:batch])
+            if not chunk:
+                break
+
+            for r in chunk:
+                r.grid_cell = grid_cell(r.latitude, r.longitude)
+            Report.objects.bulk_update(chunk, ["grid_cell"])
+
+            last_pk = chunk[-1].pk
+            total += len(chunk)
+            self.stdout.write(f"... {total}")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} ta report to'ldirildi."))
@@ -0,0 +1,124 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from reports.models import Report
+from reports.search import get_backend, rebuild, search_reports
+
+
+class _Rollback(Exception):
+    pass
+
+
+WORDS = (
+    "chuqur yo'l chiroq yonmayapti axlat olib ketilmagan suv quvur yorilgan "
+    "daraxt qulagan svetofor ishlamayapti kanalizatsiya toshib ketgan asfalt "
+    "buzilgan piyodalar o'tish joyi bolalar maydonchasi ko'cha tozalanmagan"
+).split()
+NAMES = ("Alisher", "Bobur", "Dilnoza", "Jasur", "Kamola", "Nodira", "Sardor", "Zilola")
+SURNAMES = ("Karimov", "Rashidova", "Tursunov", "Yusupova", "Qodirov", "Ergasheva")
+
+
+class Command(BaseCommand):
+    help = (
+        "Qidiruv: eski icontains zanjirini (join + LIKE) reports.search bilan "
+        "solishtiradi. Sintetik reportlar oxirida rollback qilinadi."
+    )
+
+    QUERIES = ("chuqur", "svetofor ishlamayapti", "karimov", "90123", "toshib")
+    PAGE = 20
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000)
+        parser.add_argument("--users", type=int, default=2_000)
+        parser.add_argument("--batch", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _timeit(self, fn, repeat):
+        best = None
+        result = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            dt = (time.perf_counter() - t0) * 1000
+            best = dt if best is None else min(best, dt)
+        return best, result
+
+    @staticmethod
+    def _icontains(qs, q):
+        return qs.filter(
+            Q(description__icontains=q)
+            | Q(user__username__icontains=q)
+            | Q(user__first_name__icontains=q)
+            | Q(user__last_name__icontains=q)
+            | Q(user__phone_number__icontains=q)
+        )
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(opts["seed"])
+        rows, batch, repeat = opts["rows"], opts["batch"], opts["repeat"]
+
+        try:
+            with transaction.atomic():
+                User = get_user_model()
+                users = User.objects.bulk_create([
+                    User(
+                        username=f"bench_search_{i}",
+                        first_name=rnd.choice(NAMES),
+                        last_name=rnd.choice(SURNAMES),
+                        phone_number=f"+99890{rnd.randrange(10**7):07d}",
+                    )
+                    for i in range(opts["users"])
+                ])
+
+                t0 = time.perf_counter()
+                created = 0
+                while created < rows:
+                    n = min(batch, rows - created)
+                    Report.objects.bulk_create([
+                        Report(
+                            user=rnd.choice(users),
+                            description=" ".join(rnd.choices(WORDS, k=rnd.randint(4, 16))),
+                            latitude=Decimal("41.311100"), longitude=Decimal("69.279700"),
+                        )
+                        for _ in range(n)
+                    ], batch_size=batch)
+                    created += n
+                self.stdout.write(f"{rows} ta report yaratildi: {time.perf_counter() - t0:.1f}s")
+
+                t0 = time.perf_counter()
+                rebuild()
+                self.stdout.write(
+                    f"indeks ({type(get_backend()).__name__}): {time.perf_counter() - t0:.1f}s"
+                )
+
+                base = Report.objects.select_related("user").order_by("-created_at")
+                self.stdout.write(
+                    f"{'q':<24} {'hits':>7} {'like ms':>10} {'search ms':>10} {'speedup':>8}"
+                )
+                for q in self.QUERIES:
+                    def like():
+                        qs = self._icontains(base, q)
+                        return qs.count(), list(qs[: self.PAGE])
+
+                    def fts():
+                        qs = search_reports(base, q)
+                        return qs.count(), list(qs[: self.PAGE])
+
+                    like_ms, (like_hits, _) = self._timeit(like, repeat)
+                    fts_ms, (fts_hits, _) = self._timeit(fts, repeat)
+                    self.stdout.write(
+                        f"{q:<24} {fts_hits:>7} {like_ms:>10.1f} {fts_ms:>10.1f} "
+                        f"{like_ms / max(fts_ms, 1e-6):>7.1f}x"
+                        + ("" if like_hits == fts_hits else f"  (like: {like_hits})")
+                    )
+
+                raise _Rollback()
+        except _Rollback:
+            pass
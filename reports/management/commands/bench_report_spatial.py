@@ -0,0 +1,110 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from organizations.models import Organization
+from reports.geo import grid_cell, haversine_m, radius_bbox
+from reports.models import Report
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "grid_cell indeksi bilan bbox/radius/kNN so'rovlarini to'liq skan bilan "
+        "solishtiradi. Sintetik reportlar oxirida rollback qilinadi."
+    )
+
+    # Toshkent atrofi (~50 km)
+    CENTER = (41.3111, 69.2797)
+    SPREAD = 0.45
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--batch", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _timeit(self, fn, repeat):
+        best = None
+        result = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            dt = (time.perf_counter() - t0) * 1000
+            best = dt if best is None else min(best, dt)
+        return best, result
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(opts["seed"])
+        rows, batch, repeat = opts["rows"], opts["batch"], opts["repeat"]
+        clat, clng = self.CENTER
+
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create(username="bench_spatial_user")
+                org = Organization.objects.create(name="bench_spatial_org")
+
+                t0 = time.perf_counter()
+                created = 0
+                while created < rows:
+                    n = min(batch, rows - created)
+                    objs = []
+                    for _ in range(n):
+                        lat = round(clat + rnd.uniform(-self.SPREAD, self.SPREAD), 6)
+                        lng = round(clng + rnd.uniform(-self.SPREAD, self.SPREAD), 6)
+                        objs.append(Report(
+                            user=user, organization=org, description="bench",
+                            latitude=Decimal(str(lat)), longitude=Decimal(str(lng)),
+                            grid_cell=grid_cell(lat, lng),
+                        ))
+                    Report.objects.bulk_create(objs, batch_size=batch)
+                    created += n
+                self.stdout.write(f"{rows} ta report yaratildi: {time.perf_counter() - t0:.1f}s")
+
+                bbox = (clng - 0.01, clat - 0.01, clng + 0.01, clat + 0.01)
+                meters = 500
+                k = 10
+
+                def scan_bbox():
+                    w, s, e, n = bbox
+                    return Report.objects.filter(
+                        latitude__gte=s, latitude__lte=n, longitude__gte=w, longitude__lte=e,
+                    ).count()
+
+                def scan_radius():
+                    w, s, e, n = radius_bbox(clat, clng, meters)
+                    rows_ = Report.objects.filter(
+                        latitude__gte=s, latitude__lte=n, longitude__gte=w, longitude__lte=e,
+                    ).values_list("latitude", "longitude")
+                    return sum(1 for la, ln in rows_ if haversine_m(clat, clng, la, ln) <= meters)
+
+                def scan_knn():
+                    rows_ = Report.objects.values_list("id", "latitude", "longitude").iterator(chunk_size=20_000)
+                    return sorted((haversine_m(clat, clng, la, ln), rid) for rid, la, ln in rows_)[:k]
+
+                cases = [
+                    ("bbox", scan_bbox, lambda: Report.objects.in_bbox(*bbox).count()),
+                    ("radius", scan_radius, lambda: Report.objects.within_radius(clat, clng, meters).count()),
+                    ("knn", scan_knn, lambda: Report.objects.nearest(clat, clng, k=k)),
+                ]
+
+                self.stdout.write(f"{'query':<8} {'scan ms':>10} {'index ms':>10} {'speedup':>8}")
+                for name, scan_fn, index_fn in cases:
+                    scan_ms, scan_res = self._timeit(scan_fn, 1 if name == "knn" else repeat)
+                    index_ms, index_res = self._timeit(index_fn, repeat)
+                    if name != "knn" and scan_res != index_res:
+                        self.stderr.write(f"{name}: natija mos emas ({scan_res} != {index_res})")
+                    self.stdout.write(
+                        f"{name:<8} {scan_ms:>10.1f} {index_ms:>10.1f} {scan_ms / max(index_ms, 1e-6):>7.1f}x"
+                    )
+
+                raise _Rollback()
+        except _Rollback:
+            pass
@@ -0,0 +1,54 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reports.blobs import adopt, file_sha256
+from reports.models import Blob, ReportAttachment
+
+
+class Command(BaseCommand):
+    help = (
+        "Eski attachment fayllarini (reports/<id>/...) blob larga o'tkazadi: "
+        "bir xil tarkibli fayllardan bittasi qoladi. To'xtatilsa qayta ishga "
+        "tushirish mumkin — o'tkazilganlar qayta o'qilmaydi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Faqat hisoblash, fayllarga tegmaslik")
+
+    def handle(self, *args, **opts):
+        dry_run = opts["dry_run"]
+        legacy = ReportAttachment.objects.filter(blob__isnull=True).exclude(file="")
+        names = legacy.order_by("file").values_list("file", flat=True).distinct()
+
+        files = missing = duplicates = saved = 0
+        seen = set()
+        for name in list(names):
+            if not default_storage.exists(name):
+                missing += 1
+                continue
+            sha = file_sha256(name)
+            size = default_storage.size(name)
+            files += 1
+
+            if sha in seen or Blob.objects.filter(pk=sha).exists():
+                duplicates += 1
+                saved += size
+            seen.add(sha)
+            if dry_run:
+                continue
+
+            # bitta faylga bir nechta attachment ishora qilishi mumkin
+            with transaction.atomic():
+                ids = list(legacy.filter(file=name).values_list("pk", flat=True))
+                blob = adopt(name, sha, size, refs=len(ids))
+                ReportAttachment.objects.filter(pk__in=ids).update(file=blob.file.name, blob=blob)
+
+            if files % 500 == 0:
+                self.stdout.write(f"... {files}")
+
+        verb = "tejaladi" if not dry_run else "tejalishi mumkin"
+        self.stdout.write(self.style.SUCCESS(
+            f"{files} ta fayl, {duplicates} ta dublikat, {missing} ta topilmadi; "
+            f"{saved / 1024 / 1024:.1f} MB ({saved} bayt) {verb}."
+        ))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reports.blobs import collect, recount, sweep_orphans
+from reports.previews import drop_originals
+
+
+class Command(BaseCommand):
+    help = (
+        "Hech bir attachment ishlatmayotgan bloblarni (refs = 0) va blobs/ dagi "
+        "egasiz fayllarni o'chiradi; INGEST_KEEP_ORIGINAL o'chiq bo'lsa qayta "
+        "kodlangan rasmlarning asl nusxalarini ham. Cron orqali muntazam ishga tushiring."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=settings.BLOB_GC_GRACE_HOURS)
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Avval refs ni ReportAttachment lardan qayta hisoblash",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["recount"]:
+            self.stdout.write(f"{recount()} ta blob qayta hisoblandi.")
+
+        cutoff = timezone.now() - timedelta(hours=opts["hours"])
+        n, freed = collect(cutoff)
+        originals = 0 if settings.INGEST_KEEP_ORIGINAL else drop_originals(cutoff)
+        orphans = sweep_orphans(cutoff)
+        self.stdout.write(self.style.SUCCESS(
+            f"{n} ta blob o'chirildi ({freed / 1024 / 1024:.1f} MB), "
+            f"{originals} ta asl nusxa, {orphans} ta egasiz fayl."
+        ))
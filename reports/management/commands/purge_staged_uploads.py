@@ -0,0 +1,34 @@
+import os
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reports.models import StagedUpload
+
+
+class Command(BaseCommand):
+    help = (
+        "Report ga biriktirilmay qolgan oldindan yuklangan fayllarni (StagedUpload) "
+        "o'chiradi — bekor qilingan yoki tashlab ketilgan murojaatlar va "
+        "uzilib qolgan bo'laklab yuklashlar (oxirgi bo'lakdan beri). "
+        "Cron orqali muntazam ishga tushiring."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=settings.STAGED_UPLOAD_TTL_HOURS)
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(hours=opts["hours"])
+        n = 0
+        for upload in StagedUpload.objects.filter(updated_at__lt=cutoff).iterator():
+            # avval qator: shu payt report ga biriktirilgan bo'lsa (qator yo'q) fayl qoladi
+            deleted, _ = StagedUpload.objects.filter(pk=upload.pk).delete()
+            if deleted:
+                # har yuklashning o'z papkasi — fayl bilan birga uzilgan bo'laklarning .part fayllari ham
+                shutil.rmtree(default_storage.path(os.path.dirname(upload.file.name)), ignore_errors=True)
+                n += 1
+        self.stdout.write(self.style.SUCCESS(f"{n} ta eskirgan fayl o'chirildi."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reports.rollup import rebuild_clusters
+
+
+class Command(BaseCommand):
+    help = "ReportClusterCell (xarita klasterlari) jadvalini reports_report dan noldan qayta quradi."
+
+    def handle(self, *args, **opts):
+        n = rebuild_clusters()
+        self.stdout.write(self.style.SUCCESS(f"{n} ta klaster katagi yaratildi."))
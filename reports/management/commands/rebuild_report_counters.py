@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reports.rollup import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "ReportDailyCounter jadvalini reports_report dan noldan qayta quradi."
+
+    def handle(self, *args, **opts):
+        n = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"{n} ta hisoblagich qatori yaratildi."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from reports.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Reportlar matnli qidiruv indeksini (ReportSearchDocument + FTS) noldan qayta quradi."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--batch", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        n = rebuild(opts["database"], batch_size=opts["batch"])
+        self.stdout.write(self.style.SUCCESS(f"{n} ta report indekslandi."))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from reports.previews import PreviewWorker, enqueue_missing, ingest_savings
+
+
+class Command(BaseCommand):
+    help = (
+        "Rasm/video attachment lar uchun WebP nusxalar (previews) yasaydi va "
+        "rasmlarni kichraytirib qayta kodlaydi (INGEST_IMAGE_*), to'xtatilguncha. "
+        "--once — navbat bo'shaguncha ishlab chiqadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true")
+        parser.add_argument("--workers", type=int, default=4, help="parallel jarayonlar")
+        parser.add_argument("--batch", type=int, default=20)
+        parser.add_argument("--idle", type=float, default=2.0, help="navbat bo'sh bo'lsa kutish (soniya)")
+        parser.add_argument(
+            "--enqueue-missing",
+            action="store_true",
+            help="Avval previews siz eski rasm/video bloblarni navbatga qo'yish",
+        )
+        parser.add_argument("--stats", action="store_true", help="Faqat qayta kodlash tejamini ko'rsatish")
+
+    def handle(self, *args, **opts):
+        if opts["stats"]:
+            self._savings()
+            return
+        if opts["enqueue_missing"]:
+            self.stdout.write(f"{enqueue_missing()} ta blob navbatga qo'yildi.")
+
+        worker = PreviewWorker(workers=opts["workers"], batch=opts["batch"])
+        try:
+            if opts["once"]:
+                total = 0
+                try:
+                    while n := worker.drain_once():
+                        total += n
+                finally:
+                    worker.close()
+                self.stdout.write(self.style.SUCCESS(f"{total} ta blob qayta ishlandi."))
+                self._savings()
+            else:
+                worker.run(idle=opts["idle"])
+        except KeyboardInterrupt:
+            pass
+
+    def _savings(self):
+        s = ingest_savings()
+        original, stored = s["original"] or 0, s["stored"] or 0
+        self.stdout.write(
+            f"Qayta kodlangan rasmlar: {s['count']} ta, {original / 1024 / 1024:.1f} MB -> "
+            f"{stored / 1024 / 1024:.1f} MB ({(original - stored) / 1024 / 1024:.1f} MB tejaldi)."
+        )
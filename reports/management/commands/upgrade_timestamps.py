@@ -0,0 +1,171 @@
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from reports.models import Report, ReportAttachment
+from users.models import User
+
+
+# BaseModel dan meros olgan modellar
+MODELS = (User, Report, ReportAttachment)
+COLUMNS = ("created_at", "updated_at")
+
+# vaqtinchalik ustun: created_at -> created_at__dt
+TMP_SUFFIX = "__dt"
+
+
+class Command(BaseCommand):
+    help = (
+        "Eski bazalarda BaseModel.created_at/updated_at DateField (date) edi. "
+        "Ularni DateTimeField ga o'tkazadi va yangi indekslarni yaratadi. "
+        "Bosqichlar: (1) yangi ustun qo'shiladi, (2) bo'laklab to'ldiriladi "
+        "(sana -> mahalliy vaqt bo'yicha yarim tun), (3) eski ustun o'chirilib, "
+        "yangisi uning nomini oladi. 1-2 bosqich eski kod ishlab turganda "
+        "bajarilishi mumkin, to'xtatilsa qayta ishga tushiriladi — to'ldirilgan "
+        "qatorlar qayta o'qilmaydi. 3-bosqich qisqa tranzaksiya; undan keyin "
+        "yangi kodni ishga tushiring (--no-contract bilan kechiktirish mumkin)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=2000)
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--no-contract", action="store_true",
+            help="Faqat ustun qo'shish va to'ldirish (eski ustun o'chirilmaydi).",
+        )
+
+    def handle(self, *args, **opts):
+        conn = connections[opts["database"]]
+        self.batch = opts["batch"]
+
+        for model in MODELS:
+            table = model._meta.db_table
+            for column in COLUMNS:
+                kind = self._field_type(conn, table, column)
+                if kind == "DateTimeField":
+                    self.stdout.write(f"{table}.{column}: allaqachon datetime.")
+                    continue
+
+                tmp = column + TMP_SUFFIX
+                if self._field_type(conn, table, tmp) is None:
+                    self._expand(conn, table, tmp)
+
+                total = self._backfill(conn, model, column, tmp)
+                self.stdout.write(f"{table}.{column}: {total} ta qator to'ldirildi.")
+
+                if not opts["no_contract"]:
+                    self._contract(conn, model, column, tmp)
+                    self.stdout.write(f"{table}.{column}: datetime ga o'tkazildi.")
+
+        if opts["no_contract"]:
+            self.stdout.write(self.style.WARNING("Eski ustunlar qoldirildi — --no-contract siz qayta ishga tushiring."))
+            return
+
+        for model, index in self._indexes():
+            if self._create_index(conn, model, index):
+                self.stdout.write(f"{model._meta.db_table}: {index.name} indeksi yaratildi.")
+
+        self.stdout.write(self.style.SUCCESS("Tayyor."))
+
+    # -----------------------------------------------------------------
+    def _field_type(self, conn, table, column):
+        """
+        Ustunning Django maydon turi ("DateField", "DateTimeField", ...) yoki None.
+        """
+        with conn.cursor() as cur:
+            for info in conn.introspection.get_table_description(cur, table):
+                if info.name == column:
+                    return conn.introspection.get_field_type(info.type_code, info)
+        return None
+
+    def _expand(self, conn, table, tmp):
+        qn = conn.ops.quote_name
+        with conn.cursor() as cur:
+            cur.execute(
+                f"ALTER TABLE {qn(table)} ADD COLUMN {qn(tmp)} {conn.data_types['DateTimeField']} NULL"
+            )
+
+    def _backfill(self, conn, model, column, tmp) -> int:
+        """
+        tmp IS NULL qatorlarni pk tartibida bo'laklab to'ldiradi.
+        """
+        qn = conn.ops.quote_name
+        table, pk = qn(model._meta.db_table), qn(model._meta.pk.column)
+        total, last_pk = 0, None
+
+        while True:
+            sql = f"SELECT {pk}, {qn(column)} FROM {table} WHERE {qn(tmp)} IS NULL"
+            params = []
+            if last_pk is not None:
+                sql += f" AND {pk} > %s"
+                params.append(last_pk)
+            sql += f" ORDER BY {pk} LIMIT {int(self.batch)}"
+
+            with transaction.atomic(using=conn.alias):
+                with conn.cursor() as cur:
+                    cur.execute(sql, params)
+                    rows = cur.fetchall()
+                    if not rows:
+                        break
+                    cur.executemany(
+                        f"UPDATE {table} SET {qn(tmp)} = %s WHERE {pk} = %s",
+                        [(self._to_datetime(conn, value), row_pk) for row_pk, value in rows],
+                    )
+
+            last_pk = rows[-1][0]
+            total += len(rows)
+            self.stdout.write(f"... {total}")
+        return total
+
+    def _to_datetime(self, conn, value):
+        if isinstance(value, str):
+            value = parse_date(value[:10])
+        if isinstance(value, datetime):
+            dt = value if timezone.is_aware(value) else timezone.make_aware(value)
+        elif isinstance(value, date):
+            dt = timezone.make_aware(datetime.combine(value, time.min))
+        else:
+            # NOT NULL ustun — bo'lmasligi kerak
+            dt = timezone.now()
+        return conn.ops.adapt_datetimefield_value(dt)
+
+    def _contract(self, conn, model, column, tmp):
+        qn = conn.ops.quote_name
+        table = qn(model._meta.db_table)
+        with transaction.atomic(using=conn.alias):
+            # to'ldirish paytida eski kod qo'shgan qatorlar
+            self._backfill(conn, model, column, tmp)
+            with conn.cursor() as cur:
+                cur.execute(f"ALTER TABLE {table} DROP COLUMN {qn(column)}")
+                cur.execute(f"ALTER TABLE {table} RENAME COLUMN {qn(tmp)} TO {qn(column)}")
+                # SQLite ADD COLUMN dan keyin NOT NULL qo'sha olmaydi (jadvalni qayta qurish kerak)
+                if conn.vendor != "sqlite":
+                    cur.execute(f"ALTER TABLE {table} ALTER COLUMN {qn(column)} SET NOT NULL")
+
+    def _indexes(self):
+        """
+        (model, Index) — yangi sxemadagi created_at / updated_at indekslari.
+        """
+        for model in MODELS:
+            index = models.Index(fields=["created_at"])
+            index.set_name_with_model(model)
+            yield model, index
+        for index in Report._meta.indexes:
+            if set(COLUMNS) & set(index.fields):
+                yield Report, index
+
+    def _create_index(self, conn, model, index) -> bool:
+        """
+        Shu ustunlar bo'yicha indeks yo'q bo'lsa yaratadi.
+        """
+        columns = [model._meta.get_field(f.lstrip("-")).column for f in index.fields]
+        with conn.cursor() as cur:
+            constraints = conn.introspection.get_constraints(cur, model._meta.db_table)
+        if any(c["index"] and c["columns"] == columns for c in constraints.values()):
+            return False
+        with conn.schema_editor() as editor:
+            editor.add_index(model, index)
+        return True
@@ -1,7 +1,15 @@
+import math
+import os
+
 from django.db import models
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
 from django.conf import settings
 from utils.models import BaseModel
-from .choices import AttachmentType
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from .choices import AttachmentType, PreviewStatus
+from .geo import EARTH_RADIUS_M, grid_cell, grid_ranges, radius_bbox
 
 
 # =========================
@@ -26,6 +34,82 @@ def report_upload_path(instance, filename: str) -> str:
     return f"reports/{instance.report_id}/{filename}"
 
 
+def staged_upload_path(instance, filename: str) -> str:
+    return f"staged/{instance.user_id}/{instance.id}/{filename}"
+
+
+def blob_storage_key(sha256: str) -> str:
+    """
+    Blob va uning nusxalari (previews) fayl nomi: HMAC(SECRET_KEY, sha256).
+    sha256 faqat baza kaliti — rasmning nusxasi bor odam fayl manzilini
+    hisoblab topa olmaydi. Nomlar bazada saqlanadi, SECRET_KEY almashsa
+    eski fayllar o'z joyida qoladi.
+    """
+    return salted_hmac("reports.blob", sha256, algorithm="sha256").hexdigest()
+
+
+def blob_upload_path(instance, filename: str) -> str:
+    # kengaytma saqlanadi — media server Content-Type ni shundan aniqlaydi
+    ext = os.path.splitext(filename)[1].lower()
+    key = blob_storage_key(instance.sha256)
+    return f"blobs/{key[:2]}/{key[2:4]}/{key}{ext}"
+
+
+# =========================
+# Geo so'rovlar (grid_cell indeksi orqali)
+# =========================
+class ReportQuerySet(models.QuerySet):
+    def in_bbox(self, west, south, east, north):
+        """
+        bbox ichidagi reportlar: avval indekslangan grid_cell oraliqlari,
+        keyin aniq latitude/longitude filtri.
+        """
+        cells = Q()
+        for lo, hi in grid_ranges((west, south, east, north)):
+            cells |= Q(grid_cell__range=(lo, hi))
+        return self.filter(
+            cells,
+            latitude__gte=south, latitude__lte=north,
+            longitude__gte=west, longitude__lte=east,
+        )
+
+    def with_distance(self, lat: float, lng: float):
+        """
+        distance_m (haversine, metr) annotatsiyasi.
+        """
+        phi0 = math.radians(lat)
+        lam0 = math.radians(lng)
+        phi = Radians(Cast("latitude", FloatField()))
+        lam = Radians(Cast("longitude", FloatField()))
+
+        a = (
+            Power(Sin((phi - Value(phi0)) / Value(2.0)), 2)
+            + Value(math.cos(phi0)) * Cos(phi) * Power(Sin((lam - Value(lam0)) / Value(2.0)), 2)
+        )
+        return self.annotate(
+            distance_m=Value(2 * EARTH_RADIUS_M) * ASin(Sqrt(a)),
+        )
+
+    def within_radius(self, lat: float, lng: float, meters: float):
+        return (
+            self.in_bbox(*radius_bbox(lat, lng, meters))
+            .with_distance(lat, lng)
+            .filter(distance_m__lte=meters)
+        )
+
+    def nearest(self, lat: float, lng: float, k: int = 10, max_meters: float = 50_000, start_meters: float = 250):
+        """
+        Eng yaqin k ta report (distance_m bo'yicha). Radiusni bosqichma-bosqich
+        kengaytiradi — har qadamda faqat indeks oralig'i o'qiladi.
+        """
+        radius = min(start_meters, max_meters)
+        while True:
+            rows = list(self.within_radius(lat, lng, radius).order_by("distance_m")[:k])
+            if len(rows) >= k or radius >= max_meters:
+                return rows
+            radius = min(radius * 4, max_meters)
+
+
 # =========================
 # Main Report
 # =========================
@@ -57,9 +141,36 @@ class Report(BaseModel):
 
     resolved_at = models.DateTimeField(null=True, blank=True)
 
+    # reports.geo.grid_cell(latitude, longitude) — save() da to'ldiriladi
+    grid_cell = models.BigIntegerField(null=True, blank=True, db_index=True, editable=False)
+
+    objects = ReportQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # tashkilot / reporter ro'yxatlari: status filtri + created_at bo'yicha tartib
+            models.Index(fields=["organization", "status", "created_at"]),
+            models.Index(fields=["user", "status", "created_at"]),
+            # xarita ETag i (dashboard.maps.map_etag): MAX(updated_at) skan siz
+            models.Index(fields=["organization", "updated_at"]),
+            models.Index(fields=["updated_at"]),
+        ]
+
     def __str__(self):
         return f"Report #{self.id} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        self.grid_cell = grid_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and ({"latitude", "longitude"} & set(update_fields)):
+            kwargs["update_fields"] = {*update_fields, "grid_cell"}
+        super().save(*args, **kwargs)
+
+        # matnli qidiruv hujjati (reports.search)
+        if update_fields is None or {"description", "user"} & set(update_fields):
+            from .search import index_report
+            index_report(self)
+
     def get_status_uz(self) -> str:
         """
         Statusni doim O'zbekcha qaytaradi.
@@ -79,6 +190,53 @@ class Report(BaseModel):
         return mapping.get(self.status, str(self.status))
 
 
+# =========================
+# Kontent bo'yicha manzillangan fayllar (reports.blobs)
+# =========================
+class Blob(models.Model):
+    """
+    Bir xil tarkibli fayl diskda bir marta saqlanadi (kalit — sha256).
+    `refs` — unga ishora qiluvchi ReportAttachment lar soni; 0 ga tushganlari
+    `gc_blobs` bilan o'chiriladi.
+
+    Rasm/video uchun kichik WebP nusxalar (reports.previews) ham tarkibga
+    bog'liq — bir marta, blob uchun yasaladi: previews = {"320": nom, ...}.
+
+    Rasmlar o'sha ishda kichraytirilib qayta kodlanishi mumkin (INGEST_IMAGE_*):
+    shunda `file` — yangi fayl, `original` — asl nusxa (INGEST_KEEP_ORIGINAL
+    bo'lmasa gc_blobs o'chiradi), `original_size` — asl hajm. Kalit (sha256)
+    asl tarkibniki bo'lib qoladi — qayta yuborilgan o'sha rasm shu blobga tushadi.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to=blob_upload_path, max_length=255)
+    size = models.BigIntegerField(default=0)
+    refs = models.IntegerField(default=0)
+
+    original = models.CharField(max_length=255, blank=True, default="")
+    original_size = models.BigIntegerField(default=0)
+
+    previews = models.JSONField(default=dict, blank=True)
+    preview_status = models.CharField(
+        max_length=10,
+        choices=PreviewStatus.choices,
+        default=PreviewStatus.NONE,
+    )
+    preview_attempts = models.PositiveSmallIntegerField(default=0)
+    # keyingi urinish vaqti; worker olganlari uchun — lease tugash vaqti
+    preview_available_at = models.DateTimeField(default=timezone.now)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["preview_status", "preview_available_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.refs})"
+
+
 # =========================
 # Attachments
 # =========================
@@ -90,7 +248,15 @@ class ReportAttachment(BaseModel):
     )
 
     type = models.CharField(max_length=16, choices=AttachmentType.choices)
-    file = models.FileField(upload_to=report_upload_path)
+    # blob bo'lsa file == blob.file (nomi nusxalangan — o'qishda JOIN kerak emas)
+    file = models.FileField(upload_to=report_upload_path, max_length=255)
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="attachments"
+    )
 
     original_name = models.CharField(max_length=255, blank=True, default="")
     mime_type = models.CharField(max_length=100, blank=True, default="")
@@ -99,6 +265,58 @@ class ReportAttachment(BaseModel):
     def __str__(self):
         return f"{self.report_id} - {self.type}"
 
+    @property
+    def preview_urls(self) -> dict:
+        """
+        {"320": url, "1024": url} — WebP nusxalar (reports.previews). Hali
+        tayyor bo'lmasa bo'sh. Ro'yxatlarda "attachments__blob" prefetch qiling.
+        """
+        if not self.blob_id or not self.blob.previews:
+            return {}
+        storage = self.blob.file.storage
+        return {size: storage.url(name) for size, name in self.blob.previews.items()}
+
+    @property
+    def thumbnail_url(self) -> str:
+        urls = self.preview_urls
+        return urls[min(urls, key=int)] if urls else ""
+
+
+# =========================
+# Murojaatdan oldin yuklangan fayllar
+# =========================
+class StagedUpload(BaseModel):
+    """
+    Report yaratilishidan oldin yuklangan fayl (bot media yig'ish paytida
+    fonda yuklaydi). Report yaratishda `uploads` orqali ReportAttachment ga
+    aylanadi — fayl ko'chirilmaydi, attachment shu faylga ishora qiladi.
+    Biriktirilmay qolganlari `purge_staged_uploads` bilan o'chiriladi.
+
+    Katta fayllar bo'laklab yuklanadi (reports.uploads): qator `completed=False`
+    bilan ochiladi, fayl diskda `received` baytgacha to'ladi, yakunda sha256
+    tekshiriladi. Faqat yakunlanganlari report ga biriktiriladi.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="staged_uploads"
+    )
+
+    type = models.CharField(max_length=16, choices=AttachmentType.choices)
+    file = models.FileField(upload_to=staged_upload_path)
+
+    original_name = models.CharField(max_length=255, blank=True, default="")
+    mime_type = models.CharField(max_length=100, blank=True, default="")
+    file_size = models.BigIntegerField(default=0)
+
+    # bo'laklab yuklash: kutilgan sha256 (hex) va diskka yozilgan baytlar
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+    received = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"Staged {self.id} ({self.user_id})"
+
 
 # =========================
 # Organization reportni o‘qidi
@@ -221,4 +439,129 @@ class ReportRejection(models.Model):
     rejected_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Rejected: {self.report_id}"
\ No newline at end of file
+        return f"Rejected: {self.report_id}"
+
+# =========================
+# Kunlik hisoblagichlar (dashboard uchun rollup)
+# =========================
+class ReportDailyCounter(models.Model):
+    """
+    (organization, day, status) bo'yicha reportlar soni.
+    day = report.created_at ning mahalliy sanasi. reports.rollup orqali inkremental yangilanadi,
+    `rebuild_report_counters` buyrug'i bilan noldan qayta quriladi.
+    """
+    # tashkilot o'chishidan oldin qatorlar NULL qatorlarga qo'shiladi
+    # (reports.rollup.on_organization_deleted) — reportlari kabi SET_NULL
+    organization = models.ForeignKey(
+        "organizations.Organization",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="daily_counters"
+    )
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=ReportStatus.choices)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("organization", "day", "status")
+        constraints = [
+            # unique_together NULL larni farqlamaydi — tashkilotsiz reportlar uchun (reports.rollup upsert)
+            models.UniqueConstraint(
+                fields=["day", "status"],
+                condition=models.Q(organization__isnull=True),
+                name="dailycounter_no_org_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["day", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id} {self.day} {self.status}: {self.count}"
+
+
+# =========================
+# Xarita klasterlari (zoom bo'yicha oldindan hisoblangan)
+# =========================
+class ReportClusterCell(models.Model):
+    """
+    (organization, zoom, katak, status) bo'yicha reportlar soni va
+    koordinatalar yig'indisi (markaz = lat_sum / count).
+    Katak o'lchami reports.geo.cell_size(zoom). reports.rollup orqali
+    inkremental yangilanadi, `rebuild_report_clusters` bilan qayta quriladi.
+    """
+    # tashkilot o'chishidan oldin qatorlar NULL qatorlarga qo'shiladi
+    # (reports.rollup.on_organization_deleted) — reportlari kabi SET_NULL
+    organization = models.ForeignKey(
+        "organizations.Organization",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="cluster_cells"
+    )
+    zoom = models.PositiveSmallIntegerField()
+    cy = models.IntegerField()
+    cx = models.IntegerField()
+    status = models.CharField(max_length=20, choices=ReportStatus.choices)
+
+    count = models.IntegerField(default=0)
+    lat_sum = models.FloatField(default=0)
+    lng_sum = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ("organization", "zoom", "cy", "cx", "status")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["zoom", "cy", "cx", "status"],
+                condition=models.Q(organization__isnull=True),
+                name="clustercell_no_org_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["zoom", "cy", "cx"]),
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id} z{self.zoom} ({self.cy},{self.cx}) {self.status}: {self.count}"
+
+
+# =========================
+# Matnli qidiruv hujjati (reports.search)
+# =========================
+class ReportSearchDocument(models.Model):
+    """
+    Report tavsifi + reporter ma'lumotlari bitta matnda.
+    Ustida bazaga mos to'liq matnli indeks quriladi (reports.search),
+    Report/User saqlanganda yangilanadi, `rebuild_search_index` bilan qayta quriladi.
+    """
+    report = models.OneToOneField(
+        Report,
+        on_delete=models.CASCADE,
+        related_name="search_document"
+    )
+    body = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"Search: {self.report_id}"
+
+
+class ReportSearchIndex(models.Model):
+    """
+    SQLite FTS5 virtual jadvali ustidagi model (faqat o'qish uchun).
+    Jadvalni reports.search yaratadi; rowid = ReportSearchDocument.id,
+    rank — bm25 (kichigi yaxshiroq).
+    """
+    document = models.OneToOneField(
+        ReportSearchDocument,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        related_name="fts"
+    )
+    body = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "reports_report_fts"
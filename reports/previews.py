@@ -0,0 +1,284 @@
+# reports/previews.py
+"""
+Yuklangan rasm/video bloblarni fonda qayta ishlash (`run_preview_worker`):
+kichik WebP nusxalar (previews) va rasmlarni kichraytirib qayta kodlash
+(INGEST_IMAGE_*).
+
+  - rasm/video kengaytmali yangi blob PENDING bo'lib yaratiladi (reports.blobs)
+  - worker navbatdan `batch` ta blob oladi; olinganlarning
+    preview_available_at i LEASE_SECONDS ga suriladi — worker yiqilsa ular
+    keyin yana olinadi
+  - Pillow ishi ProcessPoolExecutor da (reports.imaging) — so'rov
+    workerlari va bir-biri bilan CPU/GIL talashmaydi; baza faqat asosiy
+    jarayonda
+  - rasm: EXIF bo'yicha buriladi; video: ffmpeg bilan bitta kadr (poster)
+  - qayta kodlangan rasm kichikroq bo'lsa blob fayli almashtiriladi,
+    attachment lar yangi faylga ko'chiriladi, asl nusxa `original` da qoladi.
+    Almashtirilmasa ham EXIF/XMP (GPS) bor rasm o'rniga metadata siz nusxa
+    (clean_name) beriladi — piksellar qayta kodlanmaydi
+  - o'qib bo'lmaydigan fayl (yoki ffmpeg yo'q) -> SKIPPED, boshqa xato
+    (jumladan bola jarayonni yiqitish) -> backoff bilan qayta, MAX_ATTEMPTS
+    dan keyin FAILED
+"""
+import logging
+import mimetypes
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .choices import PreviewStatus
+from .imaging import FORMATS, ImagingSkipped, derive_safe
+from .models import Blob, ReportAttachment, blob_storage_key
+
+log = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 5
+
+
+def previewable(name: str) -> bool:
+    mime, _ = mimetypes.guess_type(name)
+    return bool(mime) and mime.split("/")[0] in ("image", "video")
+
+
+def preview_name(sha256: str, size: int) -> str:
+    key = blob_storage_key(sha256)
+    return f"previews/{key[:2]}/{key[2:4]}/{key}_{size}.webp"
+
+
+def optimized_name(sha256: str, max_side: int, fmt: str) -> str:
+    key = blob_storage_key(sha256)
+    return f"blobs/{key[:2]}/{key[2:4]}/{key}-{max_side}{FORMATS[fmt][0]}"
+
+
+def clean_name(sha256: str, ext: str) -> str:
+    # qayta kodlanmagan, faqat metadata si olib tashlangan nusxa
+    key = blob_storage_key(sha256)
+    return f"blobs/{key[:2]}/{key[2:4]}/{key}-clean{ext}"
+
+
+def build_job(blob: Blob) -> dict:
+    """
+    derive() argumentlari — absolyut yo'llar va sozlamalar (bola jarayonda Django yo'q).
+    """
+    mime, _ = mimetypes.guess_type(blob.file.name)
+    video = bool(mime) and mime.startswith("video/")
+    job = {
+        "src": default_storage.path(blob.file.name),
+        "video": video,
+        "previews": {
+            size: default_storage.path(preview_name(blob.sha256, size))
+            for size in settings.ATTACHMENT_PREVIEW_SIZES
+        },
+        "preview_quality": settings.ATTACHMENT_PREVIEW_QUALITY,
+        "optimize": None,
+        "strip": None,
+    }
+    # allaqachon qayta kodlangan / tozalangan blob qayta ishlanmaydi
+    if not video and not blob.original:
+        # kengaytmani bola jarayon formatga qarab qo'shadi
+        job["strip"] = default_storage.path(clean_name(blob.sha256, ""))
+    if settings.INGEST_IMAGE_MAX_SIDE and not video and not blob.original:
+        fmt = settings.INGEST_IMAGE_FORMAT
+        job["optimize"] = {
+            "path": default_storage.path(optimized_name(blob.sha256, settings.INGEST_IMAGE_MAX_SIDE, fmt)),
+            "max_side": settings.INGEST_IMAGE_MAX_SIDE,
+            "format": fmt,
+            "quality": settings.INGEST_IMAGE_QUALITY,
+            "min_saving": settings.INGEST_MIN_SAVING,
+        }
+    return job
+
+
+def delete_previews(blob: Blob):
+    for name in (blob.previews or {}).values():
+        default_storage.delete(name)
+
+
+# ---------------------------------------------------------------------------
+# Navbat (baza)
+# ---------------------------------------------------------------------------
+def enqueue_missing() -> int:
+    """
+    Previews siz qolgan eski rasm/video bloblarni navbatga qo'yadi.
+    """
+    ids = [
+        pk for pk, name in Blob.objects.filter(preview_status=PreviewStatus.NONE).values_list("pk", "file").iterator()
+        if previewable(name)
+    ]
+    return Blob.objects.filter(pk__in=ids).update(
+        preview_status=PreviewStatus.PENDING, preview_available_at=timezone.now(),
+    )
+
+
+def claim_batch(limit: int, lease: float = LEASE_SECONDS):
+    now = timezone.now()
+    with transaction.atomic():
+        qs = (
+            Blob.objects
+            .filter(preview_status=PreviewStatus.PENDING, preview_available_at__lte=now)
+            .order_by("preview_available_at")
+            .only("sha256", "file", "size", "original", "preview_attempts")
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        rows = list(qs[:limit])
+        Blob.objects.filter(pk__in=[r.pk for r in rows]).update(
+            preview_available_at=now + timedelta(seconds=lease),
+        )
+    return rows
+
+
+def record_result(blob: Blob, result: dict = None, error: Exception = None, max_attempts: int = MAX_ATTEMPTS):
+    now = timezone.now()
+    fields = {"preview_attempts": blob.preview_attempts + 1, "updated_at": now}
+    previews = {str(size): preview_name(blob.sha256, size) for size in (result or {}).get("previews", {})}
+    optimized = (result or {}).get("optimized")
+
+    if error is None:
+        fields.update(preview_status=PreviewStatus.DONE, previews=previews)
+        if optimized:
+            if "ext" in optimized:
+                name = clean_name(blob.sha256, optimized["ext"])
+            else:
+                name = optimized_name(blob.sha256, settings.INGEST_IMAGE_MAX_SIDE, settings.INGEST_IMAGE_FORMAT)
+            fields.update(
+                file=name,
+                size=optimized["size"],
+                original=blob.file.name,
+                original_size=blob.size,
+            )
+    elif isinstance(error, ImagingSkipped):
+        fields.update(preview_status=PreviewStatus.SKIPPED)
+    elif fields["preview_attempts"] >= max_attempts:
+        fields.update(preview_status=PreviewStatus.FAILED)
+        log.warning("Preview %s failed: %r", blob.pk, error)
+    else:
+        fields.update(preview_available_at=now + timedelta(seconds=30 * 2 ** blob.preview_attempts))
+
+    with transaction.atomic():
+        # original sharti — parallel ikkinchi worker qayta kodlaganni ustidan yozmaydi
+        updated = Blob.objects.filter(pk=blob.pk, original=blob.original).update(**fields)
+        if updated and optimized:
+            ReportAttachment.objects.filter(blob=blob.pk).update(
+                file=fields["file"],
+                mime_type=mimetypes.guess_type(fields["file"])[0] or "",
+                file_size=optimized["size"],
+            )
+
+    if not updated:
+        # blob shu orada o'chirilgan (gc_blobs) — yozilgan fayllar ham o'chadi
+        for name in [*previews.values(), *([fields["file"]] if optimized else [])]:
+            default_storage.delete(name)
+
+
+def drop_originals(older_than) -> int:
+    """
+    INGEST_KEEP_ORIGINAL o'chiq bo'lsa: qayta kodlanganiga `older_than` dan
+    ko'p vaqt o'tgan bloblarning asl nusxasini o'chiradi. Almashtirish paytida
+    eski nomni olib qolgan attachment lar avval yangi faylga o'tkaziladi.
+    """
+    n = 0
+    for blob in Blob.objects.exclude(original="").filter(updated_at__lt=older_than).iterator():
+        with transaction.atomic():
+            ReportAttachment.objects.filter(blob=blob.pk).exclude(file=blob.file.name).update(
+                file=blob.file.name,
+                mime_type=mimetypes.guess_type(blob.file.name)[0] or "",
+                file_size=blob.size,
+            )
+            Blob.objects.filter(pk=blob.pk).update(original="")
+        default_storage.delete(blob.original)
+        n += 1
+    return n
+
+
+def ingest_savings() -> dict:
+    """
+    Qayta kodlangan rasmlar: soni, asl va saqlangan hajm (bayt).
+    """
+    return Blob.objects.filter(original_size__gt=0).aggregate(
+        count=Count("pk"),
+        original=Sum("original_size"),
+        stored=Sum("size"),
+    )
+
+
+# ---------------------------------------------------------------------------
+class PreviewWorker:
+    def __init__(self, workers: int = 4, batch: int = 20, max_attempts: int = MAX_ATTEMPTS):
+        self.workers = workers
+        self.batch = batch
+        self.max_attempts = max_attempts
+        self.pool = self._make_pool()
+
+    def _make_pool(self):
+        # spawn: bola jarayonlar faqat reports.imaging ni yuklaydi — Django,
+        # baza ulanishlari va oqimlar meros bo'lmaydi
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _restart(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = self._make_pool()
+
+    def _submit(self, blob: Blob) -> Future:
+        try:
+            return self.pool.submit(derive_safe, build_job(blob))
+        except BrokenProcessPool as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+
+    def drain_once(self) -> int:
+        """
+        Bitta partiya: olish -> jarayonlar pulida qayta ishlash -> natijani yozish. Olingan bloblar sonini qaytaradi.
+
+        Bola jarayon o'lsa (segfault, OOM killer) pul yiqiladi va tugamagan
+        hamma vazifa BrokenProcessPool bilan qaytadi — qaysi fayl sababchi
+        ekani noma'lum. Ular yangi pulda bittadan qayta ishlanadi: yana
+        yiqitgan fayl uchun urinish hisoblanadi (MAX_ATTEMPTS dan keyin FAILED),
+        qolganlari odatdagidek yoziladi.
+        """
+        rows = claim_batch(self.batch)
+        futures = [self._submit(blob) for blob in rows]
+        suspects = []
+        for blob, future in zip(rows, futures):
+            try:
+                result, error = future.result()
+            except BrokenProcessPool:
+                suspects.append(blob)
+                continue
+            record_result(blob, result, error, self.max_attempts)
+
+        if suspects:
+            self._restart()
+        for blob in suspects:
+            try:
+                result, error = self._submit(blob).result()
+            except BrokenProcessPool as e:
+                log.warning("Preview %s crashed the worker process", blob.pk)
+                result, error = None, e
+                self._restart()
+            record_result(blob, result, error, self.max_attempts)
+        return len(rows)
+
+    def run(self, idle: float = 2.0):
+        """
+        To'xtatilguncha navbatni bo'shatadi; navbat bo'sh bo'lsa `idle` soniya kutadi.
+        """
+        try:
+            while True:
+                if self.drain_once() < self.batch:
+                    time.sleep(idle)
+        finally:
+            self.close()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
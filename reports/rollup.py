@@ -0,0 +1,255 @@
+# reports/rollup.py
+import copy
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .geo import CLUSTER_ZOOMS, cell_of
+from .models import Report, ReportClusterCell, ReportDailyCounter
+
+
+def _upsert(model, key_fields: tuple, sum_fields: tuple, rows: list):
+    """
+    rows: [(key qiymatlari, delta qiymatlari), ...] — hammasi bitta
+    INSERT ... ON CONFLICT DO UPDATE so'rovida: bor qatorga delta qo'shiladi,
+    yo'g'i yaratiladi. organization NULL bo'lsa (unique_together NULL ni
+    farqlamaydi) qisman unique indeks (Meta.constraints) nishonga olinadi.
+    Bitta chaqiruvda hamma qatorlarning organization_id si bir xil bo'lishi kerak.
+    """
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    fields = [model._meta.get_field(f) for f in (*key_fields, *sum_fields)]
+    columns = [f.column for f in fields]
+
+    keys = fields[:len(key_fields)]
+    if rows[0][0][key_fields.index("organization")] is None:
+        target = "(%s) WHERE %s IS NULL" % (
+            ", ".join(qn(f.column) for f in keys if f.name != "organization"),
+            qn(model._meta.get_field("organization").column),
+        )
+    else:
+        target = "(%s)" % ", ".join(qn(f.column) for f in keys)
+
+    placeholders = "(%s)" % ", ".join(["%s"] * len(columns))
+    sums = ", ".join(
+        "%s = %s.%s + excluded.%s" % (qn(c), table, qn(c), qn(c)) for c in columns[len(key_fields):]
+    )
+    sql = "INSERT INTO %s (%s) VALUES %s ON CONFLICT %s DO UPDATE SET %s" % (
+        table,
+        ", ".join(qn(c) for c in columns),
+        ", ".join([placeholders] * len(rows)),
+        target,
+        sums,
+    )
+    params = [
+        field.get_db_prep_value(v, connection)
+        for key, deltas in rows
+        for field, v in zip(fields, (*key, *deltas))
+    ]
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+
+
+def _day(report: Report):
+    # created_at — datetime; kun mahalliy vaqt (TIME_ZONE) bo'yicha
+    return timezone.localdate(report.created_at)
+
+
+def _bump(report: Report, deltas: dict):
+    """
+    deltas: {status: +-n} — kunlik hisoblagichga bitta so'rov.
+    """
+    _upsert(
+        ReportDailyCounter,
+        ("organization", "day", "status"),
+        ("count",),
+        [((report.organization_id, _day(report), status), (delta,)) for status, delta in deltas.items()],
+    )
+
+
+def _bump_cells(report: Report, deltas: dict):
+    """
+    deltas: {status: +-n} — hamma zoom lardagi kataklarga bitta so'rov.
+    """
+    lat = float(report.latitude)
+    lng = float(report.longitude)
+    rows = []
+    for zoom in CLUSTER_ZOOMS:
+        cy, cx = cell_of(lat, lng, zoom)
+        for status, sign in deltas.items():
+            rows.append((
+                (report.organization_id, zoom, cy, cx, status),
+                (sign, sign * lat, sign * lng),
+            ))
+    _upsert(
+        ReportClusterCell,
+        ("organization", "zoom", "cy", "cx", "status"),
+        ("count", "lat_sum", "lng_sum"),
+        rows,
+    )
+
+
+def on_report_created(report: Report):
+    _bump(report, {report.status: 1})
+    _bump_cells(report, {report.status: 1})
+
+
+def on_status_changed(report: Report, old_status: str):
+    """
+    Status o'zgargandan keyin chaqiriladi (report.status = yangi status).
+    """
+    if old_status == report.status:
+        return
+    deltas = {old_status: -1, report.status: 1}
+    _bump(report, deltas)
+    _bump_cells(report, deltas)
+
+
+def on_report_deleted(report: Report):
+    """
+    Report o'chirilganda (reports.apps dagi post_delete) hisoblagichlar kamayadi.
+    """
+    _bump(report, {report.status: -1})
+    _bump_cells(report, {report.status: -1})
+
+
+def on_report_changed(old: Report, report: Report):
+    """
+    Report ning tashkiloti, statusi yoki koordinatasi o'zgargandan keyin
+    (admin, set_organization): eski holat ayiriladi, yangisi qo'shiladi.
+    """
+    place = ("organization_id", "latitude", "longitude", "created_at")
+    if all(getattr(old, f) == getattr(report, f) for f in place):
+        on_status_changed(report, old.status)
+        return
+    on_report_deleted(old)
+    on_report_created(report)
+
+
+def set_organization(report: Report, organization_id, **fields) -> bool:
+    """
+    set_status kabi: tashkilotni shartli UPDATE bilan o'zgartiradi va
+    hisoblagichlarni eski tashkilotdan yangisiga ko'chiradi. Parallel so'rov
+    shu orada o'zgartirgan bo'lsa False. Tranzaksiya ichida chaqiriladi.
+    """
+    old = copy.copy(report)
+    fields.update(organization_id=organization_id, updated_at=timezone.now())
+    qs = Report.objects.filter(pk=report.pk, status=old.status)
+    qs = qs.filter(organization_id=old.organization_id) if old.organization_id else qs.filter(organization__isnull=True)
+    if not qs.update(**fields):
+        return False
+    for name, value in fields.items():
+        setattr(report, name, value)
+    on_report_changed(old, report)
+    return True
+
+
+def _merge_into_null(model, key_fields: tuple, sum_fields: tuple, organization_id):
+    # tashkilot qatorlarini NULL qatorlarga qo'shib, o'zini o'chiradi
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    org = qn(model._meta.get_field("organization").column)
+    keys = [qn(model._meta.get_field(f).column) for f in key_fields]
+    sums = [qn(model._meta.get_field(f).column) for f in sum_fields]
+    sql = "INSERT INTO %s (%s, %s) SELECT NULL, %s FROM %s WHERE %s = %%s ON CONFLICT (%s) WHERE %s IS NULL DO UPDATE SET %s" % (
+        table,
+        org,
+        ", ".join(keys + sums),
+        ", ".join(keys + sums),
+        table,
+        org,
+        ", ".join(keys),
+        org,
+        ", ".join("%s = %s.%s + excluded.%s" % (c, table, c, c) for c in sums),
+    )
+    with connection.cursor() as cur:
+        cur.execute(sql, [organization_id])
+    model.objects.filter(organization_id=organization_id).delete()
+
+
+def on_organization_deleted(organization_id):
+    """
+    Tashkilot o'chirilishidan oldin (reports.apps dagi pre_delete): uning
+    reportlari organization=NULL bo'lib qoladi (SET_NULL), shuning uchun
+    hisoblagich va kataklari ham NULL qatorlarga ko'chiriladi.
+    """
+    with transaction.atomic():
+        _merge_into_null(ReportDailyCounter, ("day", "status"), ("count",), organization_id)
+        _merge_into_null(ReportClusterCell, ("zoom", "cy", "cx", "status"), ("count", "lat_sum", "lng_sum"), organization_id)
+
+
+def set_status(report: Report, status: str, **fields) -> bool:
+    """
+    Statusni shartli UPDATE bilan o'zgartiradi (WHERE status = report.status)
+    va hisoblagichlarni yangilaydi. Parallel so'rov statusni shu orada
+    o'zgartirgan bo'lsa hech narsa qilinmaydi va False qaytadi — hisoblagichlar
+    ikki marta o'zgarmaydi. Tranzaksiya ichida chaqiriladi.
+    """
+    old_status = report.status
+    fields.update(status=status, updated_at=timezone.now())
+    if not Report.objects.filter(pk=report.pk, status=old_status).update(**fields):
+        return False
+    for name, value in fields.items():
+        setattr(report, name, value)
+    on_status_changed(report, old_status)
+    return True
+
+
+@transaction.atomic
+def rebuild_counters() -> int:
+    """
+    Jadvalni reports_report dan noldan quradi. Yaratilgan qatorlar sonini qaytaradi.
+    """
+    ReportDailyCounter.objects.all().delete()
+    rows = (
+        Report.objects.order_by()
+        .annotate(day=TruncDate("created_at"))
+        .values("organization_id", "day", "status")
+        .annotate(c=Count("id"))
+    )
+    objs = [
+        ReportDailyCounter(
+            organization_id=row["organization_id"],
+            day=row["day"],
+            status=row["status"],
+            count=row["c"],
+        )
+        for row in rows.iterator()
+    ]
+    ReportDailyCounter.objects.bulk_create(objs, batch_size=1000)
+    return len(objs)
+
+
+@transaction.atomic
+def rebuild_clusters() -> int:
+    """
+    Klaster qatlamlarini noldan quradi. Kataklar _bump_cells dagi
+    cell_of bilan hisoblanadi — SQL dagi floor(lat/size) chegaradagi
+    nuqtani boshqa katakka tushirishi mumkin, keyingi kamaytirish esa
+    boshqa qatorga tegardi. Reportlar bir marta, bo'laklab o'qiladi.
+    Yaratilgan kataklar sonini qaytaradi.
+    """
+    ReportClusterCell.objects.all().delete()
+
+    cells = defaultdict(lambda: [0, 0.0, 0.0])
+    rows = Report.objects.order_by().values_list("organization_id", "status", "latitude", "longitude")
+    for org_id, status, lat, lng in rows.iterator(chunk_size=2000):
+        lat, lng = float(lat), float(lng)
+        for zoom in CLUSTER_ZOOMS:
+            cell = cells[(org_id, zoom, *cell_of(lat, lng, zoom), status)]
+            cell[0] += 1
+            cell[1] += lat
+            cell[2] += lng
+
+    objs = [
+        ReportClusterCell(
+            organization_id=org_id, zoom=zoom, cy=cy, cx=cx, status=status,
+            count=count, lat_sum=lat_sum, lng_sum=lng_sum,
+        )
+        for (org_id, zoom, cy, cx, status), (count, lat_sum, lng_sum) in cells.items()
+    ]
+    ReportClusterCell.objects.bulk_create(objs, batch_size=1000)
+    return len(objs)
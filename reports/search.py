@@ -0,0 +1,276 @@
+# reports/search.py
+"""
+Reportlar bo'yicha matnli qidiruv: tavsif + reporter (username, ism,
+familiya, telefon, email).
+
+Har report uchun ReportSearchDocument.body saqlanadi, ustida bazaga mos
+indeks quriladi:
+  - SQLite:   FTS5 virtual jadval (trigram — icontains kabi so'z ichidan
+              ham topadi), external content + triggerlar orqali sinxron
+  - Postgres: to_tsvector('simple', body) bo'yicha GIN indeks
+  - boshqa:   body__icontains (indekssiz, lekin joinlarsiz)
+
+Viewlar faqat search_reports() ni chaqiradi.
+"""
+import re
+import uuid
+
+from django.db import DatabaseError, connections
+from django.db.models import BooleanField, F, FloatField, Func, Q, Value
+
+from .models import Report, ReportSearchDocument, ReportSearchIndex
+
+
+DOC_TABLE = ReportSearchDocument._meta.db_table
+FTS_TABLE = ReportSearchIndex._meta.db_table
+PG_INDEX = "reports_search_body_gin"
+
+# trigram indeksi 3 belgidan qisqa bo'lakni qidira olmaydi
+MIN_TOKEN_CHARS = 3
+
+# ID bo'lagi: kamida bitta raqam yoki UUID o'rnidagi chiziqcha — "facade", "decade"
+# kabi a-f harfli so'zlar matn bo'yicha qidiriladi
+_HEX_ID = re.compile(r"(?=[a-f-]*\d)[0-9a-f-]{6,}|[0-9a-f]{8}-[0-9a-f-]*")
+
+
+def document_body(description: str, user) -> str:
+    parts = [description or ""]
+    if user is not None:
+        parts += [
+            user.username or "",
+            user.first_name or "",
+            user.last_name or "",
+            getattr(user, "phone_number", "") or "",
+            user.email or "",
+        ]
+    return "\n".join(p for p in parts if p)
+
+
+def _upsert_documents(docs):
+    ReportSearchDocument.objects.bulk_create(
+        docs,
+        update_conflicts=True,
+        unique_fields=["report"],
+        update_fields=["body"],
+        batch_size=500,
+    )
+
+
+def index_report(report: Report):
+    _upsert_documents([
+        ReportSearchDocument(report_id=report.pk, body=document_body(report.description, report.user)),
+    ])
+
+
+def reindex_user(user):
+    """
+    Foydalanuvchi ma'lumotlari o'zgarganda uning barcha reportlari hujjatini yangilaydi.
+    """
+    rows = Report.objects.filter(user=user).values_list("id", "description")
+    _upsert_documents([
+        ReportSearchDocument(report_id=pk, body=document_body(description, user))
+        for pk, description in rows
+    ])
+
+
+# ---------------------------------------------------------------------------
+# Backendlar: match(qs, q) -> filtrlangan va `search_rank` qo'shilgan qs
+# ---------------------------------------------------------------------------
+class IContainsBackend:
+    """
+    Indekssiz zaxira: hujjat matni bo'yicha icontains (bitta jadval, joinsiz).
+    """
+    vendor = None
+
+    def install(self, conn):
+        pass
+
+    def rebuild(self, conn):
+        pass
+
+    def match(self, qs, q: str):
+        docs = ReportSearchDocument.objects.all()
+        for token in q.split():
+            docs = docs.filter(body__icontains=token)
+        return qs.filter(pk__in=docs.values("report_id")).annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+        )
+
+
+class _Fts5Match(Func):
+    # "reports_report_fts"."body" MATCH %s
+    template = "%(expressions)s"
+    arg_joiner = " MATCH "
+    output_field = BooleanField()
+
+
+class SqliteFTSBackend(IContainsBackend):
+    vendor = "sqlite"
+
+    def install(self, conn):
+        with conn.cursor() as cur:
+            cur.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"body, content='{DOC_TABLE}', content_rowid='id', tokenize='trigram')"
+            )
+            cur.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END"
+            )
+            cur.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); END"
+            )
+            cur.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {DOC_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); "
+                f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END"
+            )
+
+    def rebuild(self, conn):
+        with conn.cursor() as cur:
+            cur.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    def match(self, qs, q: str):
+        tokens = q.split()
+        long_tokens = [t for t in tokens if len(t) >= MIN_TOKEN_CHARS]
+        if not long_tokens:
+            return super().match(qs, q)
+
+        # har bir bo'lak — qo'shtirnoq ichidagi satr (FTS5 sintaksisi ishlamasin)
+        expr = " AND ".join('"{}"'.format(t.replace('"', '""')) for t in long_tokens)
+
+        # report -> hujjat -> fts bitta join bilan: bm25 har topilgan qator uchun bir marta
+        # isnull=False — join INNER bo'lsin (LEFT JOIN da MATCH ishlamaydi)
+        qs = qs.filter(
+            _Fts5Match(F("search_document__fts__body"), Value(expr)),
+            search_document__fts__isnull=False,
+        )
+        for token in tokens:
+            if len(token) < MIN_TOKEN_CHARS:
+                qs = qs.filter(search_document__body__icontains=token)
+        return qs.annotate(search_rank=-F("search_document__fts__rank"))
+
+
+class _TsMatch(Func):
+    # to_tsvector('simple', body) @@ to_tsquery('simple', %s)
+    template = "to_tsvector('simple', %(expressions)s)"
+    arg_joiner = ") @@ to_tsquery('simple', "
+    output_field = BooleanField()
+
+
+class _TsRank(Func):
+    template = "ts_rank(to_tsvector('simple', %(expressions)s))"
+    arg_joiner = "), to_tsquery('simple', "
+    output_field = FloatField()
+
+
+class PostgresFTSBackend(IContainsBackend):
+    vendor = "postgresql"
+
+    def install(self, conn):
+        with conn.cursor() as cur:
+            cur.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {DOC_TABLE} "
+                f"USING GIN (to_tsvector('simple', body))"
+            )
+
+    def match(self, qs, q: str):
+        tokens = re.findall(r"\w+", q)
+        if not tokens:
+            return super().match(qs, q)
+
+        # prefiks bo'yicha: "tosh" -> Toshkent
+        expr = " & ".join(f"{t}:*" for t in tokens)
+        body = F("search_document__body")
+        return qs.filter(_TsMatch(body, Value(expr))).annotate(search_rank=_TsRank(body, Value(expr)))
+
+
+BACKENDS = {b.vendor: b for b in (SqliteFTSBackend(), PostgresFTSBackend())}
+_fallback = IContainsBackend()
+
+# alias -> backend (FTS5 yo'q SQLite build'larida zaxiraga tushadi)
+_installed = {}
+
+
+def get_backend(alias: str = "default"):
+    if alias in _installed:
+        return _installed[alias]
+    return BACKENDS.get(connections[alias].vendor, _fallback)
+
+
+def install(alias: str = "default"):
+    """
+    Indeks/virtual jadval/triggerlarni yaratadi (idempotent). post_migrate da chaqiriladi.
+    """
+    conn = connections[alias]
+    backend = BACKENDS.get(conn.vendor, _fallback)
+    try:
+        backend.install(conn)
+    except DatabaseError:
+        backend = _fallback
+    _installed[alias] = backend
+    return backend
+
+
+def rebuild(alias: str = "default", batch_size: int = 2000) -> int:
+    """
+    Barcha hujjatlarni noldan yozadi va indeksni qayta quradi. Hujjatlar sonini qaytaradi.
+    """
+    backend = install(alias)
+    ReportSearchDocument.objects.using(alias).all().delete()
+
+    total = 0
+    batch = []
+    rows = (
+        Report.objects.using(alias).order_by()
+        .select_related("user")
+        .only("id", "description", "user__username", "user__first_name",
+              "user__last_name", "user__phone_number", "user__email")
+    )
+    for report in rows.iterator(chunk_size=batch_size):
+        batch.append(ReportSearchDocument(report_id=report.pk, body=document_body(report.description, report.user)))
+        if len(batch) >= batch_size:
+            ReportSearchDocument.objects.using(alias).bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        ReportSearchDocument.objects.using(alias).bulk_create(batch)
+        total += len(batch)
+
+    backend.rebuild(connections[alias])
+    return total
+
+
+def _id_match(q: str):
+    """
+    Report ID (to'liq UUID yoki uning bo'lagi) bo'yicha shart yoki None.
+    Faqat raqamlardan iborat q (telefon) ID deb hisoblanmaydi.
+    """
+    try:
+        return Q(pk=uuid.UUID(q))
+    except ValueError:
+        pass
+    low = q.lower()
+    if _HEX_ID.fullmatch(low) and not low.replace("-", "").isdigit():
+        return Q(id__icontains=low)
+    return None
+
+
+def search_reports(qs, q: str):
+    """
+    qs ni q bo'yicha filtrlaydi, `search_rank` ni qo'shadi va
+    relevantlik bo'yicha (keyin qs ning avvalgi tartibi bilan) saralaydi.
+    ID ga o'xshagan q (UUID yoki uning hex bo'lagi) — ID bo'yicha qidiriladi.
+    q bo'sh bo'lsa qs o'zgarmaydi.
+    """
+    q = (q or "").strip()
+    if not q:
+        return qs
+
+    id_condition = _id_match(q)
+    if id_condition is not None:
+        return qs.filter(id_condition)
+
+    ordering = qs.query.order_by or Report._meta.ordering or ()
+    return get_backend(qs.db).match(qs, q).order_by("-search_rank", *ordering)
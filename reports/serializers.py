@@ -1,8 +1,61 @@
 import mimetypes
+import os
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.utils.text import get_valid_filename
 from rest_framework import serializers
-from .models import Report, ReportAttachment
+from .models import Report, ReportAttachment, StagedUpload
 from organizations.models import Organization
 from .choices import AttachmentType, ReportStatus
+from .rollup import on_report_created
+from .duplicates import find_duplicates
+from . import blobs, uploads
+from utils.prefetch import PrefetchSerializerMixin
+
+
+def attachment_type(mime: str) -> str:
+    if mime.startswith("image/"):
+        return AttachmentType.IMAGE
+    if mime.startswith("video/"):
+        return AttachmentType.VIDEO
+    if mime.startswith("audio/"):
+        return AttachmentType.VOICE
+    return AttachmentType.FILE
+
+
+def guess_mime(f) -> str:
+    mime, _ = mimetypes.guess_type(getattr(f, "name", "") or "")
+    return mime or getattr(f, "content_type", "") or ""
+
+
+def check_upload(mime: str, size: int):
+    """
+    Oldindan yuklash (oddiy va bo'laklab) uchun umumiy chegaralar:
+    CHUNKED_UPLOAD_MAX_SIZE va UPLOAD_ALLOWED_MIME_PREFIXES.
+    """
+    if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise serializers.ValidationError("Fayl juda katta.")
+    if not mime.startswith(settings.UPLOAD_ALLOWED_MIME_PREFIXES):
+        raise serializers.ValidationError("Bu turdagi faylni yuklab bo‘lmaydi.")
+
+
+def create_attachment(report, f, type: str, mime: str) -> ReportAttachment:
+    """
+    Yuklangan fayl -> blob (bir xil tarkib qayta yozilmaydi) -> ReportAttachment.
+    """
+    name = getattr(f, "name", "") or ""
+    with transaction.atomic():
+        blob = blobs.store(f, name)
+        return ReportAttachment.objects.create(
+            report=report,
+            type=type,
+            file=blob.file.name,
+            blob=blob,
+            original_name=name,
+            mime_type=blobs.stored_mime(blob, mime),
+            file_size=blob.size,
+        )
 
 
 class ReportAttachmentSerializer(serializers.ModelSerializer):
@@ -20,10 +73,12 @@ class ReportAttachmentSerializer(serializers.ModelSerializer):
         return request.build_absolute_uri(url) if request else url
 
 
-class ReportSerializer(serializers.ModelSerializer):
+class ReportSerializer(PrefetchSerializerMixin, serializers.ModelSerializer):
     attachments = ReportAttachmentSerializer(many=True, read_only=True)
     organization_name = serializers.CharField(source="organization.name", read_only=True)
 
+    select_related = ("organization",)
+
     class Meta:
         model = Report
         fields = (
@@ -41,15 +96,42 @@ class ReportSerializer(serializers.ModelSerializer):
         read_only_fields = ("status", "resolved_at", "created_at", "attachments", "organization_name")
 
 
+class DuplicateReportSerializer(serializers.ModelSerializer):
+    """
+    Yaqin atrofdagi boshqa odamlarning murojaatlari — faqat status va
+    masofa. id, tashkilot, vaqt va tavsif qaytarilmaydi (shaxsiy ma'lumot).
+    """
+    distance_m = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Report
+        fields = ("status", "distance_m")
+
+    def get_distance_m(self, obj):
+        return int(round(getattr(obj, "distance_m", 0) or 0))
+
+
+class DuplicateCheckSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    organization = serializers.PrimaryKeyRelatedField(
+        queryset=Organization.objects.all(),
+        required=False,
+        allow_null=True
+    )
+
+
 class ReportCreateSerializer(serializers.ModelSerializer):
     organization = serializers.PrimaryKeyRelatedField(
         queryset=Organization.objects.all(),
         required=True
     )
+    # oldindan yuklangan fayllar (POST /api/reports/uploads/) id lari
+    uploads = serializers.ListField(child=serializers.UUIDField(), required=False, write_only=True)
 
     class Meta:
         model = Report
-        fields = ("description", "latitude", "longitude", "organization")
+        fields = ("description", "latitude", "longitude", "organization", "uploads")
 
     def validate(self, attrs):
         lat = attrs.get("latitude")
@@ -65,47 +147,117 @@ class ReportCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         request = self.context["request"]
         user = request.user
+        upload_ids = validated_data.pop("uploads", [])
 
-        report = Report.objects.create(user=user, **validated_data)
+        with transaction.atomic():
+            report = Report.objects.create(user=user, **validated_data)
+            on_report_created(report)
+            if upload_ids:
+                self._attach_uploads(report, upload_ids)
 
         files = request.FILES.getlist("files")
         for f in files:
-            mime, _ = mimetypes.guess_type(getattr(f, "name", "") or "")
-            mime = mime or getattr(f, "content_type", "") or ""
-
-            atype = AttachmentType.FILE
-            if mime.startswith("image/"):
-                atype = AttachmentType.IMAGE
-            elif mime.startswith("video/"):
-                atype = AttachmentType.VIDEO
-            elif mime.startswith("audio/"):
-                atype = AttachmentType.VOICE
-
-            ReportAttachment.objects.create(
-                report=report,
-                type=atype,
-                file=f,
-                original_name=getattr(f, "name", "") or "",
-                mime_type=mime,
-                file_size=getattr(f, "size", 0) or 0,
-            )
+            mime = guess_mime(f)
+            create_attachment(report, f, attachment_type(mime), mime)
+
+        # shu joyda ochiq murojaatlar bormi (bloklamaymiz, faqat xabar beramiz)
+        self.duplicates = find_duplicates(
+            report.latitude,
+            report.longitude,
+            organization_id=report.organization_id,
+            exclude_id=report.id,
+        )
 
         return report
 
+    def _attach_uploads(self, report, upload_ids):
+        """
+        StagedUpload -> ReportAttachment (fayl o'sha joyida qoladi), staged qatorlar o'chiriladi.
+        """
+        staged = {
+            u.id: u
+            for u in StagedUpload.objects.select_for_update().filter(
+                user=report.user, id__in=upload_ids, completed=True
+            )
+        }
+        if len(staged) != len(set(upload_ids)):
+            raise serializers.ValidationError({"uploads": "Yuklangan fayl topilmadi yoki muddati o‘tgan."})
 
-class ReportAttachmentCreateSerializer(serializers.Serializer):
-    type = serializers.ChoiceField(choices=AttachmentType.choices)
-    file = serializers.FileField()
+        uploads.attach(report, [staged[i] for i in dict.fromkeys(upload_ids)])
+
+
+class StagedUploadSerializer(serializers.ModelSerializer):
+    type = serializers.ChoiceField(choices=AttachmentType.choices, required=False)
+
+    class Meta:
+        model = StagedUpload
+        fields = ("id", "type", "file", "original_name", "mime_type", "file_size", "created_at")
+        read_only_fields = ("original_name", "mime_type", "file_size", "created_at")
+        extra_kwargs = {"file": {"write_only": True}}
+
+    def validate_file(self, f):
+        check_upload(guess_mime(f), getattr(f, "size", 0) or 0)
+        return f
 
     def create(self, validated_data):
-        report = self.context["report"]
         f = validated_data["file"]
-        mime = getattr(f, "content_type", "") or ""
-        return ReportAttachment.objects.create(
-            report=report,
-            type=validated_data["type"],
+        mime = guess_mime(f)
+        return StagedUpload.objects.create(
+            user=self.context["request"].user,
+            type=validated_data.get("type") or attachment_type(mime),
             file=f,
             original_name=getattr(f, "name", "") or "",
             mime_type=mime,
             file_size=getattr(f, "size", 0) or 0,
+            sha256=blobs.sha256_of(f),
         )
+
+
+class ChunkedUploadCompleteSerializer(serializers.Serializer):
+    # faqat so'rovchining o'z reportlari (queryset __init__ da)
+    report = serializers.PrimaryKeyRelatedField(queryset=Report.objects.none(), required=False, allow_null=True)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["report"].queryset = Report.objects.filter(user=self.context["request"].user)
+
+
+class ChunkedUploadStartSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r"^[0-9a-fA-F]{64}$")
+    content_type = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    type = serializers.ChoiceField(choices=AttachmentType.choices, required=False)
+
+    def validate_filename(self, value):
+        try:
+            return get_valid_filename(os.path.basename(value))
+        except SuspiciousFileOperation:
+            raise serializers.ValidationError("Fayl nomi noto‘g‘ri.")
+
+    def validate(self, attrs):
+        attrs["mime"] = mimetypes.guess_type(attrs["filename"])[0] or attrs.get("content_type") or ""
+        check_upload(attrs["mime"], attrs["size"])
+        return attrs
+
+    def create(self, validated_data):
+        name = validated_data["filename"]
+        mime = validated_data["mime"]
+        return uploads.start(
+            user=self.context["request"].user,
+            filename=name,
+            size=validated_data["size"],
+            sha256=validated_data["sha256"],
+            mime=mime,
+            type=validated_data.get("type") or attachment_type(mime),
+        )
+
+
+class ReportAttachmentCreateSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=AttachmentType.choices)
+    file = serializers.FileField()
+
+    def create(self, validated_data):
+        f = validated_data["file"]
+        mime = getattr(f, "content_type", "") or ""
+        return create_attachment(self.context["report"], f, validated_data["type"], mime)
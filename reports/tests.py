@@ -1,3 +1,1018 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from uuid import UUID
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from PIL import Image
+
+from organizations.models import Organization
+
+from .blobs import adopt, sweep_orphans
+from .geo import CLUSTER_ZOOMS, cell_size
+from .choices import PreviewStatus, ReportStatus
+from .models import Blob, Report, ReportAttachment, ReportClusterCell, ReportDailyCounter, StagedUpload
+from .imaging import strip_metadata
+from .previews import PreviewWorker
+from .rollup import (
+    on_report_created, on_status_changed, rebuild_clusters, rebuild_counters, set_organization, set_status,
+)
+from .search import rebuild as rebuild_search, search_reports
+from .uploads import ChunkError, write_chunk
+from utils.pagination import encode_cursor, keyset_page
+from utils.testing import QueryCountMixin
+
+
+# ReportAdmin inline formset prefikslari
+ADMIN_INLINES = ("attachments", "reads", "acceptance", "assignments", "redirects")
+
+
+class ReportRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="reporter")
+        cls.org = Organization.objects.create(name="Org")
+
+    def _create(self):
+        report = Report.objects.create(
+            user=self.user,
+            organization=self.org,
+            description="x",
+            latitude=Decimal("41.3"),
+            longitude=Decimal("69.2"),
+        )
+        on_report_created(report)
+        return report
+
+    def _counts(self):
+        return dict(
+            ReportDailyCounter.objects.filter(count__gt=0).values_list("status", "count")
+        )
+
+    def test_incremental_matches_rebuild(self):
+        r1 = self._create()
+        self._create()
+
+        old = r1.status
+        r1.status = ReportStatus.RESOLVED
+        r1.save(update_fields=["status"])
+        on_status_changed(r1, old)
+
+        incremental = self._counts()
+        self.assertEqual(incremental, {ReportStatus.NEW: 1, ReportStatus.RESOLVED: 1})
+
+        rebuild_counters()
+        self.assertEqual(self._counts(), incremental)
+
+    def test_cluster_cells_follow_status(self):
+        r1 = self._create()
+        self._create()
+        old = r1.status
+        r1.status = ReportStatus.REJECTED
+        r1.save(update_fields=["status"])
+        on_status_changed(r1, old)
+
+        def cells():
+            return sorted(
+                ReportClusterCell.objects.filter(zoom=10, count__gt=0).values_list("status", "count")
+            )
+
+        incremental = cells()
+        self.assertEqual(incremental, [(ReportStatus.NEW, 1), (ReportStatus.REJECTED, 1)])
+
+        rebuild_clusters()
+        self.assertEqual(cells(), incremental)
+
+    def test_rebuild_matches_incremental_on_cell_edges(self):
+        # katak chegarasidagi va unga juda yaqin nuqtalar
+        size = cell_size(14)
+        for k in (2953, 2954):
+            for eps in (0, 1e-6, -1e-6):
+                on_report_created(Report.objects.create(
+                    user=self.user, organization=self.org, description="x",
+                    latitude=Decimal(f"{k * size + eps:.6f}"), longitude=Decimal(f"{4*k * size + eps:.6f}"),
+                ))
+
+        def cells():
+            return sorted(
+                ReportClusterCell.objects.filter(count__gt=0).values_list("zoom", "cy", "cx", "status", "count")
+            )
+
+        incremental = cells()
+        rebuild_clusters()
+        self.assertEqual(cells(), incremental)
+
+    def test_stale_status_change_counted_once(self):
+        report = self._create()
+        stale = Report.objects.get(pk=report.pk)
+
+        self.assertTrue(set_status(report, ReportStatus.RESOLVED))
+        # ikkinchi so'rov eski statusni o'qigan — hech narsa o'zgarmaydi
+        self.assertFalse(set_status(stale, ReportStatus.REJECTED))
+
+        self.assertEqual(self._counts(), {ReportStatus.RESOLVED: 1})
+        self.assertEqual(Report.objects.get(pk=report.pk).status, ReportStatus.RESOLVED)
+
+    def test_delete_decrements(self):
+        report = self._create()
+        self._create()
+        report.delete()
+
+        self.assertEqual(self._counts(), {ReportStatus.NEW: 1})
+        self.assertEqual(
+            sum(ReportClusterCell.objects.filter(zoom=10).values_list("count", flat=True)), 1,
+        )
+
+    def _by_org(self, model):
+        rows = {}
+        for org_id, count in model.objects.filter(count__gt=0).values_list("organization_id", "count"):
+            rows[org_id] = rows.get(org_id, 0) + count
+        return rows
+
+    def test_organization_delete_moves_counts_to_null(self):
+        org = Organization.objects.create(name="Closed")
+        gone = self._create()
+        Report.objects.filter(pk=gone.pk).update(organization=org)
+        rebuild_counters()
+        rebuild_clusters()
+        self._create()
+
+        org.delete()
+        self.assertEqual(self._by_org(ReportDailyCounter), {self.org.id: 1, None: 1})
+        self.assertEqual(self._by_org(ReportClusterCell), {self.org.id: len(CLUSTER_ZOOMS), None: len(CLUSTER_ZOOMS)})
+
+        # keyin report o'chsa NULL qatorlar manfiy bo'lmaydi
+        Report.objects.get(pk=gone.pk).delete()
+        self.assertFalse(ReportDailyCounter.objects.filter(count__lt=0).exists())
+        self.assertFalse(ReportClusterCell.objects.filter(count__lt=0).exists())
+        self.assertEqual(self._by_org(ReportDailyCounter), {self.org.id: 1})
+
+    def test_set_organization_moves_counts(self):
+        other = Organization.objects.create(name="Other")
+        report = self._create()
+        stale = Report.objects.get(pk=report.pk)
+
+        self.assertTrue(set_organization(report, other.id))
+        self.assertFalse(set_organization(stale, None))
+        self.assertEqual(self._by_org(ReportDailyCounter), {other.id: 1})
+        self.assertEqual(self._by_org(ReportClusterCell), {other.id: len(CLUSTER_ZOOMS)})
+
+    def test_admin_edit_goes_through_rollup(self):
+        admin = get_user_model().objects.create(username="root", is_superuser=True, is_staff=True)
+        other = Organization.objects.create(name="Other")
+        report = self._create()
+        self.client.force_login(admin)
+        r = self.client.post(f"/admin/reports/report/{report.pk}/change/", {
+            "user": self.user.pk, "organization": other.pk, "status": ReportStatus.READ,
+            "description": "x", "latitude": "41.3", "longitude": "69.2",
+            **{f"{prefix}-{k}": 0 for prefix in ADMIN_INLINES for k in ("TOTAL_FORMS", "INITIAL_FORMS")},
+        })
+        self.assertEqual(r.status_code, 302)
+        self.assertEqual(
+            list(ReportDailyCounter.objects.filter(count__gt=0).values_list("organization_id", "status", "count")),
+            [(other.id, ReportStatus.READ, 1)],
+        )
+
+    def test_one_upsert_per_table(self):
+        report = self._create()
+        # kunlik hisoblagich + hamma zoom lardagi kataklar — 2 ta so'rov
+        with self.assertNumQueries(2):
+            on_report_created(report)
+        # shartli UPDATE + 2 ta upsert
+        with self.assertNumQueries(3):
+            set_status(report, ReportStatus.READ)
+
+    def test_without_organization(self):
+        # NULL tashkilot — qisman unique indeks orqali bitta qatorga yig'iladi
+        for _ in range(2):
+            on_report_created(Report.objects.create(
+                user=self.user, description="x", latitude=Decimal("41.3"), longitude=Decimal("69.2"),
+            ))
+        self.assertEqual(
+            list(ReportDailyCounter.objects.filter(organization=None).values_list("count", flat=True)), [2],
+        )
+        self.assertEqual(ReportClusterCell.objects.filter(organization=None, zoom=10).get().count, 2)
+
+        rebuild_clusters()
+        self.assertEqual(ReportClusterCell.objects.filter(organization=None, zoom=10).get().count, 2)
+
+    def test_day_is_local_date(self):
+        # 2025-03-01 20:30 UTC = 2025-03-02 01:30 Asia/Tashkent
+        report = self._create()
+        Report.objects.filter(pk=report.pk).update(
+            created_at=datetime(2025, 3, 1, 20, 30, tzinfo=dt_timezone.utc),
+        )
+        rebuild_counters()
+        self.assertEqual(
+            list(ReportDailyCounter.objects.values_list("day", flat=True)), [date(2025, 3, 2)],
+        )
+
+
+class ReportSpatialTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create(username="reporter")
+        cls.near = Report.objects.create(
+            user=user, description="x", latitude=Decimal("41.311100"), longitude=Decimal("69.279700"),
+        )
+        cls.mid = Report.objects.create(
+            user=user, description="x", latitude=Decimal("41.315000"), longitude=Decimal("69.279700"),
+        )
+        cls.far = Report.objects.create(
+            user=user, description="x", latitude=Decimal("41.500000"), longitude=Decimal("69.500000"),
+        )
+
+    def test_grid_cell_set_on_save(self):
+        self.assertIsNotNone(self.near.grid_cell)
+        self.assertEqual(Report.objects.filter(grid_cell__isnull=True).count(), 0)
+
+    def test_bbox_and_radius(self):
+        ids = set(Report.objects.in_bbox(69.27, 41.31, 69.29, 41.32).values_list("id", flat=True))
+        self.assertEqual(ids, {self.near.id, self.mid.id})
+
+        ids = set(Report.objects.within_radius(41.3111, 69.2797, 100).values_list("id", flat=True))
+        self.assertEqual(ids, {self.near.id})
+
+    def test_nearest(self):
+        rows = Report.objects.nearest(41.3111, 69.2797, k=3)
+        self.assertEqual([r.id for r in rows], [self.near.id, self.mid.id, self.far.id])
+        self.assertLess(rows[0].distance_m, 1)
+
+
+class ReportDuplicatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="reporter")
+        cls.org = Organization.objects.create(name="Org")
+        cls.open = Report.objects.create(
+            user=cls.user, organization=cls.org, description="chuqur",
+            latitude=Decimal("41.311100"), longitude=Decimal("69.279700"),
+        )
+        Report.objects.create(
+            user=cls.user, organization=cls.org, description="hal bo'lgan",
+            latitude=Decimal("41.311200"), longitude=Decimal("69.279700"),
+            status=ReportStatus.RESOLVED,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_precheck(self):
+        r = self.client.get("/api/reports/duplicates/", {"latitude": 41.3112, "longitude": 69.2797})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["count"], 1)
+        # boshqa odamlarning murojaatlari ochilmaydi — faqat status va masofa
+        self.assertEqual(r.data["results"], [{"status": ReportStatus.NEW, "distance_m": 11}])
+
+    def test_create_returns_duplicates(self):
+        r = self.client.post("/api/reports/", {
+            "description": "yana chuqur",
+            "latitude": "41.311150",
+            "longitude": "69.279700",
+            "organization": self.org.id,
+        })
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual([sorted(d) for d in r.data["duplicates"]], [["distance_m", "status"]])
+
+
+class StagedUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="reporter")
+        cls.other = get_user_model().objects.create(username="other")
+        cls.org = Organization.objects.create(name="Org")
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _upload(self, name="a.jpg", content=b"jpeg"):
+        r = self.client.post("/api/reports/uploads/", {"file": SimpleUploadedFile(name, content)})
+        self.assertEqual(r.status_code, 201)
+        return r.data
+
+    def _create(self, uploads):
+        return self.client.post("/api/reports/", {
+            "description": "chuqur", "latitude": "41.3", "longitude": "69.2",
+            "organization": self.org.id, "uploads": uploads,
+        }, format="json")
+
+    def test_create_with_uploads(self):
+        a = self._upload()
+        b = self._upload("b.pdf", b"pdf")
+        self.assertEqual(a["type"], "image")
+
+        r = self._create([b["id"], a["id"]])
+        self.assertEqual(r.status_code, 201)
+        attachments = ReportAttachment.objects.filter(report_id=r.data["id"])
+        self.assertEqual(sorted(x.original_name for x in attachments), ["a.jpg", "b.pdf"])
+        self.assertEqual(attachments.get(original_name="a.jpg").file.read(), b"jpeg")
+        self.assertFalse(StagedUpload.objects.exists())
+
+        # ikkinchi marta ishlatib bo'lmaydi
+        self.assertEqual(self._create([a["id"]]).status_code, 400)
+
+    def test_foreign_upload_rejected(self):
+        a = self._upload()
+        self.client.force_authenticate(self.other)
+        r = self._create([a["id"]])
+        self.assertEqual(r.status_code, 400)
+        self.assertFalse(Report.objects.exists())
+
+    def test_upload_limits(self):
+        r = self.client.post("/api/reports/uploads/", {"file": SimpleUploadedFile("run.exe", b"MZ")})
+        self.assertEqual(r.status_code, 400)
+        with override_settings(CHUNKED_UPLOAD_MAX_SIZE=3):
+            r = self.client.post("/api/reports/uploads/", {"file": SimpleUploadedFile("a.jpg", b"jpeg")})
+            self.assertEqual(r.status_code, 400)
+        r = self.client.post("/api/reports/uploads/chunked/", {
+            "filename": "run.exe", "size": 2, "sha256": hashlib.sha256(b"MZ").hexdigest(),
+        }, format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertFalse(StagedUpload.objects.exists())
+
+    def test_purge(self):
+        old = self._upload("old.jpg")
+        self._upload("new.jpg")
+        StagedUpload.objects.filter(id=old["id"]).update(updated_at=timezone.now() - timedelta(days=2))
+        upload = StagedUpload.objects.get(id=old["id"])
+
+        call_command("purge_staged_uploads", stdout=open(os.devnull, "w"))
+        self.assertEqual(list(StagedUpload.objects.values_list("original_name", flat=True)), ["new.jpg"])
+        self.assertFalse(upload.file.storage.exists(upload.file.name))
+
+
+@override_settings(CHUNKED_UPLOAD_MAX_CHUNK=4)
+class ChunkedUploadTests(TestCase):
+    DATA = b"0123456789"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="reporter")
+        cls.org = Organization.objects.create(name="Org")
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _start(self, data=DATA, name="video.mp4"):
+        r = self.client.post("/api/reports/uploads/chunked/", {
+            "filename": name, "size": len(data), "sha256": hashlib.sha256(data).hexdigest(),
+        }, format="json")
+        self.assertEqual(r.status_code, 201)
+        return f"/api/reports/uploads/chunked/{r.data['id']}/"
+
+    def _put(self, url, offset, chunk, **headers):
+        return self.client.put(
+            url, chunk, content_type="application/offset+octet-stream",
+            headers={"Upload-Offset": str(offset), **headers},
+        )
+
+    def _send(self, url, data=DATA, start=0):
+        for offset in range(start, len(data), 4):
+            self.assertEqual(self._put(url, offset, data[offset:offset + 4]).status_code, 200)
+
+    def test_resume_and_create_report(self):
+        url = self._start()
+        self.assertEqual(self._put(url, 0, b"0123").data, {"offset": 4})
+        # takroriy bo'lak / noto'g'ri offset -> joriy offset qaytadi
+        r = self._put(url, 0, b"0123")
+        self.assertEqual((r.status_code, r.data["offset"]), (409, 4))
+        bad = self._put(url, 4, b"4567", **{"Upload-Checksum": "0" * 64})
+        self.assertEqual((bad.status_code, bad.data["offset"]), (409, 4))
+        self.assertEqual(self._put(url, 4, b"012345678").status_code, 413)
+
+        self.assertEqual(self.client.get(url).data["offset"], 4)
+        self._send(url, start=4)
+        upload = self.client.post(url + "complete/").data
+        self.assertEqual(upload["type"], "video")
+
+        r = self.client.post("/api/reports/", {
+            "description": "chuqur", "latitude": "41.3", "longitude": "69.2",
+            "organization": self.org.id, "uploads": [upload["id"]],
+        }, format="json")
+        self.assertEqual(r.status_code, 201)
+        attachment = ReportAttachment.objects.get(report_id=r.data["id"])
+        self.assertEqual(attachment.file.read(), self.DATA)
+
+    def test_parallel_put_same_offset(self):
+        self._start()
+        upload, stale = StagedUpload.objects.get(), StagedUpload.objects.get()
+        write_chunk(upload, 0, io.BytesIO(b"0123"), 4)
+        # ikkinchi so'rov qulfsiz eski nusxani o'qigan — offset qulf ostida qayta tekshiriladi
+        with self.assertRaises(ChunkError) as cm:
+            write_chunk(stale, 0, io.BytesIO(b"abcd"), 4)
+        self.assertEqual(cm.exception.offset, 4)
+
+        path = default_storage.path(upload.file.name)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"0123")
+        # .part fayllar qolmaydi
+        self.assertEqual(os.listdir(os.path.dirname(path)), [os.path.basename(path)])
+
+    def test_incomplete_and_bad_checksum(self):
+        url = self._start()
+        self._put(url, 0, b"0123")
+        r = self.client.post(url + "complete/")
+        self.assertEqual((r.status_code, r.data["offset"]), (409, 4))
+        # yakunlanmagan yuklash report ga biriktirilmaydi
+        staged_id = url.rstrip("/").rsplit("/", 1)[1]
+        r = self.client.post("/api/reports/", {
+            "description": "x", "latitude": "41.3", "longitude": "69.2",
+            "organization": self.org.id, "uploads": [staged_id],
+        }, format="json")
+        self.assertEqual(r.status_code, 400)
+
+        # e'lon qilingandan boshqa baytlar -> fayl boshidan
+        self._send(url, b"0123abcdef", start=4)
+        r = self.client.post(url + "complete/")
+        self.assertEqual((r.status_code, r.data["offset"]), (409, 0))
+        self._send(url)
+        self.assertEqual(self.client.post(url + "complete/").status_code, 200)
+
+    def test_complete_into_report(self):
+        report = Report.objects.create(
+            user=self.user, organization=self.org, description="x",
+            latitude=Decimal("41.3"), longitude=Decimal("69.2"),
+        )
+        url = self._start(name="../../etc/passwd.mp4")
+        self._send(url)
+        # UUID emas / begona report -> 400, yuklash yakunlanmaydi
+        other = Report.objects.create(
+            user=get_user_model().objects.create(username="other"), organization=self.org,
+            description="x", latitude=Decimal("41.3"), longitude=Decimal("69.2"),
+        )
+        for bad in ("not-a-uuid", str(other.id)):
+            r = self.client.post(url + "complete/", {"report": bad}, format="json")
+            self.assertEqual(r.status_code, 400)
+        self.assertFalse(StagedUpload.objects.get().completed)
+
+        r = self.client.post(url + "complete/", {"report": str(report.id)}, format="json")
+        self.assertEqual(r.status_code, 201)
+
+        attachment = ReportAttachment.objects.get(id=r.data["attachment_id"])
+        self.assertEqual(attachment.original_name, "passwd.mp4")
+        self.assertEqual(attachment.file.read(), self.DATA)
+        self.assertFalse(StagedUpload.objects.exists())
+
+
+class BlobStoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="reporter")
+        cls.org = Organization.objects.create(name="Org")
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _report(self, *files):
+        r = self.client.post("/api/reports/", {
+            "description": "x", "latitude": "41.3", "longitude": "69.2",
+            "organization": self.org.id, "files": list(files),
+        })
+        self.assertEqual(r.status_code, 201)
+        return Report.objects.get(id=r.data["id"])
+
+    def _files(self, prefix):
+        root = default_storage.path(prefix)
+        return sorted(os.path.relpath(os.path.join(d, f), root) for d, _, fs in os.walk(root) for f in fs)
+
+    def test_same_content_stored_once(self):
+        r1 = self._report(SimpleUploadedFile("a.jpg", b"photo"))
+        staged = self.client.post("/api/reports/uploads/", {"file": SimpleUploadedFile("b.jpg", b"photo")}).data
+        with self.captureOnCommitCallbacks(execute=True):
+            r2 = self.client.post("/api/reports/", {
+                "description": "x", "latitude": "41.3", "longitude": "69.2",
+                "organization": self.org.id, "uploads": [staged["id"]],
+            }, format="json")
+        self.assertEqual(r2.status_code, 201)
+
+        blob = Blob.objects.get()
+        self.assertEqual((blob.refs, blob.size), (2, 5))
+        self.assertEqual(len(self._files("blobs")), 1)
+        self.assertEqual(self._files("staged"), [])
+        self.assertEqual(
+            {a.file.name for a in ReportAttachment.objects.all()}, {blob.file.name}
+        )
+        # fayl nomi tarkibning sha256 idan hisoblab topilmaydi
+        self.assertEqual(blob.sha256, hashlib.sha256(b"photo").hexdigest())
+        self.assertNotIn(blob.sha256, blob.file.name)
+
+        # ref 0 ga tushgandan keyin ham grace davomida blob turadi
+        r1.delete()
+        Report.objects.get(id=r2.data["id"]).delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refs, 0)
+        call_command("gc_blobs", stdout=open(os.devnull, "w"))
+        self.assertTrue(Blob.objects.exists())
+
+        call_command("gc_blobs", "--hours=0", stdout=open(os.devnull, "w"))
+        self.assertFalse(Blob.objects.exists())
+        self.assertEqual(self._files("blobs"), [])
+
+    def test_sweep_keeps_freshly_adopted_file(self):
+        name = default_storage.save("staged/old.jpg", ContentFile(b"old photo"))
+        week_ago = (timezone.now() - timedelta(days=7)).timestamp()
+        os.utime(default_storage.path(name), (week_ago, week_ago))
+
+        # gc_blobs fayl bog'langandan keyin, Blob qatori yozilishidan oldin ishlaydi
+        swept, save = [], Blob.save
+
+        def racing_save(blob, *args, **kwargs):
+            swept.append(sweep_orphans(timezone.now() - timedelta(hours=1)))
+            return save(blob, *args, **kwargs)
+
+        with mock.patch.object(Blob, "save", racing_save):
+            blob = adopt(name, hashlib.sha256(b"old photo").hexdigest(), 9)
+        self.assertEqual(swept, [0])
+        self.assertTrue(default_storage.exists(blob.file.name))
+
+    def test_dedup_existing_tree(self):
+        report = self._report()
+        for name, content in (("a.jpg", b"same"), ("b.jpg", b"same"), ("c.jpg", b"other")):
+            ReportAttachment.objects.create(
+                report=report, type="image", file=default_storage.save(f"reports/{report.id}/{name}", ContentFile(content)),
+            )
+
+        out = tempfile.TemporaryFile("w+")
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("dedup_attachments", stdout=out)
+        out.seek(0)
+        self.assertIn("(4 bayt) tejaladi", out.read())
+
+        self.assertEqual(dict(Blob.objects.values_list("size", "refs")), {4: 2, 5: 1})
+        self.assertEqual(self._files("reports"), [])
+        for a in ReportAttachment.objects.all():
+            self.assertEqual(a.file.name, a.blob.file.name)
+            self.assertEqual(a.file.read(), b"other" if a.blob.size == 5 else b"same")
+
+
+class PreviewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="reporter")
+        cls.admin = get_user_model().objects.create(username="root", is_superuser=True, is_staff=True)
+        cls.org = Organization.objects.create(name="Org")
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media, ATTACHMENT_PREVIEW_SIZES=[320, 1024]))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @staticmethod
+    def _jpeg():
+        # telefon rasmi: 1600x1200, EXIF Orientation=6 (90° burilgan)
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buf = io.BytesIO()
+        Image.new("RGB", (1600, 1200), "red").save(buf, "JPEG", exif=exif)
+        return buf.getvalue()
+
+    def _report(self, *files):
+        r = self.client.post("/api/reports/", {
+            "description": "x", "latitude": "41.3", "longitude": "69.2",
+            "organization": self.org.id, "files": [SimpleUploadedFile(n, c) for n, c in files],
+        })
+        self.assertEqual(r.status_code, 201)
+        return r.data["id"]
+
+    def test_crashed_pool_counts_attempt(self):
+        colors = {"a.png": "red", "crash.png": "green", "b.png": "blue"}
+        files = []
+        for name, color in colors.items():
+            buf = io.BytesIO()
+            Image.new("RGB", (64, 64), color).save(buf, "PNG")
+            files.append((name, buf.getvalue()))
+        self._report(*files)
+        blobs = {a.original_name: a.blob for a in ReportAttachment.objects.select_related("blob")}
+        crash = default_storage.path(blobs["crash.png"].file.name)
+
+        with mock.patch.object(PreviewWorker, "_make_pool", lambda self: CrashingPool(crash)):
+            worker = PreviewWorker()
+            with self.assertLogs("reports.previews", "WARNING"):
+                self.assertEqual(worker.drain_once(), 3)
+
+        for name, blob in blobs.items():
+            blob.refresh_from_db()
+            expected = PreviewStatus.PENDING if name == "crash.png" else PreviewStatus.DONE
+            self.assertEqual((name, blob.preview_status, blob.preview_attempts), (name, expected, 1))
+
+    def test_worker_renders_webp(self):
+        report_id = self._report(("photo.jpg", self._jpeg()), ("broken.jpg", b"not a jpeg"), ("doc.pdf", b"pdf"))
+        statuses = dict(Blob.objects.values_list("file", "preview_status"))
+        self.assertEqual(sorted(statuses.values()), [PreviewStatus.NONE, PreviewStatus.PENDING, PreviewStatus.PENDING])
+
+        worker = PreviewWorker(workers=2)
+        self.addCleanup(worker.close)
+        self.assertEqual(worker.drain_once(), 2)
+        self.assertEqual(worker.drain_once(), 0)
+
+        photo = ReportAttachment.objects.get(original_name="photo.jpg")
+        self.assertEqual(photo.blob.preview_status, PreviewStatus.DONE)
+        with default_storage.open(photo.blob.previews["320"]) as f, Image.open(f) as img:
+            self.assertEqual((img.format, img.size), ("WEBP", (240, 320)))
+        self.assertNotIn(photo.blob.sha256, photo.blob.previews["320"])
+        self.assertEqual(
+            ReportAttachment.objects.get(original_name="broken.jpg").blob.preview_status, PreviewStatus.SKIPPED,
+        )
+
+        self.client.force_login(self.admin)
+        data = self.client.get(f"/report/{report_id}/").json()
+        by_name = {a["name"]: a for a in data["attachments"]}
+        self.assertTrue(by_name["photo.jpg"]["thumb"].endswith("_320.webp"))
+        self.assertEqual(set(by_name["photo.jpg"]["previews"]), {"320", "1024"})
+        self.assertEqual(by_name["doc.pdf"]["thumb"], "")
+
+    @override_settings(INGEST_IMAGE_MAX_SIDE=800, INGEST_KEEP_ORIGINAL=False)
+    def test_ingest_downscales_and_strips_exif(self):
+        self._report(("photo.jpg", self._jpeg()))
+        worker = PreviewWorker(workers=1)
+        self.addCleanup(worker.close)
+        worker.drain_once()
+
+        photo = ReportAttachment.objects.select_related("blob").get()
+        blob = photo.blob
+        self.assertEqual((photo.file.name, photo.mime_type, photo.file_size), (blob.file.name, "image/webp", blob.size))
+        self.assertLess(blob.size, blob.original_size)
+        with photo.file.open("rb") as f, Image.open(f) as img:
+            self.assertEqual((img.format, img.size), ("WEBP", (600, 800)))
+            self.assertNotIn(0x0112, img.getexif())
+
+        # o'sha rasm qayta yuborilsa — yangi fayl, qayta ishlanmaydi
+        self._report(("again.jpg", self._jpeg()))
+        again = ReportAttachment.objects.get(original_name="again.jpg")
+        self.assertEqual((again.file.name, again.mime_type), (blob.file.name, "image/webp"))
+
+        out = tempfile.TemporaryFile("w+")
+        call_command("run_preview_worker", "--stats", stdout=out)
+        out.seek(0)
+        self.assertIn("Qayta kodlangan rasmlar: 1 ta", out.read())
+
+        self.assertTrue(default_storage.exists(blob.original))
+        call_command("gc_blobs", "--hours=0", stdout=open(os.devnull, "w"))
+        self.assertFalse(default_storage.exists(blob.original))
+        self.assertTrue(default_storage.exists(blob.file.name))
+        self.assertEqual(Blob.objects.get().original, "")
+
+    def test_gc_removes_previews(self):
+        self._report(("photo.jpg", self._jpeg()))
+        worker = PreviewWorker(workers=1)
+        self.addCleanup(worker.close)
+        worker.drain_once()
+
+        Report.objects.all().delete()
+        call_command("gc_blobs", "--hours=0", stdout=open(os.devnull, "w"))
+        self.assertEqual([f for _, _, fs in os.walk(default_storage.path("previews")) for f in fs], [])
+
+    @staticmethod
+    def _gps_exif():
+        # burilish + kamera + GPS koordinatalari
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = "PhoneMaker"
+        exif.get_ifd(0x8825).update({1: "N", 2: (41.0, 18.0, 30.0)})
+        return exif
+
+    def _gps_jpeg(self):
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 48), "red").save(buf, "JPEG", exif=self._gps_exif(), quality=90)
+        return buf.getvalue()
+
+    def test_strip_metadata_keeps_pixels(self):
+        data = self._gps_jpeg()
+        clean = strip_metadata(data, 6)
+        self.assertLess(len(clean), len(data))
+        with Image.open(io.BytesIO(data)) as a, Image.open(io.BytesIO(clean)) as b:
+            exif = b.getexif()
+            self.assertEqual(dict(exif), {0x0112: 6})
+            self.assertEqual(exif.get_ifd(0x8825), {})
+            self.assertEqual(a.tobytes(), b.tobytes())
+
+        buf = io.BytesIO()
+        Image.new("RGBA", (8, 8), (0, 0, 255, 128)).save(buf, "PNG", exif=self._gps_exif())
+        with Image.open(io.BytesIO(strip_metadata(buf.getvalue()))) as img:
+            self.assertEqual(dict(img.getexif()), {})
+            self.assertEqual(img.getpixel((0, 0)), (0, 0, 255, 128))
+
+        self.assertIsNone(strip_metadata(b"GIF89a..."))
+
+    @override_settings(INGEST_IMAGE_MAX_SIDE=800, INGEST_MIN_SAVING=0.99)
+    def test_unresized_image_served_without_exif(self):
+        report_id = self._report(("photo.jpg", self._gps_jpeg()))
+        worker = PreviewWorker(workers=1)
+        self.addCleanup(worker.close)
+        worker.drain_once()
+
+        blob = Blob.objects.get()
+        self.assertTrue(blob.file.name.endswith("-clean.jpg"))
+        self.assertTrue(default_storage.exists(blob.original))
+        att = ReportAttachment.objects.get(report_id=report_id)
+        self.assertEqual((att.file.name, att.mime_type, att.file_size), (blob.file.name, "image/jpeg", blob.size))
+        with default_storage.open(att.file.name) as f, Image.open(f) as img:
+            self.assertEqual(img.size, (64, 48))
+            self.assertEqual(dict(img.getexif()), {0x0112: 6})
+
+        # metadata siz rasm tegilmaydi
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 48), "blue").save(buf, "JPEG")
+        self._report(("plain.jpg", buf.getvalue()))
+        worker.drain_once()
+        plain = ReportAttachment.objects.get(original_name="plain.jpg").blob
+        self.assertEqual((plain.original, plain.preview_status), ("", PreviewStatus.DONE))
+
+
+class CrashingPool:
+    """
+    ProcessPoolExecutor o'rnida: `crash` fayli bola jarayonni "o'ldiradi" —
+    shu va keyingi vazifalar BrokenProcessPool bilan qaytadi.
+    """
+
+    def __init__(self, crash: str):
+        self.crash = crash
+        self.broken = False
+
+    def submit(self, fn, job):
+        if self.broken:
+            raise BrokenProcessPool("pool is broken")
+        future = Future()
+        if job["src"] == self.crash:
+            self.broken = True
+            future.set_exception(BrokenProcessPool("child died"))
+        else:
+            future.set_result(fn(job))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class ReportSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.ali = User.objects.create(username="ali", first_name="Alisher", phone_number="+998901234567")
+        cls.vali = User.objects.create(username="vali", first_name="Valijon")
+        cls.pothole = cls._create(cls.ali, "Chuqur yo'l, Chilonzor 5-kvartal")
+        cls.light = cls._create(cls.vali, "Chiroq yonmayapti, chuqur ham bor, chuqur!")
+        # id prefiksi harfli — faqat raqamli prefiks telefon qidiruvi deb olinadi
+        cls.other = cls._create(cls.vali, "Axlat olib ketilmagan", id=UUID("abcdef01-2345-4678-9abc-def012345678"))
+
+    @staticmethod
+    def _create(user, description, **extra):
+        return Report.objects.create(
+            user=user, description=description,
+            latitude=Decimal("41.3"), longitude=Decimal("69.2"), **extra,
+        )
+
+    def _ids(self, q):
+        return [r.pk for r in search_reports(Report.objects.order_by("-created_at"), q)]
+
+    def test_description_and_reporter(self):
+        self.assertEqual(set(self._ids("chuqur")), {self.pothole.pk, self.light.pk})
+        self.assertEqual(self._ids("chilonzor alisher"), [self.pothole.pk])
+        self.assertEqual(self._ids("4567"), [self.pothole.pk])
+        self.assertEqual(self._ids(self.other.pk.hex[:8]), [self.other.pk])
+        self.assertEqual(self._ids("yo'q-so'z"), [])
+
+    def test_hex_looking_words_are_text(self):
+        facade = self._create(self.ali, "Facade buzilgan")
+        self.assertEqual(self._ids("facade"), [facade.pk])
+        self.assertEqual(self._ids(self.other.pk.hex[:8] + "-"), [self.other.pk])
+
+    def test_ranked_by_relevance(self):
+        # "chuqur" ikki marta uchragan report yuqorida
+        self.assertEqual(self._ids("chuqur")[0], self.light.pk)
+
+    def test_index_follows_saves(self):
+        self.other.description = "Yangi tavsif: daraxt"
+        self.other.save(update_fields=["description"])
+        self.assertEqual(self._ids("daraxt"), [self.other.pk])
+
+        self.vali.first_name = "Botir"
+        self.vali.save()
+        self.assertEqual(set(self._ids("botir")), {self.light.pk, self.other.pk})
+
+        self.assertEqual(rebuild_search(), 3)
+        self.assertEqual(set(self._ids("botir")), {self.light.pk, self.other.pk})
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="reporter")
+        # hammasi bir kunda: (created_at, id) tartibi id ga tayanadi
+        cls.reports = [
+            Report.objects.create(
+                user=cls.user, description=f"chuqur {i}",
+                latitude=Decimal("41.3"), longitude=Decimal("69.2"),
+            )
+            for i in range(7)
+        ]
+
+    def _walk(self, qs, per_page=3):
+        seen, cursor, pages = [], "", 0
+        while True:
+            page = keyset_page(qs, cursor, per_page)
+            seen += [r.pk for r in page]
+            pages += 1
+            if not page.has_next:
+                return seen, pages
+            cursor = page.next_cursor
+
+    def test_forward_covers_all_rows_once(self):
+        qs = Report.objects.order_by("-created_at")
+        seen, pages = self._walk(qs)
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, list(qs.order_by("-created_at", "-id").values_list("pk", flat=True)))
+
+    def test_backward_and_last(self):
+        qs = Report.objects.order_by("-created_at")
+        first = keyset_page(qs, "", 3, with_count=True)
+        self.assertEqual((first.count, first.count_capped), (7, False))
+        second = keyset_page(qs, first.next_cursor, 3)
+        back = keyset_page(qs, second.previous_cursor, 3)
+        self.assertEqual([r.pk for r in back], [r.pk for r in first])
+        self.assertFalse(back.has_previous)
+
+        last = keyset_page(qs, first.last_cursor, 3)
+        self.assertEqual(len(last), 3)
+        self.assertFalse(last.has_next)
+        self.assertEqual(last.object_list[-1].pk, qs.order_by("-created_at", "-id").last().pk)
+
+    def test_bad_cursor_values_fall_back_to_first_page(self):
+        qs = Report.objects.order_by("-created_at")
+        first = [r.pk for r in keyset_page(qs, "", 3)]
+        for values in (["garbage", "zzz"], [None, self.reports[0].pk.hex], [[1], {"a": 1}]):
+            page = keyset_page(qs, encode_cursor(values), 3)
+            self.assertEqual([r.pk for r in page], first, values)
+            self.assertFalse(page.has_previous)
+
+        ranked = search_reports(Report.objects.order_by("-created_at"), "chuqur")
+        page = keyset_page(ranked, encode_cursor(["x", "garbage", "zzz"]), 3)
+        self.assertEqual(len(page), 3)
+
+    def test_ranked_search_results(self):
+        qs = search_reports(Report.objects.order_by("-created_at"), "chuqur")
+        seen, _pages = self._walk(qs)
+        self.assertEqual(sorted(seen), sorted(r.pk for r in self.reports))
+
+    def test_api_cursor(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        r = client.get("/api/reports/mine/", {"count": 1})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["count"], 7)
+        ids = [x["id"] for x in r.data["results"]]
+        while r.data["next"]:
+            r = client.get(r.data["next"])
+            ids += [x["id"] for x in r.data["results"]]
+        self.assertEqual(len(set(ids)), 7)
+
+
+class ReportQueryCountTests(QueryCountMixin, TestCase):
+    """
+    So'rovlar soni sahifadagi reportlar/fayllar soniga bog'liq bo'lmasligi kerak.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="reporter")
+        cls.orgs = [Organization.objects.create(name=f"Org {i}") for i in range(3)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _create(self, n, status=ReportStatus.NEW):
+        reports = []
+        for i in range(n):
+            report = Report.objects.create(
+                user=self.user, organization=self.orgs[i % 3], description=f"r{i}",
+                latitude=Decimal("41.3"), longitude=Decimal("69.2"), status=status,
+            )
+            for j in range(2):
+                ReportAttachment.objects.create(
+                    report=report, type="image", file=f"reports/{report.id}/{j}.jpg",
+                )
+            reports.append(report)
+        return reports
+
+    def test_list_endpoints(self):
+        # sahifa + attachments prefetch
+        for url, status in (("/api/reports/mine/", ReportStatus.NEW),
+                            ("/api/reports/mine/resolved/", ReportStatus.RESOLVED)):
+            self._create(2, status)
+            self.assertEndpointQueries(self.client, url, 2)
+            self._create(8, status)
+            r = self.assertEndpointQueries(self.client, url, 2)
+            self.assertEqual(len(r.data["results"]), 10)
+            self.assertEqual(len(r.data["results"][0]["attachments"]), 2)
+
+    def test_detail(self):
+        report = self._create(1)[0]
+        self.assertEndpointQueries(self.client, f"/api/reports/{report.id}/", 2)
+
+
+class UpgradeTimestampsTests(TransactionTestCase):
+    """
+    upgrade_timestamps: eski (DateField) sxemadan expand -> backfill -> contract.
+    """
+
+    def _legacy_schema(self, dates):
+        # created_at/updated_at ni eski ko'rinishga qaytaramiz: indekssiz `date` ustun
+        qn = connection.ops.quote_name
+        with connection.cursor() as cur:
+            for model in (get_user_model(), Report, ReportAttachment):
+                table = model._meta.db_table
+                constraints = connection.introspection.get_constraints(cur, table)
+                for column in ("created_at", "updated_at"):
+                    for name, c in constraints.items():
+                        if c["index"] and column in c["columns"] and not c["unique"]:
+                            cur.execute(f"DROP INDEX IF EXISTS {qn(name)}")
+                    cur.execute(f"ALTER TABLE {qn(table)} DROP COLUMN {qn(column)}")
+                    cur.execute(f"ALTER TABLE {qn(table)} ADD COLUMN {qn(column)} date NULL")
+                for pk, day in dates.get(model, {}).items():
+                    cur.execute(
+                        f"UPDATE {qn(table)} SET created_at = %s, updated_at = %s WHERE {qn(model._meta.pk.column)} = %s",
+                        [day.isoformat(), day.isoformat(), pk.hex],
+                    )
+
+    def _columns(self):
+        with connection.cursor() as cur:
+            return {
+                info.name: connection.introspection.get_field_type(info.type_code, info)
+                for info in connection.introspection.get_table_description(cur, Report._meta.db_table)
+            }
+
+    def test_data_survives(self):
+        user = get_user_model().objects.create(username="reporter")
+        org = Organization.objects.create(name="Org")
+        reports = [
+            Report.objects.create(
+                user=user, organization=org, description=f"r{i}",
+                latitude=Decimal("41.3"), longitude=Decimal("69.2"),
+            )
+            for i in range(3)
+        ]
+        days = [date(2024, 5, 10), date(2024, 5, 11), date(2024, 12, 31)]
+        self._legacy_schema({
+            get_user_model(): {user.pk: date(2024, 1, 1)},
+            Report: {r.pk: d for r, d in zip(reports, days)},
+        })
+
+        self.assertEqual(self._columns()["created_at"], "DateField")
+
+        # --batch=2 — bir necha bo'lak; birinchi yurish faqat expand + backfill
+        call_command("upgrade_timestamps", "--batch=2", "--no-contract", stdout=io.StringIO())
+        call_command("upgrade_timestamps", "--batch=2", stdout=io.StringIO())
+
+        columns = self._columns()
+        with connection.cursor() as cur:
+            constraints = connection.introspection.get_constraints(cur, Report._meta.db_table)
+        self.assertEqual(columns["created_at"], "DateTimeField")
+        self.assertNotIn("created_at__dt", columns)
+        self.assertIn(["organization_id", "status", "created_at"], [c["columns"] for c in constraints.values()])
+
+        # sana -> mahalliy yarim tun, boshqa ustunlar o'zgarmaydi
+        for report, day in zip(reports, days):
+            fresh = Report.objects.get(pk=report.pk)
+            self.assertEqual(timezone.localtime(fresh.created_at), timezone.make_aware(datetime(day.year, day.month, day.day)))
+            self.assertEqual(fresh.updated_at, fresh.created_at)
+            self.assertEqual((fresh.description, fresh.organization_id), (report.description, org.id))
+        self.assertEqual(
+            timezone.localdate(get_user_model().objects.get(pk=user.pk).created_at), date(2024, 1, 1),
+        )
+
+        # qayta ishga tushirish — hech narsa o'zgarmaydi
+        out = io.StringIO()
+        call_command("upgrade_timestamps", stdout=out)
+        self.assertIn("allaqachon datetime", out.getvalue())
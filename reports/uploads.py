@@ -0,0 +1,152 @@
+# reports/uploads.py
+import hashlib
+import os
+import shutil
+from uuid import uuid4
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .blobs import COPY_BUFFER, adopt, file_sha256, stored_mime
+from .models import ReportAttachment, StagedUpload, staged_upload_path
+
+
+class ChunkError(Exception):
+    """
+    Bo'lak qabul qilinmadi. `offset` — serverda saqlangan baytlar soni,
+    mijoz yuklashni shu joydan davom ettiradi.
+    """
+
+    def __init__(self, detail: str, offset: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.offset = offset
+
+
+def start(user, filename: str, size: int, sha256: str, mime: str, type: str) -> StagedUpload:
+    """
+    Bo'laklab yuklashni ochadi: StagedUpload(completed=False) va diskda bo'sh fayl.
+    `filename` tozalangan (get_valid_filename) bo'lishi kerak.
+    """
+    upload = StagedUpload(
+        user=user,
+        type=type,
+        original_name=filename,
+        mime_type=mime,
+        file_size=size,
+        sha256=sha256.lower(),
+        completed=False,
+    )
+    upload.file.name = staged_upload_path(upload, filename)
+    path = default_storage.path(upload.file.name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    upload.save()
+    return upload
+
+
+def _check_offset(upload: StagedUpload, offset: int, length: int):
+    if upload.completed:
+        raise ChunkError("Yuklash allaqachon yakunlangan.", upload.received)
+    if offset != upload.received:
+        raise ChunkError("Offset mos emas.", upload.received)
+    if offset + length > upload.file_size:
+        raise ChunkError("Bo'lak e'lon qilingan fayl o'lchamidan oshib ketdi.", upload.received)
+
+
+def write_chunk(upload: StagedUpload, offset: int, stream, length: int, checksum: str = "") -> int:
+    """
+    So'rov tanasidan `length` baytni `offset` ga yozadi (xotirada faqat
+    COPY_BUFFER). `checksum` — bo'lakning sha256 i (ixtiyoriy); mos kelmasa
+    bo'lak tashlanadi. Qaytaradi: yangi offset.
+
+    Tarmoqdan o'qish qator qulfisiz — bo'lak avval shu yuklash papkasidagi
+    vaqtinchalik .part faylga yoziladi. Keyin qisqa tranzaksiyada qator
+    qulflanadi, offset qayta tekshiriladi (parallel PUT shu bo'lakni
+    allaqachon yozgan bo'lsa 409), .part asosiy faylga `offset` dan
+    ko'chiriladi va `received` yangilanadi. Oldingi yozuv uzilib qolgan
+    bo'lsa, `received` dan keyingi ortiqcha baytlar kesib tashlanadi.
+    """
+    # tez rad etish — qulfsiz nusxa bo'yicha
+    _check_offset(upload, offset, length)
+
+    path = default_storage.path(upload.file.name)
+    part = f"{path}.{uuid4().hex}.part"
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(part, "wb") as f:
+            while written < length:
+                buf = stream.read(min(COPY_BUFFER, length - written))
+                if not buf:
+                    break
+                f.write(buf)
+                digest.update(buf)
+                written += len(buf)
+
+        if checksum and (written != length or digest.hexdigest() != checksum.lower()):
+            raise ChunkError("Bo'lak checksum i mos emas.", offset)
+
+        with transaction.atomic():
+            locked = StagedUpload.objects.select_for_update().get(pk=upload.pk)
+            _check_offset(locked, offset, length)
+            with open(path, "r+b") as dst, open(part, "rb") as src:
+                dst.seek(offset)
+                dst.truncate()
+                shutil.copyfileobj(src, dst, COPY_BUFFER)
+            locked.received = offset + written
+            locked.save(update_fields=["received", "updated_at"])
+    finally:
+        os.remove(part)
+
+    upload.received = locked.received
+    if written != length:
+        # ulanish uzildi — kelgan qismi saqlanadi
+        raise ChunkError("Bo'lak to'liq kelmadi.", upload.received)
+    return upload.received
+
+
+def finish(upload: StagedUpload) -> StagedUpload:
+    """
+    Hamma bayt kelganini va butun faylning sha256 ini tekshiradi. Mos
+    kelmasa fayl bo'shatiladi (offset 0) — mijoz qaytadan yuklaydi.
+    """
+    if upload.completed:
+        return upload
+    if upload.received != upload.file_size:
+        raise ChunkError("Fayl to'liq yuklanmagan.", upload.received)
+
+    if file_sha256(upload.file.name) != upload.sha256:
+        with open(default_storage.path(upload.file.name), "r+b") as f:
+            f.truncate(0)
+        upload.received = 0
+        upload.save(update_fields=["received", "updated_at"])
+        raise ChunkError("Fayl checksum i mos emas.", 0)
+
+    upload.completed = True
+    upload.save(update_fields=["completed", "updated_at"])
+    return upload
+
+
+def attach(report, uploads) -> list:
+    """
+    Yakunlangan StagedUpload lar -> ReportAttachment. Fayl blob ga
+    aylanadi (reports.blobs.adopt — nusxalanmaydi, bir xil tarkib bo'lsa
+    ikkinchisi o'chiriladi), staged qatorlar o'chiriladi. Tranzaksiya ichida
+    chaqiriladi.
+    """
+    attachments = []
+    for u in uploads:
+        blob = adopt(u.file.name, u.sha256 or file_sha256(u.file.name), u.file_size)
+        attachments.append(ReportAttachment(
+            report=report,
+            type=u.type,
+            file=blob.file.name,
+            blob=blob,
+            original_name=u.original_name,
+            mime_type=stored_mime(blob, u.mime_type),
+            file_size=blob.size,
+        ))
+    ReportAttachment.objects.bulk_create(attachments)
+    StagedUpload.objects.filter(id__in=[u.id for u in uploads]).delete()
+    return attachments
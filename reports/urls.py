@@ -1,6 +1,11 @@
 from django.urls import path
 from .views import (
     ReportCreateView,
+    StagedUploadCreateView,
+    ChunkedUploadStartView,
+    ChunkedUploadView,
+    ChunkedUploadCompleteView,
+    ReportDuplicatesView,
     MyReportsView,
     MyResolvedReportsView,
     ReportDetailView,
@@ -11,8 +16,13 @@ from .views import (
 
 urlpatterns = [
     path("reports/", ReportCreateView.as_view(), name="report-create"),
+    path("reports/uploads/", StagedUploadCreateView.as_view(), name="report-upload"),
+    path("reports/uploads/chunked/", ChunkedUploadStartView.as_view(), name="report-upload-chunked"),
+    path("reports/uploads/chunked/<uuid:pk>/", ChunkedUploadView.as_view(), name="report-upload-chunk"),
+    path("reports/uploads/chunked/<uuid:pk>/complete/", ChunkedUploadCompleteView.as_view(), name="report-upload-complete"),
     path("reports/mine/", MyReportsView.as_view(), name="my-reports"),
     path("reports/mine/resolved/", MyResolvedReportsView.as_view(), name="my-reports-resolved"),
+    path("reports/duplicates/", ReportDuplicatesView.as_view(), name="report-duplicates"),
     path("reports/<uuid:pk>/", ReportDetailView.as_view(), name="report-detail"),
     path("reports/<uuid:pk>/attachments/", ReportAddAttachmentView.as_view(), name="report-add-attachment"),
     path("reports/<uuid:pk>/resolve/", ReportResolveView.as_view(), name="report-resolve"),
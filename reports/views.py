@@ -1,41 +1,209 @@
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from datetime import datetime, time
-from rest_framework.parsers import MultiPartParser, FormParser
-from .models import Report
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from .models import Report, StagedUpload
 from .choices import ReportStatus
 from .serializers import (
     ReportSerializer,
     ReportCreateSerializer,
     ReportAttachmentCreateSerializer,
+    StagedUploadSerializer,
+    ChunkedUploadCompleteSerializer,
+    ChunkedUploadStartSerializer,
+    DuplicateCheckSerializer,
+    DuplicateReportSerializer,
 )
+from .duplicates import find_duplicates
 from .permissions import IsOwner
+from .rollup import set_status
+from . import uploads
 from users.choices import UserChoices
+from utils.pagination import KeysetPagination
+from utils.prefetch import PrefetchViewMixin
 
 
 
 class ReportCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReportCreateSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    # JSON — fayllar oldindan yuklangan bo'lsa (faqat `uploads` id lari)
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
 
     def create(self, request, *args, **kwargs):
         ser = self.get_serializer(data=request.data, context={"request": request})
         ser.is_valid(raise_exception=True)
         report_obj = ser.save()
 
-        return Response(
-            ReportSerializer(report_obj, context={"request": request}).data,
-            status=status.HTTP_201_CREATED
+        data = ReportSerializer(report_obj, context={"request": request}).data
+        data["duplicates"] = DuplicateReportSerializer(ser.duplicates, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class StagedUploadCreateView(APIView):
+    """
+    POST /api/reports/uploads/
+    multipart/form-data:
+      file: <binary>
+      type: image|video|voice|file (ixtiyoriy — mime dan aniqlanadi)
+    Report yaratilishidan oldin fayl yuklash. Qaytgan id POST /api/reports/
+    dagi `uploads` ro'yxatiga beriladi.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request):
+        ser = StagedUploadSerializer(data=request.data, context={"request": request})
+        ser.is_valid(raise_exception=True)
+        upload = ser.save()
+        return Response(StagedUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+class ChunkedUploadStartView(APIView):
+    """
+    POST /api/reports/uploads/chunked/
+    JSON: {filename, size, sha256, content_type?, type?}
+    Katta fayllar uchun davom ettiriladigan yuklash:
+      1) shu yerda ochiladi -> {id, offset: 0, chunk_size}
+      2) PUT .../chunked/<id>/ bo'laklar (Upload-Offset sarlavhasi bilan)
+      3) POST .../chunked/<id>/complete/ — sha256 tekshiriladi
+    Bo'laklar xotirada yig'ilmaydi, to'g'ridan-to'g'ri diskka yoziladi.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ser = ChunkedUploadStartSerializer(data=request.data, context={"request": request})
+        ser.is_valid(raise_exception=True)
+        upload = ser.save()
+        return Response({
+            "id": str(upload.id),
+            "offset": 0,
+            "chunk_size": settings.CHUNKED_UPLOAD_MAX_CHUNK,
+        }, status=status.HTTP_201_CREATED)
+
+
+class ChunkedUploadView(APIView):
+    """
+    GET /api/reports/uploads/chunked/<id>/ — joriy offset (uzilishdan keyin shu joydan davom etiladi)
+    PUT /api/reports/uploads/chunked/<id>/
+      Upload-Offset: <bayt>           (majburiy, joriy offset ga teng bo'lishi kerak)
+      Upload-Checksum: <sha256 hex>   (ixtiyoriy, shu bo'lak uchun)
+      tana: bo'lak baytlari (application/offset+octet-stream)
+    Offset mos kelmasa 409 va serverdagi offset qaytadi.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def _get(self, request, pk):
+        try:
+            return StagedUpload.objects.get(pk=pk, user=request.user)
+        except StagedUpload.DoesNotExist:
+            return None
+
+    def get(self, request, pk):
+        upload = self._get(request, pk)
+        if upload is None:
+            return Response({"detail": "Yuklash topilmadi."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            "id": str(upload.id),
+            "offset": upload.received,
+            "size": upload.file_size,
+            "completed": upload.completed,
+        })
+
+    def put(self, request, pk):
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except (KeyError, ValueError):
+            return Response({"detail": "Upload-Offset va Content-Length majburiy."}, status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0:
+            return Response({"detail": "Bo'lak bo'sh."}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.CHUNKED_UPLOAD_MAX_CHUNK:
+            return Response({"detail": "Bo'lak juda katta."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        # qator faqat bo'lak diskka yozilgach qisqa muddat qulflanadi (uploads.write_chunk)
+        upload = self._get(request, pk)
+        if upload is None:
+            return Response({"detail": "Yuklash topilmadi."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            new_offset = uploads.write_chunk(
+                upload, offset, request.stream, length,
+                checksum=request.headers.get("Upload-Checksum", ""),
+            )
+        except uploads.ChunkError as e:
+            return Response({"detail": e.detail, "offset": e.offset}, status=status.HTTP_409_CONFLICT)
+        except StagedUpload.DoesNotExist:
+            # yozish paytida o'chirilgan (purge / complete)
+            return Response({"detail": "Yuklash topilmadi."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({"offset": new_offset})
+
+
+class ChunkedUploadCompleteView(APIView):
+    """
+    POST /api/reports/uploads/chunked/<id>/complete/
+    JSON: {report?: <uuid>}
+    report berilmasa -> StagedUpload (id POST /api/reports/ dagi `uploads` ga beriladi),
+    berilsa -> shu report ga ReportAttachment bo'lib biriktiriladi.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        ser = ChunkedUploadCompleteSerializer(data=request.data, context={"request": request})
+        ser.is_valid(raise_exception=True)
+        report = ser.validated_data.get("report")
+
+        with transaction.atomic():
+            upload = StagedUpload.objects.select_for_update().filter(pk=pk, user=request.user).first()
+            if upload is None:
+                return Response({"detail": "Yuklash topilmadi."}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                uploads.finish(upload)
+            except uploads.ChunkError as e:
+                return Response({"detail": e.detail, "offset": e.offset}, status=status.HTTP_409_CONFLICT)
+
+            if report is None:
+                return Response(StagedUploadSerializer(upload).data)
+
+            attachment, = uploads.attach(report, [upload])
+
+        return Response({"attachment_id": str(attachment.id)}, status=status.HTTP_201_CREATED)
+
+
+class ReportDuplicatesView(APIView):
+    """
+    GET /api/reports/duplicates/?latitude=..&longitude=..[&organization=..]
+    Yuborishdan oldin: shu joy yaqinida ochiq murojaatlar bormi.
+    Faqat soni, status va masofa — boshqa odamlarning murojaatlari ochilmaydi.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        ser = DuplicateCheckSerializer(data=request.query_params)
+        ser.is_valid(raise_exception=True)
+        org = ser.validated_data.get("organization")
+
+        items = find_duplicates(
+            ser.validated_data["latitude"],
+            ser.validated_data["longitude"],
+            organization_id=org.id if org else None,
         )
+        return Response({
+            "radius_m": settings.REPORT_DUPLICATE_RADIUS_M,
+            "window_days": settings.REPORT_DUPLICATE_WINDOW_DAYS,
+            "count": len(items),
+            "results": DuplicateReportSerializer(items, many=True).data,
+        })
 
 
-class MyReportsView(generics.ListAPIView):
+class MyReportsView(PrefetchViewMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReportSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return (
@@ -45,20 +213,22 @@ class MyReportsView(generics.ListAPIView):
         )
 
 
-class MyResolvedReportsView(generics.ListAPIView):
+class MyResolvedReportsView(PrefetchViewMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReportSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
+        # keyset uchun tartib (created_at, id) — resolved_at NULL bo'lishi mumkin
         return (
             Report.objects.filter(user=self.request.user)
             .filter(status__in=[ReportStatus.RESOLVED, "RESOLVED", "done", "DONE"])
-            .order_by("-resolved_at", "-created_at")
+            .order_by("-created_at")
         )
 
 
 
-class ReportDetailView(generics.RetrieveAPIView):
+class ReportDetailView(PrefetchViewMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated, IsOwner]
     serializer_class = ReportSerializer
     queryset = Report.objects.all()
@@ -101,27 +271,13 @@ class ReportResolveView(APIView):
         if report.status == ReportStatus.RESOLVED:
             return Response({"detail": "Bu murojaat allaqachon hal qilingan."}, status=status.HTTP_400_BAD_REQUEST)
 
-        report.status = ReportStatus.RESOLVED
-        report.resolved_at = timezone.now()
-        report.save(update_fields=["status", "resolved_at", "updated_at"])
-
-        # ✅ created_at date bo‘lsa -> datetime ga aylantirib hisoblaymiz
-        created_at = report.created_at
-        resolved_at = report.resolved_at
-
-        # created_at: date bo‘lsa (datetime emas)
-        if hasattr(created_at, "year") and not hasattr(created_at, "hour"):
-            created_dt = timezone.make_aware(datetime.combine(created_at, time.min))
-        else:
-            created_dt = created_at
-
-        # resolved_at ham date bo‘lib qolsa (ehtiyot)
-        if hasattr(resolved_at, "year") and not hasattr(resolved_at, "hour"):
-            resolved_dt = timezone.make_aware(datetime.combine(resolved_at, time.min))
-        else:
-            resolved_dt = resolved_at
+        with transaction.atomic():
+            changed = set_status(report, ReportStatus.RESOLVED, resolved_at=timezone.now())
+        if not changed:
+            # status shu orada boshqa so'rovda o'zgargan
+            return Response({"detail": "Murojaat holati o'zgargan, qaytadan urinib ko'ring."}, status=status.HTTP_409_CONFLICT)
 
-        resolution_seconds = int((resolved_dt - created_dt).total_seconds())
+        resolution_seconds = int((report.resolved_at - report.created_at).total_seconds())
 
         data = {
             "report": ReportSerializer(report, context={"request": request}).data,
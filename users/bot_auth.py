@@ -0,0 +1,60 @@
+# users/bot_auth.py
+"""
+Bot -> backend ishonchi: umumiy sir (settings.BOT_API_SECRET) bilan
+imzolangan so'rov.
+
+    X-Bot-Timestamp: <unix soniya>
+    X-Bot-Signature: hex(HMAC-SHA256(secret, "<timestamp>.<body>"))
+
+Tekshiruv — bitta HMAC (parol hash yo'q). Vaqt belgisi
+BOT_SIGNATURE_MAX_AGE soniyadan eski bo'lsa rad etiladi.
+"""
+import hashlib
+import hmac
+import time
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+TIMESTAMP_HEADER = "X-Bot-Timestamp"
+SIGNATURE_HEADER = "X-Bot-Signature"
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    msg = timestamp.encode() + b"." + body
+    return hmac.new(secret.encode(), msg, hashlib.sha256).hexdigest()
+
+
+def verify_bot_request(request) -> bool:
+    secret = getattr(settings, "BOT_API_SECRET", "")
+    if not secret:
+        return False
+
+    timestamp = request.headers.get(TIMESTAMP_HEADER, "")
+    signature = request.headers.get(SIGNATURE_HEADER, "")
+    try:
+        age = abs(time.time() - int(timestamp))
+    except ValueError:
+        return False
+    if age > settings.BOT_SIGNATURE_MAX_AGE:
+        return False
+
+    return hmac.compare_digest(sign(secret, timestamp, request.body), signature)
+
+
+class IsSignedBotRequest(BasePermission):
+    message = "Bot imzosi yo'q yoki noto'g'ri."
+
+    def has_permission(self, request, view):
+        return verify_bot_request(request)
+
+
+class IsSignedBotRequestIfConfigured(IsSignedBotRequest):
+    """
+    BOT_API_SECRET o'rnatilmagan bo'lsa ochiq (eski botlar bilan moslik uchun).
+    """
+
+    def has_permission(self, request, view):
+        if not getattr(settings, "BOT_API_SECRET", ""):
+            return True
+        return super().has_permission(request, view)
@@ -0,0 +1,83 @@
+import json
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from users.bot_auth import SIGNATURE_HEADER, TIMESTAMP_HEADER, sign
+from users.views import TelegramAuthView, TelegramTokenView
+
+
+class _Rollback(Exception):
+    pass
+
+
+BENCH_SECRET = "bench-secret"
+
+
+class Command(BaseCommand):
+    help = (
+        "Bot autentifikatsiyasi: so'rov/soniya — auth/telegram (yangi va mavjud user), "
+        "imzolangan token almashish va refresh. Viewlar to'g'ridan-to'g'ri chaqiriladi "
+        "(HTTP qatlamisiz). Yaratilgan userlar oxirida rollback qilinadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--start-id", type=int, default=9_000_000_000)
+
+    def _rate(self, label, fn, items):
+        t0 = time.perf_counter()
+        results = [fn(x) for x in items]
+        dt = time.perf_counter() - t0
+        self.stdout.write(f"{label:<42} {len(items) / dt:8.1f} so'rov/s  ({dt * 1000 / len(items):.2f} ms)")
+        return results
+
+    def handle(self, *args, **opts):
+        n = opts["requests"]
+        ids = list(range(opts["start_id"], opts["start_id"] + n))
+        factory = APIRequestFactory()
+        auth_view = TelegramAuthView.as_view()
+        token_view = TelegramTokenView.as_view()
+        refresh_view = TokenRefreshView.as_view()
+
+        def signed_post(path, payload):
+            body = json.dumps(payload).encode()
+            ts = str(int(time.time()))
+            return factory.post(
+                path, body, content_type="application/json",
+                **{
+                    f"HTTP_{TIMESTAMP_HEADER.upper().replace('-', '_')}": ts,
+                    f"HTTP_{SIGNATURE_HEADER.upper().replace('-', '_')}": sign(BENCH_SECRET, ts, body),
+                },
+            )
+
+        def auth(tid):
+            payload = {"telegram_id": tid, "first_name": "Bench", "last_name": "", "phone_number": "+998900000000"}
+            resp = auth_view(signed_post("/api/auth/telegram/", payload))
+            assert resp.status_code == 200, resp.data
+            return resp.data["tokens"]
+
+        def exchange(tid):
+            resp = token_view(signed_post("/api/auth/telegram/token/", {"telegram_id": tid}))
+            assert resp.status_code == 200, resp.data
+            return resp.data["tokens"]
+
+        def refresh(tokens):
+            resp = refresh_view(factory.post("/api/auth/token/refresh/", {"refresh": tokens["refresh"]}, format="json"))
+            assert resp.status_code == 200, resp.data
+
+        try:
+            with transaction.atomic(), override_settings(BOT_API_SECRET=BENCH_SECRET):
+                self._rate("Argon2 make_password (solishtirish uchun)", make_password, [str(i) for i in ids[:20]])
+                self._rate("auth/telegram — yangi user", auth, ids)
+                self._rate("auth/telegram — mavjud user", auth, ids)
+                tokens = self._rate("auth/telegram/token — imzolangan", exchange, ids)
+                self._rate("auth/token/refresh", refresh, tokens)
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -15,9 +15,21 @@ class User(BaseModel, AbstractUser):
     telegram_id = models.BigIntegerField(unique=True, null=True, blank=True)
     phone_number = models.CharField(max_length=32, blank=True, default="")
 
+    SEARCH_FIELDS = {"username", "first_name", "last_name", "phone_number", "email"}
+
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        # reportlar qidiruv hujjatida reporter ma'lumotlari ham bor
+        update_fields = kwargs.get("update_fields")
+        if not adding and (update_fields is None or self.SEARCH_FIELDS & set(update_fields)):
+            from reports.search import reindex_user
+            reindex_user(self)
+
     def token(self):
         refresh = RefreshToken.for_user(self)
         return {
@@ -17,6 +17,10 @@ class TelegramRegisterSerializer(serializers.Serializer):
         return v
 
 
+class TelegramTokenSerializer(serializers.Serializer):
+    telegram_id = serializers.IntegerField()
+
+
 class UserMeSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -1,3 +1,58 @@
-from django.test import TestCase
+import json
+import time
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .bot_auth import sign
+
+
+class TokenRefreshTests(TestCase):
+    def test_refresh_without_login(self):
+        user = get_user_model().objects.create(username="777", telegram_id=777)
+        tokens = user.token()
+
+        client = APIClient()
+        resp = client.post("/api/auth/token/refresh/", {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("access", resp.data)
+
+        # rotatsiya: eski refresh token qora ro'yxatda
+        resp = client.post("/api/auth/token/refresh/", {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(resp.status_code, 401)
+
+
+@override_settings(BOT_API_SECRET="test-secret")
+class BotTokenExchangeTests(TestCase):
+    def _post(self, path, payload, secret="test-secret", timestamp=None):
+        body = json.dumps(payload).encode()
+        ts = str(timestamp or int(time.time()))
+        return APIClient().post(
+            path, body, content_type="application/json",
+            HTTP_X_BOT_TIMESTAMP=ts, HTTP_X_BOT_SIGNATURE=sign(secret, ts, body),
+        )
+
+    def test_signed_exchange(self):
+        get_user_model().objects.create(username="777", telegram_id=777)
+        resp = self._post("/api/auth/telegram/token/", {"telegram_id": 777})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("access", resp.data["tokens"])
+
+        self.assertEqual(self._post("/api/auth/telegram/token/", {"telegram_id": 778}).status_code, 404)
+
+    def test_rejects_bad_signature(self):
+        get_user_model().objects.create(username="777", telegram_id=777)
+        payload = {"telegram_id": 777}
+        self.assertEqual(self._post("/api/auth/telegram/token/", payload, secret="boshqa").status_code, 403)
+        old = int(time.time()) - 3600
+        self.assertEqual(self._post("/api/auth/telegram/token/", payload, timestamp=old).status_code, 403)
+        # auth/telegram da JWT autentifikatsiya bor -> 401
+        resp = APIClient().post("/api/auth/telegram/", {"telegram_id": 777}, format="json")
+        self.assertEqual(resp.status_code, 401)
+
+    def test_new_user_has_no_password_hash(self):
+        payload = {"telegram_id": 900, "first_name": "Ali", "phone_number": "+998900000000"}
+        resp = self._post("/api/auth/telegram/", payload)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(get_user_model().objects.get(telegram_id=900).has_usable_password())
@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import TelegramAuthView, MeView
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from .views import TelegramAuthView, TelegramTokenView, MeView
 
 urlpatterns = [
     path("auth/telegram/", TelegramAuthView.as_view(), name="auth-telegram"),
+    path("auth/telegram/token/", TelegramTokenView.as_view(), name="auth-telegram-token"),
+    path("auth/token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
     path("me/", MeView.as_view(), name="me")
 ]
@@ -1,10 +1,10 @@
 from django.contrib.auth import get_user_model
 from rest_framework import status
-from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .serializers import TelegramRegisterSerializer, UserMeSerializer
+from .bot_auth import IsSignedBotRequest, IsSignedBotRequestIfConfigured
+from .serializers import TelegramRegisterSerializer, TelegramTokenSerializer, UserMeSerializer
 
 User = get_user_model()
 
@@ -15,10 +15,11 @@ class TelegramAuthView(APIView):
     - User bo'lmasa yaratadi
     - Bo'lsa login qilib token qaytaradi
 
-    username = str(telegram_id)
-    password = str(telegram_id)
+    username = str(telegram_id). Parol yo'q (set_unusable_password) —
+    hash hisoblanmaydi. BOT_API_SECRET o'rnatilgan bo'lsa so'rov imzolangan
+    bo'lishi kerak (users.bot_auth).
     """
-    permission_classes = [AllowAny]
+    permission_classes = [IsSignedBotRequestIfConfigured]
 
     def post(self, request):
         ser = TelegramRegisterSerializer(data=request.data)
@@ -26,7 +27,6 @@ class TelegramAuthView(APIView):
 
         telegram_id = ser.validated_data["telegram_id"]
         username = str(telegram_id)
-        raw_password = str(telegram_id)
 
         user, created = User.objects.get_or_create(
             telegram_id=telegram_id,
@@ -39,7 +39,8 @@ class TelegramAuthView(APIView):
         )
 
         if created:
-            user.set_password(raw_password)
+            # parol bilan kirilmaydi — Argon2 hash ga CPU sarflamaymiz
+            user.set_unusable_password()
             user.save(update_fields=["password"])
         else:
             # yangilash (telegram user data o'zgarishi mumkin)
@@ -72,6 +73,26 @@ class TelegramAuthView(APIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
+class TelegramTokenView(APIView):
+    """
+    Bot uchun arzon token almashish: imzolangan so'rov + telegram_id -> tokenlar.
+    Login ham, parol hash ham yo'q. User avval auth/telegram/ orqali
+    ro'yxatdan o'tgan bo'lishi kerak.
+    """
+    authentication_classes = []
+    permission_classes = [IsSignedBotRequest]
+
+    def post(self, request):
+        ser = TelegramTokenSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+
+        user = User.objects.filter(telegram_id=ser.validated_data["telegram_id"], is_active=True).first()
+        if user is None:
+            return Response({"detail": "Foydalanuvchi topilmadi."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({"tokens": user.token()}, status=status.HTTP_200_OK)
+
+
 class MeView(APIView):
     def get(self, request):
         return Response(UserMeSerializer(request.user).data)
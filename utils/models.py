@@ -3,8 +3,9 @@ from uuid import uuid4
 
 class BaseModel(models.Model):
     id = models.UUIDField(default=uuid4, primary_key=True, editable=False)
-    created_at = models.DateField(auto_now_add=True)
-    updated_at = models.DateField(auto_now=True)
+    # Eski bazalarda DateField edi — reports/management/commands/upgrade_timestamps
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
@@ -0,0 +1,251 @@
+# utils/pagination.py
+"""
+Keyset (cursor) pagination: COUNT(*) va OFFSET siz.
+
+Tartib qs.order_by() dan olinadi (masalan "-created_at"), oxiriga pk
+qo'shiladi — (created_at, id) bir xil bo'lgan qatorlar ham yo'qolmaydi.
+Cursor = chegaradagi qatorning tartib maydonlari qiymatlari (base64 JSON).
+Sahifa chuqurligi narxga ta'sir qilmaydi: har doim indeks bo'yicha
+WHERE (created_at, id) < (...) LIMIT n.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# Taxminiy sanoq: shundan ko'pini sanamaymiz ("1000+")
+APPROX_COUNT_CAP = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _ordering(qs):
+    """
+    [("created_at", True), ("id", True)] — (maydon, kamayish bo'yichami).
+    """
+    fields = []
+    for item in qs.query.order_by or qs.model._meta.ordering or ():
+        if not isinstance(item, str):
+            raise ValueError("keyset pagination faqat satrli order_by bilan ishlaydi")
+        desc = item.startswith("-")
+        fields.append((item.lstrip("-"), desc))
+
+    pk = qs.model._meta.pk.name
+    if not any(name in (pk, "pk") for name, _desc in fields):
+        fields.append((pk, fields[-1][1] if fields else True))
+    return fields
+
+
+def _encode_value(v):
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, (UUID, Decimal)):
+        return str(v)
+    return v
+
+
+def encode_cursor(values=None, reverse: bool = False) -> str:
+    payload = {"r": 1 if reverse else 0}
+    if values is not None:
+        payload["v"] = [_encode_value(v) for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    -> (values | None, reverse). Noto'g'ri cursor -> InvalidCursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = payload.get("v")
+        if values is not None and not isinstance(values, list):
+            raise ValueError
+        return values, bool(payload.get("r"))
+    except (binascii.Error, ValueError, AttributeError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def _after(fields, values, forward: bool) -> Q:
+    """
+    Leksikografik (f1, f2, ...) > / < (v1, v2, ...) sharti.
+    """
+    cond = Q()
+    for i, (name, desc) in enumerate(fields):
+        op = "lt" if desc == forward else "gt"
+        step = Q(**{f"{name}__{op}": values[i]})
+        for j in range(i):
+            step &= Q(**{fields[j][0]: values[j]})
+        cond |= step
+    return cond
+
+
+def _parse_values(qs, fields, values) -> list:
+    """
+    Cursor dagi JSON qiymatlar -> maydon (yoki annotate) turlari
+    (field.to_python). Mos kelmasa ValidationError.
+    """
+    out = []
+    for (name, _desc), v in zip(fields, values):
+        if name in qs.query.annotations:
+            out.append(qs.query.annotations[name].output_field.to_python(v))
+            continue
+        m, field = qs.model, None
+        for part in name.split("__"):
+            field = m._meta.pk if part == "pk" else m._meta.get_field(part)
+            m = field.related_model or m
+        if field.is_relation:
+            field = field.target_field
+        out.append(field.to_python(v))
+    return out
+
+
+def _values_of(obj, fields):
+    out = []
+    for name, _desc in fields:
+        v = obj
+        for part in name.split("__"):
+            v = getattr(v, part)
+        out.append(v)
+    return out
+
+
+def approx_count(qs, cap: int = APPROX_COUNT_CAP):
+    """
+    -> (son, capped). `cap` dan ko'p bo'lsa (cap, True) — to'liq COUNT qilinmaydi.
+    """
+    n = qs.order_by()[: cap + 1].count()
+    return (cap, True) if n > cap else (n, False)
+
+
+class KeysetPage:
+    """
+    Paginator.page() ga o'xshash: object_list, has_next, has_previous
+    va qo'shni sahifalar uchun next_cursor / previous_cursor.
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor,
+                 count=None, count_capped=False):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_capped = count_capped
+        # birinchi/oxirgi sahifa havolalari uchun
+        self.last_cursor = encode_cursor(reverse=True)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_page(qs, cursor: str = "", per_page: int = 10, with_count: bool = False) -> KeysetPage:
+    """
+    qs ning tartibi bo'yicha bitta sahifa. cursor bo'sh -> birinchi sahifa.
+    Noto'g'ri cursor (buzuq yoki maydonlarga mos kelmaydigan qiymatlar) ham
+    birinchi sahifa deb olinadi (eskirgan havola).
+    """
+    fields = _ordering(qs)
+
+    values, reverse, page_qs = None, False, None
+    if cursor:
+        try:
+            values, reverse = decode_cursor(cursor)
+            if values is not None:
+                if len(values) != len(fields):
+                    raise InvalidCursor(cursor)
+                values = _parse_values(qs, fields, values)
+                # filter() ham qiymatlarni tekshiradi (masalan None)
+                page_qs = qs.filter(_after(fields, values, forward=not reverse))
+        except (InvalidCursor, ValidationError, ValueError, TypeError, FieldDoesNotExist):
+            values, reverse, page_qs = None, False, None
+
+    order = [("-" if desc != reverse else "") + name for name, desc in fields]
+    page_qs = (qs if page_qs is None else page_qs).order_by(*order)
+
+    rows = list(page_qs[: per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+
+    if reverse:
+        has_next = values is not None
+        has_previous = has_more
+    else:
+        has_next = has_more
+        has_previous = values is not None
+
+    next_cursor = encode_cursor(_values_of(rows[-1], fields)) if rows and has_next else None
+    previous_cursor = encode_cursor(_values_of(rows[0], fields), reverse=True) if rows and has_previous else None
+
+    count, capped = approx_count(qs) if with_count else (None, False)
+    return KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor, count, capped)
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF uchun: ?cursor=... ; ?count=1 bo'lsa taxminiy `count` ham qaytadi.
+    Javob shakli PageNumberPagination ga mos: next / previous / results.
+    """
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    page_size = settings.REST_FRAMEWORK.get("PAGE_SIZE", 10)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        with_count = request.query_params.get(self.count_query_param) in ("1", "true")
+        self.page = keyset_page(
+            queryset,
+            request.query_params.get(self.cursor_query_param, ""),
+            self.page_size,
+            with_count=with_count,
+        )
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        body = {
+            "next": self._link(self.page.next_cursor),
+            "previous": self._link(self.page.previous_cursor),
+        }
+        if self.page.count is not None:
+            body["count"] = self.page.count
+            body["count_capped"] = self.page.count_capped
+        body["results"] = data
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer"},
+                "count_capped": {"type": "boolean"},
+                "results": schema,
+            },
+        }
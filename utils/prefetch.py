@@ -0,0 +1,82 @@
+# utils/prefetch.py
+"""
+Serializer <-> queryset kelishuvi (N+1 ga qarshi).
+
+Serializer o'ziga kerakli bog'lanishlarni e'lon qiladi:
+
+    class ReportSerializer(PrefetchSerializerMixin, serializers.ModelSerializer):
+        select_related = ("organization",)
+        # attachments = ReportAttachmentSerializer(many=True) -> avtomatik
+
+Ichki (nested) serializerlar maydonining o'zi va ularning talablari
+avtomatik prefiks bilan qo'shiladi ("attachments", "attachments__uploaded_by").
+PrefetchViewMixin ulangan generic view ularni queryset ga o'zi qo'llaydi.
+"""
+from rest_framework import serializers
+
+
+def _nested(serializer_class):
+    """
+    (source, serializer_class, many) — e'lon qilingan ichki serializerlar.
+    """
+    for name, field in getattr(serializer_class, "_declared_fields", {}).items():
+        many = isinstance(field, serializers.ListSerializer)
+        child = field.child if many else field
+        if isinstance(child, serializers.BaseSerializer):
+            source = field.source or name
+            yield source.replace(".", "__"), type(child), many
+
+
+def collect_related(serializer_class, prefix: str = ""):
+    """
+    -> (select_related, prefetch_related) — to'liq yo'llar ro'yxati.
+    To-many ichidagi select_related prefetch yo'liga aylanadi.
+    """
+    select = [prefix + f for f in getattr(serializer_class, "select_related", ())]
+    prefetch = [prefix + f for f in getattr(serializer_class, "prefetch_related", ())]
+
+    for source, child, many in _nested(serializer_class):
+        path = prefix + source
+        sub_select, sub_prefetch = collect_related(child, prefix=f"{path}__")
+        if many or path in prefetch:
+            # to-many: ichidagi select_related ham prefetch orqali olinadi
+            prefetch += [path] + sub_select + sub_prefetch
+        else:
+            select += [path] + sub_select
+            prefetch += sub_prefetch
+
+    # takrorlarsiz, tartibni saqlab
+    return list(dict.fromkeys(select)), list(dict.fromkeys(prefetch))
+
+
+def apply_related(serializer_class, qs):
+    select, prefetch = collect_related(serializer_class)
+    if select:
+        qs = qs.select_related(*select)
+    if prefetch:
+        qs = qs.prefetch_related(*prefetch)
+    return qs
+
+
+class PrefetchSerializerMixin:
+    """
+    Serializer qaysi bog'lanishlarni o'qishini e'lon qiladi.
+    """
+    select_related = ()
+    prefetch_related = ()
+
+    @classmethod
+    def setup_queryset(cls, qs):
+        return apply_related(cls, qs)
+
+
+class PrefetchViewMixin:
+    """
+    Generic view: serializer e'lon qilgan select_related/prefetch_related ni
+    qo'llaydi. filter_queryset() orqali — view o'zining get_queryset() ini
+    yozsa ham ishlaydi (list() va get_object() ikkalasi ham uni chaqiradi).
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return apply_related(self.get_serializer_class(), queryset)
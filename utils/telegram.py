@@ -1,29 +1,257 @@
 # utils/telegram.py
+"""
+Telegram Bot API mijozi.
+
+TelegramNotifier bitta doimiy (keep-alive) ulanishlar pulini ushlab turadi:
+  - send()       — sync, requests.Session orqali
+  - send_many()  — async, aiohttp orqali parallel; umumiy (rate) va chat
+                   bo'yicha (per_chat_interval) limitlarga rioya qiladi,
+                   bitta chatga xabarlar tartibi saqlanadi
+Har yuborishning kechikishi `metrics` da yig'iladi.
+"""
+import asyncio
 import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+
+import aiohttp
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 log = logging.getLogger(__name__)
 
+# Telegram: bitta chatga ~1 xabar/soniya
+PER_CHAT_INTERVAL = 1.0
+
+# qayta urinib foydasi yo'q javoblar (chat topilmadi, bot bloklangan, ...)
+PERMANENT_STATUSES = (400, 403, 404)
+
+
+@dataclass
+class SendResult:
+    ok: bool
+    error: str = ""
+    permanent: bool = False
+    retry_after: float | None = None  # 429 javobidagi parameters.retry_after
+
+
+class RateLimiter:
+    """
+    acquire() chaqiruvlari orasida kamida 1/rate soniya.
+    pause() — 429 kelganda barcha so'rovlarni shuncha to'xtatib turadi.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+class SendMetrics:
+    """
+    Yuborishlar soni, xatolar va oxirgi `window` ta yuborish kechikishi.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.errors = 0
+        self.statuses = Counter()
+        self._latencies = deque(maxlen=window)
+
+    def observe(self, seconds: float, status):
+        self.count += 1
+        self.statuses[status] += 1
+        if status != 200:
+            self.errors += 1
+        self._latencies.append(seconds)
+
+    def snapshot(self) -> dict:
+        lat = sorted(self._latencies)
+
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(len(lat) * p))] * 1000, 1) if lat else None
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(lat[-1] * 1000, 1) if lat else None,
+        }
+
+
+def _result(status: int, data: dict) -> SendResult:
+    if status == 200 and data.get("ok", True):
+        return SendResult(ok=True)
+    error = f"{status} {data.get('description', '')}".strip()
+    if status == 429:
+        retry_after = float((data.get("parameters") or {}).get("retry_after", 1))
+        return SendResult(ok=False, error=error, retry_after=retry_after)
+    return SendResult(ok=False, error=error, permanent=status in PERMANENT_STATUSES)
+
+
+class TelegramNotifier:
+    def __init__(
+        self,
+        token: str = None,
+        api_url: str = None,
+        rate: float = None,
+        concurrency: int = None,
+        per_chat_interval: float = PER_CHAT_INTERVAL,
+        timeout: float = 10.0,
+    ):
+        token = token or settings.TELEGRAM_BOT_TOKEN
+        api_url = (api_url or settings.TELEGRAM_API_URL).rstrip("/")
+        self.url = f"{api_url}/bot{token}/sendMessage"
+        self.concurrency = concurrency or settings.TELEGRAM_OUTBOX_CONCURRENCY
+        self.limiter = RateLimiter(rate if rate is not None else settings.TELEGRAM_OUTBOX_RATE)
+        self.per_chat_interval = per_chat_interval
+        self.timeout = timeout
+        self.metrics = SendMetrics()
+
+        self._session = None  # requests.Session
+        self._aio_session = None  # aiohttp.ClientSession
+
+    # ----------------------------------------------------------- sync
+    def _requests_session(self):
+        if self._session is None:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+        return self._session
+
+    def send(self, chat_id: int, text: str) -> SendResult:
+        started = time.monotonic()
+        status = None
+        try:
+            r = self._requests_session().post(
+                self.url, json={"chat_id": chat_id, "text": text}, timeout=self.timeout,
+            )
+            status = r.status_code
+            try:
+                data = r.json()
+            except ValueError:
+                data = {}
+            return _result(status, data)
+        except requests.RequestException as e:
+            return SendResult(ok=False, error=f"{type(e).__name__}: {e}")
+        finally:
+            self.metrics.observe(time.monotonic() - started, status)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    # ---------------------------------------------------------- async
+    def _aiohttp_session(self):
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._aio_session
+
+    async def asend(self, chat_id: int, text: str) -> SendResult:
+        await self.limiter.acquire()
+        started = time.monotonic()
+        status = None
+        try:
+            async with self._aiohttp_session().post(self.url, json={"chat_id": chat_id, "text": text}) as r:
+                status = r.status
+                try:
+                    data = await r.json(content_type=None)
+                except ValueError:
+                    data = {}
+            result = _result(status, data)
+            if result.retry_after is not None:
+                self.limiter.pause(result.retry_after)
+            return result
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return SendResult(ok=False, error=f"{type(e).__name__}: {e}")
+        finally:
+            self.metrics.observe(time.monotonic() - started, status)
+
+    async def _send_chat(self, sem, items):
+        """
+        Bitta chatning xabarlari — ketma-ket; biri yiqilsa qolganlari yuborilmaydi (None).
+        """
+        out = []
+        async with sem:
+            for n, (i, chat_id, text) in enumerate(items):
+                if n:
+                    await asyncio.sleep(self.per_chat_interval)
+                res = await self.asend(chat_id, text)
+                out.append((i, res))
+                if not res.ok:
+                    out += [(j, None) for j, _c, _t in items[n + 1:]]
+                    break
+        return out
+
+    async def send_many(self, messages):
+        """
+        messages: [(chat_id, text)] -> shu tartibda [SendResult | None].
+        None — shu chatning oldingi xabari yiqilgani uchun yuborilmadi.
+        """
+        by_chat = {}
+        for i, (chat_id, text) in enumerate(messages):
+            by_chat.setdefault(chat_id, []).append((i, chat_id, text))
+
+        sem = asyncio.Semaphore(self.concurrency)
+        chunks = await asyncio.gather(*(self._send_chat(sem, items) for items in by_chat.values()))
+
+        results = [None] * len(messages)
+        for chunk in chunks:
+            for i, res in chunk:
+                results[i] = res
+        return results
+
+    async def aclose(self):
+        if self._aio_session is not None:
+            await self._aio_session.close()
+            self._aio_session = None
+        self.close()
+
+
+_default = None
+
+
+def get_notifier() -> TelegramNotifier:
+    """
+    Jarayon bo'yicha bitta sync notifier (ulanishlar puli qayta ishlatiladi).
+    """
+    global _default
+    if _default is None:
+        _default = TelegramNotifier()
+    return _default
+
 
 def send_telegram_message(telegram_id: int, text: str) -> bool:
     """
-    Oddiy Telegram Bot API orqali xabar yuborish.
-    settings.TELEGRAM_BOT_TOKEN bo'lishi kerak.
+    Bitta xabarni darhol (bloklovchi) yuborish. settings.TELEGRAM_BOT_TOKEN
+    bo'lishi kerak. Viewlar ichida emas — u yerda
+    notifications.outbox.enqueue_telegram_message ishlatiladi.
     """
     token = getattr(settings, "TELEGRAM_BOT_TOKEN", None)
     if not token or not telegram_id:
         return False
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {"chat_id": telegram_id, "text": text}
-
-    try:
-        r = requests.post(url, json=payload, timeout=10)
-        ok = (r.status_code == 200)
-        if not ok:
-            log.warning("Telegram send failed: %s %s", r.status_code, r.text[:500])
-        return ok
-    except Exception as e:
-        log.exception("Telegram send exception: %s", e)
-        return False
+    result = get_notifier().send(telegram_id, text)
+    if not result.ok:
+        log.warning("Telegram send failed: %s", result.error[:500])
+    return result.ok
@@ -0,0 +1,25 @@
+# utils/testing.py
+"""
+Testlar uchun yordamchilar: endpoint qancha SQL so'rov qilishini tekshirish.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """
+    TestCase mixin. N+1 qaytib kelsa test so'rovlar ro'yxati bilan yiqiladi:
+
+        self.assertEndpointQueries(self.client, "/api/reports/mine/", 2)
+    """
+
+    def assertEndpointQueries(self, client, url, expected: int, data=None, method: str = "get",
+                              status_code: int = 200, using: str = DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as ctx:
+            response = getattr(client, method)(url, data or {})
+
+        self.assertEqual(response.status_code, status_code, f"{method.upper()} {url}")
+        if len(ctx) != expected:
+            queries = "\n".join(f"{i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, start=1))
+            self.fail(f"{method.upper()} {url}: {len(ctx)} ta so'rov, kutilgan {expected}:\n{queries}")
+        return response